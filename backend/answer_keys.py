@@ -0,0 +1,170 @@
+import struct
+import threading
+import time
+import zlib
+from array import array
+from flask import current_app
+from models import db, Chapter, Quiz, Question
+
+try:
+    import redis
+except ImportError:  # Redis is optional; the in-process store works without it
+    redis = None
+
+# chapter_id, subject_id, question count
+_HEADER = struct.Struct("<III")
+# Stored entries are prefixed with the Quiz.content_version they were read at.
+# Quiz ids are never reused (AUTOINCREMENT), so (quiz id, version) names one
+# state of one quiz row even in a process that never saw the quiz deleted.
+_VERSION = struct.Struct("<I")
+
+class AnswerKey:
+    """Compact answer key for one quiz: parallel packed arrays of question ids and correct options."""
+
+    __slots__ = ("chapter_id", "subject_id", "question_ids", "correct_options")
+
+    def __init__(self, chapter_id, subject_id, question_ids, correct_options):
+        self.chapter_id = chapter_id
+        self.subject_id = subject_id
+        self.question_ids = question_ids
+        self.correct_options = correct_options
+
+    def __len__(self):
+        return len(self.question_ids)
+
+    def pack(self):
+        return _HEADER.pack(self.chapter_id, self.subject_id, len(self)) + \
+            self.question_ids.tobytes() + self.correct_options.tobytes()
+
+    @classmethod
+    def unpack(cls, data):
+        chapter_id, subject_id, count = _HEADER.unpack_from(data)
+        offset = _HEADER.size
+        question_ids = array("I")
+        question_ids.frombytes(data[offset:offset + count * question_ids.itemsize])
+        offset += count * question_ids.itemsize
+        correct_options = array("B")
+        correct_options.frombytes(data[offset:offset + count])
+        return cls(chapter_id, subject_id, question_ids, correct_options)
+
+    @property
+    def layout(self):
+        """Fingerprint of the question order responses are packed in (fits a signed 32-bit column)."""
+        return zlib.crc32(self.question_ids.tobytes()) & 0x7FFFFFFF
+
+    def responses(self, answers):
+        """Pack submitted answers into one byte per question; 0 marks unanswered or invalid."""
+        packed = array("B", bytes(len(self)))
+        for i, question_id in enumerate(self.question_ids):
+            try:
+                option = int(answers.get(str(question_id)))
+            except (TypeError, ValueError):
+                continue
+            if 1 <= option <= 4:
+                packed[i] = option
+        return packed
+
+    def grade(self, answers):
+        return self.grade_responses(self.responses(answers))
+
+    def grade_responses(self, responses):
+        return sum(1 for picked, correct in zip(responses, self.correct_options) if picked == correct)
+
+class LocalAnswerKeyStore:
+    def __init__(self, ttl):
+        self._ttl = ttl
+        self._keys = {}  # quiz_id -> (expires_at, packed)
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id):
+        entry = self._keys.get(quiz_id)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, quiz_id, packed):
+        with self._lock:
+            self._keys[quiz_id] = (time.monotonic() + self._ttl, packed)
+
+    def delete(self, *quiz_ids):
+        with self._lock:
+            for quiz_id in quiz_ids:
+                self._keys.pop(quiz_id, None)
+
+class RedisAnswerKeyStore:
+    def __init__(self, client, ttl):
+        self._client = client
+        self._ttl = ttl
+
+    @staticmethod
+    def _key(quiz_id):
+        return f"answer_key:{quiz_id}"
+
+    def get(self, quiz_id):
+        return self._client.get(self._key(quiz_id))
+
+    def set(self, quiz_id, packed):
+        self._client.set(self._key(quiz_id), packed, ex=self._ttl)
+
+    def delete(self, *quiz_ids):
+        if quiz_ids:
+            self._client.delete(*[self._key(quiz_id) for quiz_id in quiz_ids])
+
+def _create_store(app):
+    url = app.config.get("ANSWER_KEY_CACHE_URL")
+    ttl = app.config.get("ANSWER_KEY_CACHE_TTL", 3600)
+    if not url:
+        return LocalAnswerKeyStore(ttl)
+    if redis is None:
+        raise RuntimeError("ANSWER_KEY_CACHE_URL is set but the redis package is not installed")
+    return RedisAnswerKeyStore(redis.Redis.from_url(url), ttl)
+
+def get_store():
+    app = current_app._get_current_object()
+    store = app.extensions.get("answer_keys")
+    if store is None:
+        store = app.extensions.setdefault("answer_keys", _create_store(app))
+    return store
+
+def _load_answer_key(quiz_id):
+    placement = db.session.query(Quiz.chapter_id, Chapter.subject_id, Quiz.content_version).join(
+        Chapter, Quiz.chapter_id == Chapter.id
+    ).filter(Quiz.id == quiz_id).first()
+    if not placement:
+        return None, None
+
+    rows = db.session.query(Question.id, Question.correct_option).filter(
+        Question.quiz_id == quiz_id
+    ).order_by(Question.id).all()
+    return AnswerKey(
+        placement.chapter_id,
+        placement.subject_id,
+        array("I", [row.id for row in rows]),
+        array("B", [row.correct_option for row in rows])
+    ), placement.content_version
+
+def get_answer_key(quiz_id, current=True):
+    """Return the quiz's AnswerKey, or None if the quiz does not exist.
+
+    Every admin edit bumps Quiz.content_version, so with current=True (grading)
+    one primary-key lookup confirms the stored key is still the quiz's. With
+    current=False a stored key up to ANSWER_KEY_CACHE_TTL old is returned
+    unchecked, which is enough for validating autosaves.
+    """
+    store = get_store()
+    version = None
+    if current:
+        version = db.session.query(Quiz.content_version).filter(Quiz.id == quiz_id).scalar()
+        if version is None:
+            return None
+    stored = store.get(quiz_id)
+    if stored is not None and (version is None or _VERSION.unpack_from(stored)[0] == version):
+        return AnswerKey.unpack(stored[_VERSION.size:])
+
+    answer_key, version = _load_answer_key(quiz_id)
+    if answer_key is not None:
+        store.set(quiz_id, _VERSION.pack(version) + answer_key.pack())
+    return answer_key
+
+def invalidate_answer_keys(*quiz_ids):
+    get_store().delete(*quiz_ids)
@@ -3,20 +3,31 @@ from flask_mail import Mail, Message
 from flask_cors import CORS
 from models import db, User
 from config import Config
-from tasks import init_celery, create_export_task
+from tasks import celery, init_celery, export_csv_task
 import os
 from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash
-from extensions import mail
+from extensions import mail, migrate
+from question_import import ROW_READERS
+from metrics import init_metrics
+from autosave import check_autosave_config
+from sqlite_tuning import init_sqlite, sqlite_engine_options, sqlite_production_mode
+from password_hashing import hash_password
+import click
 
 load_dotenv()
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    check_autosave_config(app)
     
     # Initialize extensions
+    if sqlite_production_mode(app.config):
+        app.config["SQLALCHEMY_ENGINE_OPTIONS"] = sqlite_engine_options(app.config)
     db.init_app(app)
+    init_sqlite(app)
+    migrate.init_app(app, db, render_as_batch=True)
+    init_metrics(app)
     CORS(app, supports_credentials=True, origins=["http://localhost:8080"])
     
     # Configure Flask-Mail
@@ -29,38 +40,122 @@ def create_app():
     
     mail.init_app(app)
     
-    # Initialize Celery and create task
-    celery = init_celery(app)
-    export_csv_task = create_export_task(celery)
+    # Bind the shared Celery instance to this app
+    init_celery(app)
     
     # Make task available to app context
     app.export_csv_task = export_csv_task
     
     # Register blueprints
+    from routes.auth_routes import auth_bp
+    from routes.admin_routes import admin_bp
     from routes.user_routes import student_bp
+    app.register_blueprint(auth_bp, url_prefix='/auth')
+    app.register_blueprint(admin_bp, url_prefix='/admin')
     app.register_blueprint(student_bp, url_prefix='/student')
-    
-    return app, celery
 
-app, celery = create_app()
+    @app.cli.command("repair-counters")
+    def repair_counters_command():
+        """Recompute denormalized quiz/question counters from source rows."""
+        from counters import recompute_counters
+        recompute_counters()
+        print("Counters repaired")
 
-@app.route('/hello')
-def hello():
-    return jsonify({'message': 'Hello World!'})
+    @app.cli.command("rebuild-rollups")
+    def rebuild_rollups_command():
+        """Backfill the analytics rollup tables from every stored Score."""
+        from rollups import rebuild_rollups
+        rebuild_rollups()
+        print("Rollups rebuilt")
 
-@app.route('/send-test-email')
-def send_test_email():
-    try:
-        msg = Message(
-            subject="Test Email from Flask-Mail",
-            recipients=["shivasaicharand@gmail.com"],
-            body="This is a plain-text email body",
-            html="<b>This is an HTML email body</b>"
-        )
-        mail.send(msg)
-        return "Email sent successfully!"
-    except Exception as e:
-        return f"Failed to send email: {str(e)}"
+    @app.cli.command("rebuild-leaderboards")
+    def rebuild_leaderboards_command():
+        """Build the shared (Redis) per-quiz leaderboards from Score, e.g. before a deploy takes traffic.
+
+        In-process boards are built in the background by each web process.
+        """
+        from leaderboard import rebuild_leaderboards
+        if not rebuild_leaderboards():
+            raise click.ClickException("Another process is rebuilding the leaderboards")
+        print("Leaderboards rebuilt")
+
+    @app.cli.command("refresh-sqlite-snapshot")
+    def refresh_sqlite_snapshot_command():
+        """Write the shared SQLite read snapshot once, e.g. from cron when Celery beat is not running."""
+        from read_routing import refresh_sqlite_snapshot
+        path = refresh_sqlite_snapshot()
+        if path is None:
+            raise click.ClickException("SQLITE_READ_SNAPSHOT is off or the database is not a SQLite file")
+        print(f"Snapshot written to {path}")
+
+    @app.cli.command("check-student-stats")
+    @click.option("--repair", is_flag=True, help="Rebuild the stats of every drifted student")
+    @click.option("--rebuild-all", is_flag=True, help="Rebuild every student's stats from Score")
+    def check_student_stats_command(repair, rebuild_all):
+        """Compare per-student performance stats against Score and optionally rebuild them."""
+        from rollups import check_student_stats, rebuild_student_stats
+        if rebuild_all:
+            rebuild_student_stats()
+            print("Student stats rebuilt")
+            return
+        drifted = check_student_stats()
+        if not drifted:
+            print("Student stats consistent")
+            return
+        print(f"{len(drifted)} student(s) drifted: {', '.join(map(str, drifted[:20]))}{' ...' if len(drifted) > 20 else ''}")
+        if not repair:
+            raise click.ClickException("Run with --repair to rebuild them")
+        rebuild_student_stats(drifted)
+        print("Drifted students rebuilt")
+
+    @app.cli.command("import-questions")
+    @click.argument("path", type=click.Path(exists=True, dir_okay=False))
+    @click.option("--format", "fmt", type=click.Choice(list(ROW_READERS)), help="Defaults to the file extension")
+    def import_questions_command(path, fmt):
+        """Bulk-import a CSV or JSONL question bank."""
+        from question_import import import_questions
+        fmt = fmt or os.path.splitext(path)[1].lstrip(".").lower()
+        if fmt not in ROW_READERS:
+            raise click.UsageError("Format must be csv or jsonl")
+        with open(path, "rb") as f:
+            report = import_questions(ROW_READERS[fmt](f))
+        print(f"Imported {report['imported']}, failed {report['failed']}")
+        for error in report["errors"]:
+            print(f"  row {error['row']}: {error['error']}")
+
+    @app.cli.command("explain-queries")
+    def explain_queries_command():
+        """Show query plans for the hot routes and flag remaining table scans."""
+        from explain_queries import explain_hot_queries
+        scanning = explain_hot_queries()
+        if scanning:
+            raise click.ClickException(f"{len(scanning)} route(s) still scan a table")
+        print("No hot route does a full table scan")
+
+    @app.route('/hello')
+    def hello():
+        return jsonify({'message': 'Hello World!'})
+
+    @app.route('/send-test-email')
+    def send_test_email():
+        try:
+            msg = Message(
+                subject="Test Email from Flask-Mail",
+                recipients=["shivasaicharand@gmail.com"],
+                body="This is a plain-text email body",
+                html="<b>This is an HTML email body</b>"
+            )
+            mail.send(msg)
+            return "Email sent successfully!"
+        except Exception as e:
+            return f"Failed to send email: {str(e)}"
+    
+    return app
+
+# Importing this module no longer builds an app: `flask run` picks up the
+# create_app factory and the worker builds its own once per process
+# (tasks.get_flask_app). `celery -A tasks worker` keeps the worker off the
+# web-only imports entirely.
 
 def create_admin():
     try:
@@ -76,7 +171,7 @@ def create_admin():
         admin_user = User(
             username=admin_username,
             email=admin_email,
-            password_hash=generate_password_hash(admin_password),
+            password_hash=hash_password(admin_password),
             role='admin'
         )
         db.session.add(admin_user)
@@ -86,6 +181,7 @@ def create_admin():
         print(f"Admin error: {e}")
 
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
         db.create_all()
         create_admin()
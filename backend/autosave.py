@@ -0,0 +1,310 @@
+import atexit
+import json
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import delete, insert, select, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import db, AnswerDraft, Score
+from sqlite_tuning import write
+
+try:
+    import redis
+except ImportError:  # Redis is optional; the in-process buffer works without it
+    redis = None
+
+# Write-behind autosave for attempts in progress. Saves only touch a buffer
+# that coalesces them per (user, quiz); a background flusher writes the dirty
+# attempts to AnswerDraft in one transaction per interval. A crash loses at
+# most one interval of answers with the in-process buffer and none with Redis.
+# Answers map question ids (as strings) to options, 0 marking a cleared answer.
+
+class AnswerError(ValueError):
+    pass
+
+def clean_answers(answer_key, answers):
+    """Validate a partial {question_id: option|null} update against the quiz's questions."""
+    if not isinstance(answers, dict):
+        raise AnswerError("answers must be an object")
+    question_ids = set(map(str, answer_key.question_ids))
+    cleaned = {}
+    for question_id, option in answers.items():
+        if str(question_id) not in question_ids:
+            raise AnswerError(f"Question {question_id} is not part of this quiz")
+        if option is None:
+            option = 0
+        if isinstance(option, bool) or not isinstance(option, int) or not 0 <= option <= 4:
+            raise AnswerError(f"Invalid option for question {question_id}")
+        cleaned[str(question_id)] = option
+    return cleaned
+
+class LocalAutosaveBuffer:
+    """Per-process buffer holding only the changes not yet flushed."""
+
+    def __init__(self):
+        self._pending = {}  # (user_id, quiz_id) -> {question_id: option}
+        self._flushing = {}  # taken by the running flush, visible until it commits
+        self._lock = threading.Lock()
+        self.saves = 0
+        self.flushed_attempts = 0
+
+    def save(self, user_id, quiz_id, answers):
+        with self._lock:
+            self._pending.setdefault((user_id, quiz_id), {}).update(answers)
+            self.saves += 1
+
+    def get(self, user_id, quiz_id):
+        key = (user_id, quiz_id)
+        with self._lock:
+            return {**self._flushing.get(key, {}), **self._pending.get(key, {})}
+
+    def take(self, limit):
+        with self._lock:
+            keys = list(self._pending)[:limit]
+            batch = [(key, self._pending.pop(key)) for key in keys]
+            self._flushing.update(batch)
+            return batch
+
+    def flushed(self, batch):
+        with self._lock:
+            for key, _ in batch:
+                self._flushing.pop(key, None)
+
+    def restore(self, batch):
+        # Newer saves that arrived during the failed flush win over the batch
+        with self._lock:
+            for key, answers in batch:
+                if self._flushing.pop(key, None) is not None:
+                    self._pending[key] = {**answers, **self._pending.get(key, {})}
+
+    def discard(self, user_id, quiz_id):
+        with self._lock:
+            self._pending.pop((user_id, quiz_id), None)
+            self._flushing.pop((user_id, quiz_id), None)
+
+    def pending(self):
+        return len(self._pending)
+
+class RedisAutosaveBuffer:
+    """One hash per attempt plus a set of dirty attempts, shared by every process."""
+
+    def __init__(self, client, ttl, prefix="autosave:"):
+        self._client = client
+        self._ttl = ttl
+        self._prefix = prefix
+        self.saves = 0
+        self.flushed_attempts = 0
+
+    def _key(self, user_id, quiz_id):
+        return f"{self._prefix}attempt:{user_id}:{quiz_id}"
+
+    def _dirty(self):
+        return f"{self._prefix}dirty"
+
+    def save(self, user_id, quiz_id, answers):
+        pipe = self._client.pipeline(transaction=False)
+        pipe.hset(self._key(user_id, quiz_id), mapping=answers)
+        # Idle attempts expire; by then their answers are in AnswerDraft
+        pipe.expire(self._key(user_id, quiz_id), self._ttl)
+        pipe.sadd(self._dirty(), f"{user_id}:{quiz_id}")
+        pipe.execute()
+        self.saves += 1
+
+    def get(self, user_id, quiz_id):
+        return {field.decode(): int(value) for field, value in self._client.hgetall(self._key(user_id, quiz_id)).items()}
+
+    def take(self, limit):
+        members = self._client.spop(self._dirty(), limit)
+        if not members:
+            return []
+        keys = [tuple(map(int, member.split(b":"))) for member in members]
+        pipe = self._client.pipeline(transaction=False)
+        for user_id, quiz_id in keys:
+            pipe.hgetall(self._key(user_id, quiz_id))
+        return [
+            (key, {field.decode(): int(value) for field, value in answers.items()})
+            for key, answers in zip(keys, pipe.execute()) if answers
+        ]
+
+    def flushed(self, batch):
+        pass
+
+    def restore(self, batch):
+        if batch:
+            self._client.sadd(self._dirty(), *[f"{user_id}:{quiz_id}" for (user_id, quiz_id), _ in batch])
+
+    def discard(self, user_id, quiz_id):
+        pipe = self._client.pipeline(transaction=False)
+        pipe.delete(self._key(user_id, quiz_id))
+        pipe.srem(self._dirty(), f"{user_id}:{quiz_id}")
+        pipe.execute()
+
+    def pending(self):
+        return self._client.scard(self._dirty())
+
+def check_autosave_config(app):
+    """Refuse to start several web workers on per-process buffers: a save, its
+    read-back and the submit that grades it may each land on a different worker."""
+    if not app.config.get("AUTOSAVE_URL") and app.config.get("WEB_CONCURRENCY", 1) > 1:
+        raise RuntimeError(f"AUTOSAVE_URL must be set to run {app.config['WEB_CONCURRENCY']} web workers")
+
+def _create_buffer(app):
+    url = app.config.get("AUTOSAVE_URL")
+    if not url:
+        return LocalAutosaveBuffer()
+    ttl = app.config.get("AUTOSAVE_TTL", 6 * 3600)
+    if url.startswith("fakeredis://"):
+        import fakeredis
+        return RedisAutosaveBuffer(fakeredis.FakeRedis(), ttl)
+    if redis is None:
+        raise RuntimeError("AUTOSAVE_URL is set but the redis package is not installed")
+    return RedisAutosaveBuffer(redis.Redis.from_url(url), ttl)
+
+def _upsert_drafts(rows, existing):
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = dialect_insert(AnswerDraft)
+        db.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["user_id", "quiz_id"],
+                set_={"answers": stmt.excluded.answers, "updated_at": stmt.excluded.updated_at}
+            ),
+            rows
+        )
+        return
+    updates = [row for row in rows if (row["user_id"], row["quiz_id"]) in existing]
+    inserts = [row for row in rows if (row["user_id"], row["quiz_id"]) not in existing]
+    if updates:
+        db.session.execute(update(AnswerDraft), updates)
+    if inserts:
+        db.session.execute(insert(AnswerDraft), inserts)
+
+def _write_drafts(batch):
+    keys = [key for key, _ in batch]
+    submitted = set(db.session.execute(
+        select(Score.user_id, Score.quiz_id).where(tuple_(Score.user_id, Score.quiz_id).in_(keys))
+    ).tuples())
+    stored = {
+        (user_id, quiz_id): json.loads(answers)
+        for user_id, quiz_id, answers in db.session.execute(
+            select(AnswerDraft.user_id, AnswerDraft.quiz_id, AnswerDraft.answers)
+            .where(tuple_(AnswerDraft.user_id, AnswerDraft.quiz_id).in_(keys))
+        )
+    }
+    now = datetime.utcnow()
+    rows = [
+        {
+            "user_id": user_id,
+            "quiz_id": quiz_id,
+            "answers": json.dumps({**stored.get((user_id, quiz_id), {}), **answers}, separators=(",", ":")),
+            "updated_at": now
+        }
+        for (user_id, quiz_id), answers in batch if (user_id, quiz_id) not in submitted
+    ]
+    if rows:
+        _upsert_drafts(rows, stored)
+    return len(rows)
+
+_flush_lock = threading.Lock()
+
+def flush_autosaves(buffer=None, batch_size=None):
+    """Write one batch of dirty attempts to AnswerDraft in a single transaction.
+
+    Returns how many attempts were taken from the buffer; attempts already
+    submitted are dropped instead of written.
+    """
+    buffer = buffer or get_autosave_buffer()
+    batch_size = batch_size or current_app.config.get("AUTOSAVE_BATCH_SIZE", 500)
+    with _flush_lock:
+        batch = buffer.take(batch_size)
+        if not batch:
+            return 0
+        try:
+            written = write(_write_drafts, batch)
+        except Exception:
+            buffer.restore(batch)
+            raise
+        buffer.flushed(batch)
+        buffer.flushed_attempts += written
+        return len(batch)
+
+def flush_all_autosaves(buffer=None):
+    buffer = buffer or get_autosave_buffer()
+    batch_size = current_app.config.get("AUTOSAVE_BATCH_SIZE", 500)
+    total = 0
+    while True:
+        taken = flush_autosaves(buffer, batch_size)
+        total += taken
+        if taken < batch_size:
+            return total
+
+def _start_flusher(app, buffer):
+    interval = app.config.get("AUTOSAVE_FLUSH_INTERVAL", 2.0)
+    if interval <= 0:
+        return
+
+    def flush():
+        with app.app_context():
+            try:
+                flush_all_autosaves(buffer)
+            except Exception:
+                app.logger.exception("Autosave flush failed")
+            finally:
+                db.session.remove()
+
+    def run():
+        while True:
+            time.sleep(interval)
+            flush()
+
+    threading.Thread(target=run, name="autosave-flusher", daemon=True).start()
+    # A clean shutdown writes whatever the last interval buffered
+    atexit.register(flush)
+
+_start_lock = threading.Lock()
+
+def get_autosave_buffer():
+    """Return the app's buffer, starting this process's flusher the first time."""
+    app = current_app._get_current_object()
+    buffer = app.extensions.get("autosave")
+    if buffer is None:
+        with _start_lock:
+            buffer = app.extensions.get("autosave")
+            if buffer is None:
+                buffer = _create_buffer(app)
+                _start_flusher(app, buffer)
+                app.extensions["autosave"] = buffer
+    return buffer
+
+def save_answers(user_id, quiz_id, answers):
+    get_autosave_buffer().save(user_id, quiz_id, answers)
+
+def saved_answers(user_id, quiz_id):
+    """The attempt's flushed draft overlaid with whatever is still buffered."""
+    draft = db.session.query(AnswerDraft.answers).filter_by(user_id=user_id, quiz_id=quiz_id).scalar()
+    return {**(json.loads(draft) if draft else {}), **get_autosave_buffer().get(user_id, quiz_id)}
+
+def pop_saved_answers(user_id, quiz_id):
+    """Like saved_answers, but also deletes the draft in the caller's transaction."""
+    condition = (AnswerDraft.user_id == user_id) & (AnswerDraft.quiz_id == quiz_id)
+    if db.session.get_bind().dialect.delete_returning:
+        draft = db.session.execute(delete(AnswerDraft).where(condition).returning(AnswerDraft.answers)).scalar()
+    else:
+        draft = db.session.query(AnswerDraft.answers).filter(condition).scalar()
+        if draft is not None:
+            db.session.execute(delete(AnswerDraft).where(condition))
+    return {**(json.loads(draft) if draft else {}), **get_autosave_buffer().get(user_id, quiz_id)}
+
+def discard_autosave(user_id, quiz_id):
+    get_autosave_buffer().discard(user_id, quiz_id)
+
+def autosave_stats():
+    buffer = get_autosave_buffer()
+    return {
+        "backend": type(buffer).__name__,
+        "saves": buffer.saves,
+        "flushed_attempts": buffer.flushed_attempts,
+        "pending_attempts": buffer.pending()
+    }
@@ -0,0 +1,373 @@
+"""A whole cohort starting and submitting one exam within seconds.
+
+    python -m benchmarks.exam_wave --scale small --concurrency 32
+    python -m benchmarks.exam_wave --transport server --baseline results/before.json
+    python -m benchmarks.exam_wave --base-url http://localhost:5000 --wave-quiz 51 --students 500
+
+Seeds a throwaway SQLite file with benchmarks.synthetic_data (unless
+--base-url points at a server whose database was seeded the same way) and
+sends every student through login -> available -> start -> submit ->
+performance. Each step is fired as one wave: all students' requests are
+issued together through --concurrency workers, the way a cohort hits the
+backend when an exam opens and when its timer runs out.
+
+Transports: "client" calls the app through the Flask test client, "server"
+serves it from a threaded local HTTP server, --base-url drives a running
+backend. SQL counts per route come from the app's own request metrics (read
+in-process, or from /admin/metrics as the seeded admin).
+
+The report (p50/p95/p99 latency, throughput, error rate and SQL statements per
+route) is printed and saved as JSON. With --baseline the run is compared to an
+earlier report and the exit status is non-zero if any route regressed by more
+than --tolerance.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from benchmarks.synthetic_data import ADMIN_EMAIL, PASSWORD, SCALES, generate, student_email
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+class TestClientTransport:
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method, path, body=None, token=None):
+        headers = {"Authorization": token} if token else {}
+        response = self.app.test_client().open(path, method=method, json=body, headers=headers)
+        return response.status_code, response.get_json(silent=True)
+
+class HttpTransport:
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def request(self, method, path, body=None, token=None):
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method)
+        if data is not None:
+            req.add_header("Content-Type", "application/json")
+        if token:
+            req.add_header("Authorization", token)
+        try:
+            with urllib.request.urlopen(req, timeout=60) as response:
+                status, payload = response.status, response.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        except OSError:
+            return 0, None  # connection refused/reset counts as an error
+        try:
+            return status, json.loads(payload) if payload else None
+        except ValueError:
+            return status, None
+
+class LocalServer:
+    """The app on a threaded werkzeug server bound to a free local port."""
+
+    def __init__(self, app):
+        from werkzeug.serving import WSGIRequestHandler, make_server
+
+        class QuietHandler(WSGIRequestHandler):
+            def log_request(self, *args, **kwargs):
+                pass
+
+        self._server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietHandler)
+        self.base_url = f"http://127.0.0.1:{self._server.server_port}"
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self._server.shutdown()
+
+class InProcessMetrics:
+    def __init__(self, app):
+        self.app = app
+
+    def snapshot(self):
+        return self.app.extensions["metrics"].snapshot()["endpoints"]
+
+class RemoteMetrics:
+    def __init__(self, transport):
+        self.transport = transport
+        status, body = transport.request("POST", "/auth/login", {"email": ADMIN_EMAIL, "password": PASSWORD})
+        self.token = body["token"] if status == 200 else None
+
+    def snapshot(self):
+        if self.token is None:
+            return {}
+        status, body = self.transport.request("GET", "/admin/metrics", token=self.token)
+        return body["endpoints"] if status == 200 else {}
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    return sorted_values[max(math.ceil(p / 100 * len(sorted_values)) - 1, 0)]
+
+# Scenario steps, each a (route, request builder, response handler): the builder
+# returns one student's request, the handler folds a 200 response into its state
+def _login(student):
+    return "POST", "/auth/login", {"email": student["email"], "password": PASSWORD}
+
+def _available(student):
+    return "GET", "/student/quizzes/available", None
+
+def _start(student):
+    return "GET", f"/student/quizzes/{student['quiz_id']}/start", None
+
+def _autosave(student):
+    question = student["rng"].choice(student["questions"])
+    return "PUT", f"/student/quizzes/{student['quiz_id']}/answers", {"answers": {str(question): student["rng"].randrange(1, 5)}}
+
+def _submit(student):
+    answers = {str(question): student["rng"].randrange(1, 5) for question in student["questions"]}
+    return "POST", f"/student/quizzes/{student['quiz_id']}/submit", {"answers": answers}
+
+def _performance(student):
+    return "GET", "/student/performance", None
+
+def _after_login(student, body):
+    student["token"] = body.get("token") if body else None
+
+def _after_start(student, body):
+    student["questions"] = [question["id"] for question in (body or {}).get("questions", [])]
+
+STEPS = [
+    ("login", _login, _after_login),
+    ("available", _available, None),
+    ("start", _start, _after_start),
+    ("autosave", _autosave, None),
+    ("submit", _submit, None),
+    ("performance", _performance, None),
+]
+
+def run_wave(transport, metrics, students, name, build, after, concurrency):
+    def call(student):
+        if name != "login" and not student.get("token"):
+            return None  # the student never got in; already counted as a login error
+        if name in ("autosave", "submit") and not student.get("questions"):
+            return None
+        method, path, body = build(student)
+        started = time.perf_counter()
+        status, payload = transport.request(method, path, body, student.get("token"))
+        latency = time.perf_counter() - started
+        if after and status == 200:
+            after(student, payload)
+        return status, latency
+
+    before = metrics.snapshot()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        outcomes = [outcome for outcome in executor.map(call, students) if outcome is not None]
+    elapsed = time.perf_counter() - started
+    after_snapshot = metrics.snapshot()
+
+    # Every endpoint whose counters moved during this wave belongs to it,
+    # except the metrics reads themselves
+    requests = statements = 0
+    for endpoint, stats in after_snapshot.items():
+        if endpoint == "admin.get_metrics":
+            continue
+        previous = before.get(endpoint, {})
+        requests += stats["requests"] - previous.get("requests", 0)
+        statements += stats["sql_statements"] - previous.get("sql_statements", 0)
+
+    latencies = sorted(latency * 1000 for _, latency in outcomes)
+    statuses = {}
+    for status, _ in outcomes:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    errors = sum(n for status, n in statuses.items() if not 200 <= int(status) < 300)
+    return {
+        "requests": len(outcomes),
+        "errors": errors,
+        "error_rate": round(errors / len(outcomes), 4) if outcomes else None,
+        "statuses": statuses,
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(outcomes) / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "p50": _round(percentile(latencies, 50)),
+            "p95": _round(percentile(latencies, 95)),
+            "p99": _round(percentile(latencies, 99)),
+            "max": _round(latencies[-1] if latencies else None),
+            "mean": _round(sum(latencies) / len(latencies) if latencies else None)
+        },
+        "sql_statements": statements,
+        "sql_per_request": round(statements / requests, 2) if requests else None
+    }
+
+def _round(value):
+    return round(value, 2) if value is not None else None
+
+def run_scenario(transport, metrics, students, wave_quiz_id, concurrency, autosaves, seed):
+    cohort = [
+        {"email": student_email(i), "quiz_id": wave_quiz_id, "rng": random.Random(f"{seed}:{i}")}
+        for i in range(students)
+    ]
+    routes = {}
+    for name, build, after in STEPS:
+        # Autosaves arrive as one burst of `autosaves` saves per student
+        wave = cohort * autosaves if name == "autosave" else cohort
+        if wave:
+            routes[name] = run_wave(transport, metrics, wave, name, build, after, concurrency)
+    return routes
+
+# (metric path, higher is worse)
+COMPARED = [
+    (("latency_ms", "p50"), True),
+    (("latency_ms", "p95"), True),
+    (("latency_ms", "p99"), True),
+    (("throughput_rps",), False),
+    (("error_rate",), True),
+    (("sql_per_request",), True),
+]
+
+def _get(route, path):
+    for key in path:
+        route = (route or {}).get(key)
+    return route
+
+def compare_reports(baseline, current, tolerance):
+    """Return (rows, regressions) comparing each route's metrics against a baseline report."""
+    rows, regressions = [], []
+    for name, route in current["routes"].items():
+        old_route = baseline.get("routes", {}).get(name)
+        if old_route is None:
+            continue
+        for path, higher_is_worse in COMPARED:
+            old, new = _get(old_route, path), _get(route, path)
+            if old is None or new is None:
+                continue
+            change = (new - old) / old if old else (math.inf if new > old else 0.0)
+            worse = change > tolerance if higher_is_worse else change < -tolerance
+            # Error rates and SQL counts regress on any increase from zero
+            if path in (("error_rate",), ("sql_per_request",)):
+                worse = new > old * (1 + tolerance) and new - old > 1e-9
+            metric = ".".join(path)
+            rows.append((name, metric, old, new, change))
+            if worse:
+                regressions.append((name, metric, old, new))
+    return rows, regressions
+
+def _print_report(report, out=print):
+    out(f"{'route':12} {'requests':>8} {'errors':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'sql/req':>7}")
+    for name, route in report["routes"].items():
+        latency = route["latency_ms"]
+        out(f"{name:12} {route['requests']:8} {route['errors']:6} {route['throughput_rps'] or 0:8} "
+            f"{latency['p50'] or 0:8} {latency['p95'] or 0:8} {latency['p99'] or 0:8} {route['sql_per_request'] or 0:7}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--students", type=int, help="Cohort size; defaults to every student of the scale")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--autosaves", type=int, default=0, help="Autosave waves between start and submit")
+    parser.add_argument("--transport", choices=["client", "server"], default="client")
+    parser.add_argument("--base-url", help="Drive a running backend instead of seeding a local one")
+    parser.add_argument("--wave-quiz", type=int, help="Wave quiz id on the --base-url server (printed by synthetic_data)")
+    parser.add_argument("--output", help="Report path; defaults to benchmarks/results/exam_wave-<time>.json")
+    parser.add_argument("--baseline", help="Earlier report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression (0.2 = 20%%)")
+    parser.add_argument("--label", help="Free-form note stored in the report, e.g. a commit or setting")
+    args = parser.parse_args(argv)
+
+    scale = SCALES[args.scale]
+    db_path = server = None
+    seeded = None
+    if args.base_url:
+        if not args.wave_quiz:
+            parser.error("--base-url needs --wave-quiz")
+        transport = HttpTransport(args.base_url)
+        metrics = RemoteMetrics(transport)
+        wave_quiz_id = args.wave_quiz
+        students = args.students or scale["students"]
+        database = None
+    else:
+        db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        db_file.close()
+        db_path = db_file.name
+        os.environ["DATABASE_URL"] = f"sqlite:///{db_path}"
+        from app import create_app
+        app = create_app()
+        with app.app_context():
+            seeded = generate(seed=args.seed, **scale)
+            database = app.extensions["sqlalchemy"].engine.dialect.name
+        wave_quiz_id = seeded["wave_quiz_id"]
+        students = min(args.students or scale["students"], scale["students"])
+        if args.transport == "server":
+            server = LocalServer(app)
+            transport = HttpTransport(server.base_url)
+        else:
+            transport = TestClientTransport(app)
+        metrics = InProcessMetrics(app)
+
+    try:
+        started_at = datetime.utcnow()
+        routes = run_scenario(transport, metrics, students, wave_quiz_id, args.concurrency, args.autosaves, args.seed)
+    finally:
+        if server:
+            server.close()
+        if db_path:
+            os.remove(db_path)
+
+    report = {
+        "benchmark": "exam_wave",
+        "label": args.label,
+        "started_at": started_at.isoformat(),
+        "config": {
+            "scale": args.scale if not args.base_url else None,
+            "seed": args.seed,
+            "students": students,
+            "concurrency": args.concurrency,
+            "autosaves": args.autosaves,
+            "transport": "http" if args.base_url else args.transport,
+            "base_url": args.base_url,
+            "wave_quiz_id": wave_quiz_id
+        },
+        "data": seeded,
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "database": database
+        },
+        "routes": routes
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"exam_wave-{started_at:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    _print_report(report)
+    print(f"Report saved to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        differing = [key for key in ("scale", "students", "concurrency", "transport")
+                     if baseline.get("config", {}).get(key) != report["config"][key]]
+        if differing:
+            print(f"Note: the baseline ran with a different {', '.join(differing)}")
+        rows, regressions = compare_reports(baseline, report, args.tolerance)
+        for name, metric, old, new, change in rows:
+            print(f"{name:12} {metric:20} {old:>10} -> {new:<10} {change:+.1%}")
+        if regressions:
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for name, metric, old, new in regressions:
+                print(f"  {name} {metric}: {old} -> {new}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Cold-start cost of the web process and the Celery worker.
+
+    python -m benchmarks.import_time --runs 5 --top 15
+
+Each run starts a fresh interpreter with ``-X importtime`` and imports the
+module the process boots from (``app`` for the web process, ``tasks`` for
+the worker), then reports the total and the slowest modules by cumulative
+time. A second set of runs measures what a task pays once the module is
+imported: building the per-process app on the first call versus pushing an
+app context on every call after that.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+TASK_OVERHEAD_SCRIPT = """
+import json, time
+import tasks
+started = time.perf_counter()
+app = tasks.get_flask_app()
+first = time.perf_counter() - started
+calls = 200
+started = time.perf_counter()
+for _ in range(calls):
+    with tasks.get_flask_app().app_context():
+        pass
+print(json.dumps({"first_app_ms": first * 1000, "per_task_ms": (time.perf_counter() - started) * 1000 / calls}))
+"""
+
+def parse_importtime(stderr):
+    """Return {module: cumulative microseconds} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        name = name.strip()
+        cumulative = int(cumulative)
+        # A module imported twice keeps its first (real) cost
+        modules.setdefault(name, cumulative)
+    return modules
+
+def import_once(module):
+    env = dict(os.environ, DATABASE_URL=os.environ.get("DATABASE_URL", "sqlite://"))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True
+    )
+    if proc.returncode:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+    modules = parse_importtime(proc.stderr)
+    return modules[module], modules
+
+def measure_import(module, runs, top):
+    totals = []
+    slowest = {}
+    for _ in range(runs):
+        total, modules = import_once(module)
+        totals.append(total / 1000)
+        for name, cumulative in modules.items():
+            slowest.setdefault(name, []).append(cumulative / 1000)
+    ranked = sorted(
+        ((name, statistics.median(times)) for name, times in slowest.items() if name != module),
+        key=lambda item: item[1], reverse=True
+    )
+    return {
+        "module": module,
+        "median_ms": round(statistics.median(totals), 1),
+        "min_ms": round(min(totals), 1),
+        "top_modules": [{"module": name, "cumulative_ms": round(ms, 1)} for name, ms in ranked[:top]]
+    }
+
+def measure_task_overhead(runs):
+    env = dict(os.environ, DATABASE_URL=os.environ.get("DATABASE_URL", "sqlite://"))
+    samples = []
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-c", TASK_OVERHEAD_SCRIPT],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        samples.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    return {
+        "first_app_ms": round(statistics.median(s["first_app_ms"] for s in samples), 2),
+        "per_task_ms": round(statistics.median(s["per_task_ms"] for s in samples), 4)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    print(json.dumps({
+        "web": measure_import("app", args.runs, args.top),
+        "worker": measure_import("tasks", args.runs, args.top),
+        "task_overhead": measure_task_overhead(args.runs)
+    }, indent=2))
+
+if __name__ == "__main__":
+    sys.exit(main())
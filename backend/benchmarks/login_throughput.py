@@ -0,0 +1,93 @@
+"""Login throughput per core against the size of the password-hashing pool.
+
+    python -m benchmarks.login_throughput --workers 0 1 2 4 --logins 200
+
+Each run swaps in a PasswordHasher with the given number of pool workers
+(0 = hash on the request thread, the old behaviour) and fires concurrent
+POST /auth/login requests through the Flask test client against a
+throwaway SQLite file.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+USERS = 20
+PASSWORD = "Bench#Pass1"
+
+def seed_users(app):
+    from models import db, User
+    from password_hashing import hash_password
+
+    with app.app_context():
+        db.create_all()
+        password_hash = hash_password(PASSWORD)
+        db.session.add_all([
+            User(username=f"bench{i}", email=f"bench{i}@example.com", password_hash=password_hash)
+            for i in range(USERS)
+        ])
+        db.session.commit()
+
+def measure(app, workers, logins, concurrency):
+    from password_hashing import create_hasher
+
+    config = dict(app.config, PASSWORD_HASH_WORKERS=workers)
+    previous = app.extensions.get("password_hasher")
+    hasher = app.extensions["password_hasher"] = create_hasher(config)
+    # Warm the pool so process start-up is not measured
+    for _ in range(max(workers, 1)):
+        hasher.hash("warm-up")
+
+    def login(i):
+        client = app.test_client()
+        response = client.post("/auth/login", json={"email": f"bench{i % USERS}@example.com", "password": PASSWORD})
+        return response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        statuses = list(executor.map(login, range(logins)))
+    elapsed = time.perf_counter() - started
+
+    hasher.shutdown()
+    app.extensions["password_hasher"] = previous
+
+    throughput = logins / elapsed
+    cores = min(max(workers, 1), os.cpu_count() or 1)
+    return {
+        "workers": workers,
+        "logins": logins,
+        "seconds": round(elapsed, 3),
+        "logins_per_second": round(throughput, 1),
+        "logins_per_second_per_core": round(throughput / cores, 1),
+        "errors": sum(1 for status in statuses if status != 200),
+        "busy": sum(1 for status in statuses if status == 503)
+    }
+
+def run(app, worker_counts, logins, concurrency):
+    seed_users(app)
+    return [measure(app, workers, logins, concurrency) for workers in worker_counts]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 1, 2, 4])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args(argv)
+
+    db_file = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    db_file.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{db_file.name}"
+    try:
+        from app import create_app
+        app = create_app()
+        results = run(app, args.workers, args.logins, args.concurrency)
+    finally:
+        os.remove(db_file.name)
+
+    print(json.dumps({"cpu_count": os.cpu_count(), "results": results}, indent=2))
+
+if __name__ == "__main__":
+    sys.exit(main())
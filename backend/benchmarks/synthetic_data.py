@@ -0,0 +1,171 @@
+"""Seeded synthetic catalog, students and score history for benchmarks.
+
+    python -m benchmarks.synthetic_data --scale medium --database-url sqlite:///bench.db
+
+Fills an empty database with subjects, chapters, quizzes, questions, students
+and historical scores (with packed responses, so item analysis has data), then
+rebuilds the counters and rollups the app maintains incrementally. The same
+seed always produces the same data. One extra "wave" quiz dated today has no
+scores yet; the exam-wave driver sends the whole cohort through it.
+"""
+import argparse
+import os
+import random
+import sys
+from array import array
+from datetime import date, datetime, timedelta
+
+PASSWORD = "Bench#Pass1"
+ADMIN_EMAIL = "admin@bench.example.com"
+
+# Per scale: subjects, chapters per subject, quizzes per chapter, questions per
+# quiz, students, and how many past quizzes each student has a score for
+SCALES = {
+    "tiny": dict(subjects=1, chapters=2, quizzes=3, questions=5, students=20, history=2),
+    "small": dict(subjects=2, chapters=3, quizzes=5, questions=10, students=200, history=5),
+    "medium": dict(subjects=5, chapters=5, quizzes=10, questions=20, students=2000, history=20),
+    "large": dict(subjects=10, chapters=10, quizzes=20, questions=25, students=20000, history=50),
+}
+
+BATCH = 5000
+
+def student_email(i):
+    return f"student{i}@bench.example.com"
+
+def _insert(model, rows):
+    from models import db
+    from sqlalchemy import insert
+
+    for start in range(0, len(rows), BATCH):
+        db.session.execute(insert(model), rows[start:start + BATCH])
+
+def generate(subjects, chapters, quizzes, questions, students, history, seed=0, password=PASSWORD):
+    """Seed the app's (empty) database and return a summary including the wave quiz id.
+
+    Ids are assigned here rather than by the database so rows can be inserted
+    in bulk; the database must therefore start empty.
+    """
+    from models import db, User, Subject, Chapter, Quiz, Question, Score
+    from answer_keys import AnswerKey
+    from password_hashing import hash_password
+    from counters import recompute_counters
+    from rollups import rebuild_rollups, rebuild_student_stats
+
+    db.create_all()
+    if db.session.query(User.id).first() is not None:
+        raise RuntimeError("Synthetic data needs an empty database")
+
+    rng = random.Random(seed)
+    today = date.today()
+    now = datetime.utcnow()
+
+    # Every account shares one hash; logins still pay the full verification cost
+    password_hash = hash_password(password)
+    _insert(User, [{"id": 1, "username": "bench_admin", "email": ADMIN_EMAIL,
+                    "password_hash": password_hash, "role": "admin", "last_visited_at": now}])
+    _insert(User, [
+        {"id": i + 2, "username": f"student{i}", "email": student_email(i), "password_hash": password_hash,
+         "role": "student", "dob": date(2000, 1, 1) + timedelta(days=rng.randrange(3650)),
+         "last_visited_at": now - timedelta(hours=rng.randrange(24 * 30))}
+        for i in range(students)
+    ])
+
+    subject_rows, chapter_rows, quiz_rows, question_rows = [], [], [], []
+    keys = {}  # quiz_id -> AnswerKey, for packing historical responses
+    for s in range(subjects):
+        subject_id = s + 1
+        subject_rows.append({"id": subject_id, "name": f"Subject {s}", "description": "Synthetic"})
+        for c in range(chapters):
+            chapter_id = len(chapter_rows) + 1
+            chapter_rows.append({"id": chapter_id, "subject_id": subject_id, "name": f"Chapter {s}.{c}",
+                                 "description": "Synthetic"})
+            for _ in range(quizzes):
+                quiz_id = len(quiz_rows) + 1
+                quiz_rows.append({"id": quiz_id, "chapter_id": chapter_id, "time_duration": 30,
+                                  "date_of_quiz": today - timedelta(days=rng.randrange(1, 365)),
+                                  "remarks": "Synthetic"})
+    # The wave quiz: available today, nobody has taken it yet
+    quiz_rows.append({"id": len(quiz_rows) + 1, "chapter_id": 1, "time_duration": 30,
+                      "date_of_quiz": today, "remarks": "Exam wave"})
+
+    for quiz in quiz_rows:
+        ids, correct = array("I"), array("B")
+        for q in range(questions):
+            option = rng.randrange(1, 5)
+            question_id = len(question_rows) + 1
+            question_rows.append({"id": question_id, "quiz_id": quiz["id"], "title": f"Q{q}",
+                                  "question_text": f"Synthetic question {question_id}?",
+                                  "option_1": "A", "option_2": "B", "option_3": "C", "option_4": "D",
+                                  "correct_option": option})
+            ids.append(question_id)
+            correct.append(option)
+        keys[quiz["id"]] = AnswerKey(quiz["chapter_id"], 0, ids, correct)
+
+    _insert(Subject, subject_rows)
+    _insert(Chapter, chapter_rows)
+    _insert(Quiz, quiz_rows)
+    _insert(Question, question_rows)
+
+    past_quizzes = [quiz["id"] for quiz in quiz_rows[:-1]]
+    history = min(history, len(past_quizzes))
+    score_rows, scores = [], 0
+    for i in range(students):
+        # Each student answers correctly with their own probability
+        ability = rng.uniform(0.3, 0.9)
+        for quiz_id in rng.sample(past_quizzes, history):
+            key = keys[quiz_id]
+            responses = array("B", (
+                correct if rng.random() < ability else rng.choice([o for o in range(5) if o != correct])
+                for correct in key.correct_options
+            ))
+            score_rows.append({
+                "user_id": i + 2, "quiz_id": quiz_id,
+                "total_scored": key.grade_responses(responses), "total_questions": len(key),
+                "timestamp": now - timedelta(minutes=rng.randrange(60 * 24 * 180)),
+                "responses": responses.tobytes(), "response_layout": key.layout
+            })
+        if len(score_rows) >= BATCH:
+            _insert(Score, score_rows)
+            scores += len(score_rows)
+            score_rows = []
+    _insert(Score, score_rows)
+    scores += len(score_rows)
+    db.session.commit()
+
+    recompute_counters()
+    rebuild_rollups()
+    rebuild_student_stats()
+    db.session.commit()
+
+    return {
+        "seed": seed,
+        "subjects": len(subject_rows),
+        "chapters": len(chapter_rows),
+        "quizzes": len(quiz_rows),
+        "questions": len(question_rows),
+        "students": students,
+        "scores": scores,
+        "wave_quiz_id": quiz_rows[-1]["id"]
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", choices=list(SCALES), default="small")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--database-url", help="Defaults to DATABASE_URL")
+    for name in SCALES["small"]:
+        parser.add_argument(f"--{name}", type=int, help=f"Override the scale's {name}")
+    args = parser.parse_args(argv)
+
+    if args.database_url:
+        os.environ["DATABASE_URL"] = args.database_url
+    scale = {name: getattr(args, name) or value for name, value in SCALES[args.scale].items()}
+
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        summary = generate(seed=args.seed, **scale)
+    print(summary)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+from sqlalchemy import delete, func, select, update
+from models import db, Subject, Chapter, Quiz, Score, SubjectScoreStats, ChapterScoreStats
+from rollups import remove_scores
+from answer_keys import invalidate_answer_keys
+from leaderboard import discard_leaderboards
+from response_cache import invalidate_cache_tags
+from content_versions import discard_quiz_payloads
+
+# Cascades happen in the database; nothing about to be deleted is in the session
+_UNSYNCHRONIZED = {"synchronize_session": False}
+
+# Subjects, chapters and quizzes are deleted with set-based statements: the
+# database cascades each row to its chapters, quizzes, questions, scores,
+# drafts and analyses (ON DELETE CASCADE), so nothing is loaded into the
+# session. The scores are taken out of the rollups first. Subjects too large
+# to delete inside a request go through delete_catalog_task in chunks.
+
+def subject_quiz_ids(subject_id):
+    return select(Quiz.id).join(Chapter, Chapter.id == Quiz.chapter_id).where(Chapter.subject_id == subject_id)
+
+def chapter_quiz_ids(chapter_id):
+    return select(Quiz.id).where(Quiz.chapter_id == chapter_id)
+
+def catalog_size(subject_id=None, chapter_id=None):
+    """Questions plus score attempts under a subject or chapter, read from the counters and rollups."""
+    if subject_id is not None:
+        questions = db.session.query(func.coalesce(func.sum(Chapter.question_count), 0)) \
+            .filter(Chapter.subject_id == subject_id).scalar()
+        attempts = db.session.query(SubjectScoreStats.attempts).filter_by(subject_id=subject_id).scalar()
+    else:
+        questions = db.session.query(Chapter.question_count).filter_by(id=chapter_id).scalar()
+        attempts = db.session.query(ChapterScoreStats.attempts).filter_by(chapter_id=chapter_id).scalar()
+    return (questions or 0) + (attempts or 0)
+
+def delete_quizzes(quiz_ids):
+    """Delete quizzes (ids, or a SELECT of ids) in the caller's transaction, keeping chapter counters right."""
+    remove_scores(Score.quiz_id.in_(quiz_ids))
+    removed = db.session.query(Quiz.chapter_id, func.count(Quiz.id), func.sum(Quiz.question_count)) \
+        .filter(Quiz.id.in_(quiz_ids)).group_by(Quiz.chapter_id).all()
+    for chapter_id, quizzes, questions in removed:
+        db.session.execute(
+            update(Chapter).where(Chapter.id == chapter_id)
+            .values(quiz_count=Chapter.quiz_count - quizzes, question_count=Chapter.question_count - questions)
+        )
+    db.session.execute(delete(Quiz).where(Quiz.id.in_(quiz_ids)), execution_options=_UNSYNCHRONIZED)
+
+def delete_chapter(chapter_id):
+    remove_scores(Score.quiz_id.in_(chapter_quiz_ids(chapter_id)))
+    db.session.execute(delete(Chapter).where(Chapter.id == chapter_id), execution_options=_UNSYNCHRONIZED)
+
+def delete_subject(subject_id):
+    remove_scores(Score.quiz_id.in_(subject_quiz_ids(subject_id)))
+    db.session.execute(delete(Subject).where(Subject.id == subject_id), execution_options=_UNSYNCHRONIZED)
+
+def delete_in_chunks(subject_id=None, chapter_id=None, chunk_size=50, on_chunk=None):
+    """Delete a subject or chapter chunk_size quizzes per transaction, then the
+    (by then small) subject or chapter itself.
+
+    on_chunk(quiz_ids, deleted, total) runs after each chunk commits. Returns
+    the ids of the deleted quizzes.
+    """
+    quiz_ids = subject_quiz_ids(subject_id) if subject_id is not None else chapter_quiz_ids(chapter_id)
+    quiz_ids = [quiz_id for quiz_id, in db.session.execute(quiz_ids.order_by(Quiz.id))]
+    for start in range(0, len(quiz_ids), chunk_size):
+        chunk = quiz_ids[start:start + chunk_size]
+        delete_quizzes(chunk)
+        db.session.commit()
+        if on_chunk:
+            on_chunk(chunk, start + len(chunk), len(quiz_ids))
+    if subject_id is not None:
+        delete_subject(subject_id)
+    else:
+        delete_chapter(chapter_id)
+    db.session.commit()
+    return quiz_ids
+
+def forget_deleted(quiz_ids, subject_id=None, chapter_id=None):
+    """Drop this process's cached answer keys, leaderboards, quiz payloads and responses for a deletion.
+
+    A deletion run by the Celery worker only reaches the web processes' stores
+    when they are shared, so the status route repeats this once it succeeds.
+    """
+    invalidate_answer_keys(*quiz_ids)
+    discard_leaderboards(*quiz_ids)
+    discard_quiz_payloads(*quiz_ids)
+    if subject_id is not None:
+        invalidate_cache_tags("subjects", f"subject:{subject_id}")
+    if chapter_id is not None:
+        invalidate_cache_tags(f"chapter:{chapter_id}")
@@ -5,12 +5,71 @@ load_dotenv()
 
 class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'supersecretkey')
+    # Web worker processes (gunicorn reads the same variable); per-process stores are only
+    # correct with 1
+    WEB_CONCURRENCY = int(os.getenv('WEB_CONCURRENCY', 1))
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///quizmaster.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
     CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0')
     APP_BASE_URL = os.getenv('APP_BASE_URL', 'http://localhost:5000')
     MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', '23f2003015@ds.study.iitm.ac.in')
+    ANSWER_KEY_CACHE_URL = os.getenv('ANSWER_KEY_CACHE_URL')  # e.g. redis://localhost:6379/1; unset keeps keys in-process
+    ANSWER_KEY_CACHE_TTL = int(os.getenv('ANSWER_KEY_CACHE_TTL', 3600))
+    METRICS_SLOW_QUERY_MS = float(os.getenv('METRICS_SLOW_QUERY_MS', 100))
+    METRICS_SLOW_QUERY_SAMPLES = int(os.getenv('METRICS_SLOW_QUERY_SAMPLES', 100))
+    # Any werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000";
+    # stored hashes using other parameters are upgraded on the next login
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')
+    # Hashing processes per app process; 0 hashes inline (dev server, tests). In production
+    # set it to the cores left for hashing, e.g. the CPU count
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', 0))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 0)) or None
+    PASSWORD_HASH_QUEUE_TIMEOUT = float(os.getenv('PASSWORD_HASH_QUEUE_TIMEOUT', 2.0))
+    QUIZ_PAYLOAD_CACHE_SIZE = int(os.getenv('QUIZ_PAYLOAD_CACHE_SIZE', 256))
+    QUIZ_PAYLOAD_URL = os.getenv('QUIZ_PAYLOAD_URL')  # redis://... shares exam payloads (and pre-warming) across processes
+    QUIZ_PAYLOAD_TTL = int(os.getenv('QUIZ_PAYLOAD_TTL', 24 * 3600))
+    QUIZ_PREWARM_AHEAD = int(os.getenv('QUIZ_PREWARM_AHEAD', 3600))  # seconds before a quiz opens
+    QUIZ_PREWARM_INTERVAL = int(os.getenv('QUIZ_PREWARM_INTERVAL', 300))  # beat schedule for the pre-warm task
+    RESPONSE_CACHE_ENABLED = os.getenv('RESPONSE_CACHE_ENABLED', '1') != '0'
+    RESPONSE_CACHE_URL = os.getenv('RESPONSE_CACHE_URL')  # redis://..., fakeredis:// in tests; unset keeps an in-process LRU
+    RESPONSE_CACHE_TTL = int(os.getenv('RESPONSE_CACHE_TTL', 300))
+    RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv('RESPONSE_CACHE_MAX_ENTRIES', 1024))
+    # redis://...; unset keeps an in-process board per process, which is only correct with a
+    # single web process: with more, ranks depend on which worker answers
+    LEADERBOARD_URL = os.getenv('LEADERBOARD_URL')
+    LEADERBOARD_TOP_N = int(os.getenv('LEADERBOARD_TOP_N', 10))
+    # Build the boards from Score on a background thread (0: inline on first use, for tests)
+    LEADERBOARD_BACKGROUND_BUILD = os.getenv('LEADERBOARD_BACKGROUND_BUILD', '1') != '0'
+    # redis://... shares the buffer across processes; unset buffers in-process, single web worker only
+    AUTOSAVE_URL = os.getenv('AUTOSAVE_URL')
+    AUTOSAVE_FLUSH_INTERVAL = float(os.getenv('AUTOSAVE_FLUSH_INTERVAL', 2.0))  # seconds; 0 disables the background flusher
+    AUTOSAVE_BATCH_SIZE = int(os.getenv('AUTOSAVE_BATCH_SIZE', 500))
+    AUTOSAVE_TTL = int(os.getenv('AUTOSAVE_TTL', 6 * 3600))
+    # File-backed SQLite only: WAL, tuned pragmas and a sized pool
+    SQLITE_PRODUCTION_MODE = os.getenv('SQLITE_PRODUCTION_MODE', '1') != '0'
+    # One writer thread per process for submits, logins and autosave flushes only; admin
+    # CRUD, imports and Celery tasks still commit directly and rely on the busy timeout
+    SQLITE_WRITE_QUEUE = os.getenv('SQLITE_WRITE_QUEUE', '0') == '1'
+    SQLITE_WRITE_BATCH_SIZE = int(os.getenv('SQLITE_WRITE_BATCH_SIZE', 64))
+    SQLITE_WRITE_LINGER_MS = float(os.getenv('SQLITE_WRITE_LINGER_MS', 0))  # wait this long for a batch to fill
+    SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    SQLITE_POOL_SIZE = int(os.getenv('SQLITE_POOL_SIZE', 8))
+    SQLITE_MAX_OVERFLOW = int(os.getenv('SQLITE_MAX_OVERFLOW', 8))
+    SQLITE_POOL_TIMEOUT = float(os.getenv('SQLITE_POOL_TIMEOUT', 30))
+    # Read-only handlers and tasks read from READ_REPLICA_URL, or from a refreshed
+    # mode=ro snapshot of a file-backed SQLite primary when SQLITE_READ_SNAPSHOT=1
+    READ_REPLICA_URL = os.getenv('READ_REPLICA_URL')
+    READ_REPLICA_MAX_LAG = float(os.getenv('READ_REPLICA_MAX_LAG', 60))  # seconds; reads fall back to the primary beyond this, 0 = no limit
+    READ_REPLICA_HEARTBEAT_INTERVAL = float(os.getenv('READ_REPLICA_HEARTBEAT_INTERVAL', 5))
+    SQLITE_READ_SNAPSHOT = os.getenv('SQLITE_READ_SNAPSHOT', '0') == '1'
+    SQLITE_SNAPSHOT_INTERVAL = float(os.getenv('SQLITE_SNAPSHOT_INTERVAL', 30))  # written by Celery beat, read by every process
+    SQLITE_SNAPSHOT_DIR = os.getenv('SQLITE_SNAPSHOT_DIR')  # defaults to the primary's directory
+    # Subject/chapter deletes covering more questions plus attempts than this run as a chunked Celery task
+    CATALOG_DELETE_ASYNC_ROWS = int(os.getenv('CATALOG_DELETE_ASYNC_ROWS', 20000))
+    CATALOG_DELETE_CHUNK_QUIZZES = int(os.getenv('CATALOG_DELETE_CHUNK_QUIZZES', 50))
     broker_connection_retry_on_startup = True
 
     
\ No newline at end of file
@@ -0,0 +1,274 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from flask import current_app, request
+from sqlalchemy import func, select, update
+from models import db, Chapter, Quiz
+from loader_profiles import loader_options
+
+try:
+    import redis
+except ImportError:  # Redis is optional; payloads stay per-process without it
+    redis = None
+
+# Every quiz carries a content_version that admin mutations bump in their own
+# transaction. Student payloads are tagged with it, so a client holding the
+# current ETag gets a 304 without question rows being read, and each version
+# is serialized once per process no matter how many students fetch it.
+
+def bump_quiz_versions(*quiz_ids):
+    if quiz_ids:
+        db.session.execute(
+            update(Quiz).where(Quiz.id.in_(quiz_ids))
+            .values(content_version=Quiz.content_version + 1)
+        )
+
+def bump_chapter_versions(chapter_id):
+    # Chapter and subject names are part of the student catalog payload
+    db.session.execute(
+        update(Quiz).where(Quiz.chapter_id == chapter_id)
+        .values(content_version=Quiz.content_version + 1)
+    )
+
+def bump_subject_versions(subject_id):
+    chapter_ids = select(Chapter.id).where(Chapter.subject_id == subject_id)
+    db.session.execute(
+        update(Quiz).where(Quiz.chapter_id.in_(chapter_ids))
+        .values(content_version=Quiz.content_version + 1)
+    )
+
+def quiz_etag(quiz_id, version):
+    return f"quiz-{quiz_id}-v{version}"
+
+def _etag_prefix(quiz_id):
+    return quiz_etag(quiz_id, "")
+
+def available_quizzes_etag(now=None):
+    """One aggregate over the quiz table; changes whenever a quiz becomes available,
+    is added or removed, or has its content (or its chapter/subject) edited.
+
+    The day is part of the tag, so a deletion and a quiz opening the next day
+    cannot cancel out; sum(id) fingerprints the set beyond count and max(id).
+    """
+    now = now or datetime.utcnow()
+    count, versions, last_id, id_sum = db.session.query(
+        func.count(Quiz.id),
+        func.coalesce(func.sum(Quiz.content_version), 0),
+        func.coalesce(func.max(Quiz.id), 0),
+        func.coalesce(func.sum(Quiz.id), 0)
+    ).filter(Quiz.date_of_quiz <= now).one()
+    return f"available-{now.date().isoformat()}-{count}-{last_id}-{id_sum}-{versions}"
+
+class PayloadCache:
+    """Small per-process LRU of serialized JSON bodies keyed by content version."""
+
+    def __init__(self, size):
+        self._size = size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def set(self, key, body):
+        with self._lock:
+            self._items[key] = body
+            self._items.move_to_end(key)
+            while len(self._items) > self._size:
+                self._items.popitem(last=False)
+
+    def discard_quizzes(self, quiz_ids):
+        prefixes = tuple(_etag_prefix(quiz_id) for quiz_id in quiz_ids)
+        with self._lock:
+            for key in [key for key in self._items if key.startswith(prefixes)]:
+                del self._items[key]
+
+def get_payload_cache():
+    cache = current_app.extensions.get("quiz_payloads")
+    if cache is None:
+        cache = current_app.extensions["quiz_payloads"] = PayloadCache(
+            current_app.config.get("QUIZ_PAYLOAD_CACHE_SIZE", 256)
+        )
+    return cache
+
+class RedisPayloadStore:
+    """Serialized payloads shared by every process. Keys carry the content
+    version, so edits never invalidate entries; they are only left to expire,
+    or dropped when their quiz is deleted."""
+
+    def __init__(self, client, ttl, prefix="quiz_payload:"):
+        self._client = client
+        self._ttl = ttl
+        self._prefix = prefix
+
+    def get(self, key):
+        return self._client.get(self._prefix + key)
+
+    def set(self, key, body):
+        self._client.set(self._prefix + key, body, ex=self._ttl)
+
+    def discard_quizzes(self, quiz_ids):
+        for quiz_id in quiz_ids:
+            keys = list(self._client.scan_iter(match=f"{self._prefix}{_etag_prefix(quiz_id)}*"))
+            if keys:
+                self._client.delete(*keys)
+
+def _create_shared_store(app):
+    url = app.config.get("QUIZ_PAYLOAD_URL")
+    if not url:
+        return None
+    ttl = app.config.get("QUIZ_PAYLOAD_TTL", 24 * 3600)
+    if url.startswith("fakeredis://"):
+        import fakeredis
+        return RedisPayloadStore(fakeredis.FakeRedis(), ttl)
+    if redis is None:
+        raise RuntimeError("QUIZ_PAYLOAD_URL is set but the redis package is not installed")
+    return RedisPayloadStore(redis.Redis.from_url(url), ttl)
+
+def get_shared_payloads():
+    """The cross-process payload store, or None when QUIZ_PAYLOAD_URL is unset."""
+    app = current_app._get_current_object()
+    if "quiz_payload_store" not in app.extensions:
+        app.extensions.setdefault("quiz_payload_store", _create_shared_store(app))
+    return app.extensions["quiz_payload_store"]
+
+class SingleFlight:
+    """Concurrent calls with the same key share one execution: the first caller
+    runs fn, the rest wait for its result (or exception)."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.executions = 0
+        self.coalesced = 0
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+                self.executions += 1
+            else:
+                self.coalesced += 1
+        if leader:
+            try:
+                future.set_result(fn(*args))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    del self._calls[key]
+        return future.result()
+
+    def stats(self):
+        with self._lock:
+            return {"executions": self.executions, "coalesced": self.coalesced, "in_flight": len(self._calls)}
+
+def get_payload_flights():
+    app = current_app._get_current_object()
+    flights = app.extensions.get("quiz_payload_flights")
+    if flights is None:
+        flights = app.extensions.setdefault("quiz_payload_flights", SingleFlight())
+    return flights
+
+def _build_quiz_payload(quiz_id):
+    quiz = Quiz.query.options(*loader_options("exam")).get(quiz_id)
+    if quiz is None:
+        return None
+    body = serialize({
+        "questions": [{
+            "id": q.id,
+            "question": q.question_text,
+            "options": [q.option_1, q.option_2, q.option_3, q.option_4]
+        } for q in quiz.questions],
+        "duration": quiz.time_duration ,
+        "updated_at": quiz.date_of_quiz.isoformat()
+    })
+    # Tag with the version the rows were actually read at
+    return quiz_etag(quiz_id, quiz.content_version), body
+
+def _load_quiz_payload(etag, quiz_id):
+    shared = get_shared_payloads()
+    body = shared.get(etag) if shared is not None else None
+    if body is None:
+        built = _build_quiz_payload(quiz_id)
+        if built is None:
+            return None
+        etag, body = built
+        if shared is not None:
+            shared.set(etag, body)
+    get_payload_cache().set(etag, body)
+    return etag, body
+
+def quiz_payload(quiz_id, version):
+    """(etag, body) of the student exam payload, or None if the quiz is gone.
+
+    Served from this process's cache, then the shared store; on a miss,
+    concurrent requests for the same version wait on a single build.
+    """
+    etag = quiz_etag(quiz_id, version)
+    body = get_payload_cache().get(etag)
+    if body is not None:
+        return etag, body
+    return get_payload_flights().do(etag, _load_quiz_payload, etag, quiz_id)
+
+def prewarm_quiz_payloads(now=None):
+    """Put the payloads of quizzes opening within QUIZ_PREWARM_AHEAD seconds (or
+    already open today) into the shared store, so the crowd arriving when a quiz
+    opens never reads its questions. Returns how many payloads were built."""
+    shared = get_shared_payloads()
+    if shared is None:
+        return 0
+    now = now or datetime.utcnow()
+    horizon = now + timedelta(seconds=current_app.config.get("QUIZ_PREWARM_AHEAD", 3600))
+    quizzes = db.session.query(Quiz.id, Quiz.content_version).filter(
+        Quiz.date_of_quiz >= now.date(), Quiz.date_of_quiz <= horizon.date()
+    ).all()
+    built = 0
+    for quiz_id, version in quizzes:
+        if shared.get(quiz_etag(quiz_id, version)) is None:
+            built += _load_quiz_payload(quiz_etag(quiz_id, version), quiz_id) is not None
+    return built
+
+def discard_quiz_payloads(*quiz_ids):
+    """Drop deleted quizzes' payloads from this process's cache and the shared store."""
+    if not quiz_ids:
+        return
+    get_payload_cache().discard_quizzes(quiz_ids)
+    shared = get_shared_payloads()
+    if shared is not None:
+        shared.discard_quizzes(quiz_ids)
+
+def quiz_payload_stats():
+    shared = get_shared_payloads()
+    return dict(get_payload_flights().stats(), shared_store=type(shared).__name__ if shared is not None else None)
+
+def not_modified(etag):
+    """Answer If-None-Match with a bare 304 when the client already holds etag."""
+    if request.if_none_match.contains(etag):
+        response = current_app.response_class(status=304)
+        response.set_etag(etag)
+        response.headers["Cache-Control"] = "private, no-cache"
+        return response
+    return None
+
+def versioned_response(etag, body):
+    response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(etag)
+    # Authenticated payloads: browsers may keep them but must revalidate each time
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response
+
+def serialize(data):
+    return current_app.json.dumps(data).encode() + b"\n"
+
+def quiz_cache_tags(*quiz_ids):
+    """Response-cache tags covering the given quizzes and the chapters that count them."""
+    chapter_ids = db.session.query(Quiz.chapter_id).filter(Quiz.id.in_(quiz_ids)).distinct() if quiz_ids else []
+    return [f"quiz:{quiz_id}" for quiz_id in quiz_ids] + [f"chapter:{chapter_id}" for chapter_id, in chapter_ids]
@@ -0,0 +1,58 @@
+from sqlalchemy import func, select, update
+from models import db, Chapter, Quiz, Question
+
+# Denormalized counters are adjusted with in-place UPDATE expressions so that
+# they are written in the caller's transaction and never lose concurrent bumps.
+
+def question_added(quiz_id, delta=1):
+    chapter_id = select(Quiz.chapter_id).where(Quiz.id == quiz_id).scalar_subquery()
+    db.session.execute(
+        update(Quiz).where(Quiz.id == quiz_id)
+        .values(question_count=Quiz.question_count + delta)
+    )
+    db.session.execute(
+        update(Chapter).where(Chapter.id == chapter_id)
+        .values(question_count=Chapter.question_count + delta)
+    )
+
+def question_removed(quiz_id, delta=1):
+    question_added(quiz_id, -delta)
+
+def quiz_added(chapter_id, questions=0):
+    db.session.execute(
+        update(Chapter).where(Chapter.id == chapter_id)
+        .values(quiz_count=Chapter.quiz_count + 1,
+                question_count=Chapter.question_count + questions)
+    )
+
+def quiz_removed(chapter_id, questions=0):
+    db.session.execute(
+        update(Chapter).where(Chapter.id == chapter_id)
+        .values(quiz_count=Chapter.quiz_count - 1,
+                question_count=Chapter.question_count - questions)
+    )
+
+def recompute_counters():
+    """Rebuild every counter from the source tables in two set-based UPDATEs."""
+    db.session.execute(
+        update(Quiz).values(question_count=(
+            select(func.count(Question.id))
+            .where(Question.quiz_id == Quiz.id)
+            .scalar_subquery()
+        ))
+    )
+    db.session.execute(
+        update(Chapter).values(
+            quiz_count=(
+                select(func.count(Quiz.id))
+                .where(Quiz.chapter_id == Chapter.id)
+                .scalar_subquery()
+            ),
+            question_count=(
+                select(func.coalesce(func.sum(Quiz.question_count), 0))
+                .where(Quiz.chapter_id == Chapter.id)
+                .scalar_subquery()
+            )
+        )
+    )
+    db.session.commit()
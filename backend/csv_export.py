@@ -0,0 +1,79 @@
+import csv
+import io
+import zlib
+from flask import Response, stream_with_context
+from models import db, User, Chapter, Quiz, Score
+
+STREAM_BATCH_SIZE = 1000
+# Rows are encoded in groups so each yielded chunk is a few tens of KB
+ROWS_PER_CHUNK = 500
+
+SCORE_CSV_HEADER = ['Quiz ID', 'Chapter', 'Date', 'Score', 'Total', 'Percentage']
+COHORT_CSV_HEADER = ['User ID', 'Username', 'Email'] + SCORE_CSV_HEADER
+
+def _percentage(scored, total):
+    return f"{(scored / total) * 100:.2f}%" if total else ""
+
+def iter_user_score_rows(user_id):
+    """Stream one student's history as CSV rows straight from a server-side cursor."""
+    query = db.session.query(
+        Score.quiz_id, Chapter.name, Score.timestamp, Score.total_scored, Score.total_questions
+    ).join(Quiz, Quiz.id == Score.quiz_id).join(Chapter, Chapter.id == Quiz.chapter_id).filter(
+        Score.user_id == user_id
+    ).order_by(Score.timestamp).yield_per(STREAM_BATCH_SIZE)
+
+    for quiz_id, chapter, timestamp, scored, total in query:
+        yield [quiz_id, chapter, timestamp.date() if timestamp else "", scored, total, _percentage(scored, total)]
+
+def iter_cohort_score_rows():
+    """Stream every student's scores, ordered by user, for the admin cohort export."""
+    query = db.session.query(
+        User.id, User.username, User.email,
+        Score.quiz_id, Chapter.name, Score.timestamp, Score.total_scored, Score.total_questions
+    ).join(Score, Score.user_id == User.id).join(Quiz, Quiz.id == Score.quiz_id).join(
+        Chapter, Chapter.id == Quiz.chapter_id
+    ).filter(User.role == 'student').order_by(Score.user_id, Score.id).yield_per(STREAM_BATCH_SIZE)
+
+    for user_id, username, email, quiz_id, chapter, timestamp, scored, total in query:
+        yield [user_id, username, email, quiz_id, chapter, timestamp.date() if timestamp else "",
+               scored, total, _percentage(scored, total)]
+
+def iter_csv(header, rows):
+    """Encode rows as UTF-8 CSV, yielding bytes chunks; memory is bounded by ROWS_PER_CHUNK."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    pending = 1
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= ROWS_PER_CHUNK:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    if pending:
+        yield buffer.getvalue().encode("utf-8")
+
+def gzip_chunks(chunks):
+    """Compress a bytes stream on the fly into a single gzip member."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+def csv_response(header, rows, filename, compress=False):
+    """Stream rows as a CSV download, optionally gzip-compressed on the fly."""
+    chunks = iter_csv(header, rows)
+    mimetype = "text/csv"
+    if compress:
+        chunks = gzip_chunks(chunks)
+        filename += ".gz"
+        mimetype = "application/gzip"
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    )
@@ -0,0 +1,76 @@
+from datetime import timedelta
+from flask_mail import Message
+from sqlalchemy import delete
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+from models import db, User, Quiz, DailyReminderDelivery
+from extensions import mail, email_templates
+from loader_profiles import loader_options
+
+REMINDER_PAGE_SIZE = 500
+MARKER_RETENTION_DAYS = 7
+
+daily_reminder_template = email_templates.get_template("daily_remainder.html")
+
+def iter_inactive_student_pages(cutoff, page_size=REMINDER_PAGE_SIZE):
+    """Yield pages of inactive student ids, keyset-paginated on User.id."""
+    last_id = 0
+    while True:
+        page = [user_id for user_id, in db.session.query(User.id).filter(
+            User.role == 'student',
+            User.last_visited_at < cutoff,
+            User.id > last_id
+        ).order_by(User.id).limit(page_size)]
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last_id = page[-1]
+
+def claim_reminders(day, user_ids):
+    """Record the day's marker for each user and return only the ids this call claimed."""
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = dialect_insert(DailyReminderDelivery).values(
+            [{"user_id": user_id, "day": day} for user_id in user_ids]
+        ).on_conflict_do_nothing().returning(DailyReminderDelivery.user_id)
+        claimed = [user_id for user_id, in db.session.execute(stmt)]
+    else:
+        claimed = []
+        for user_id in user_ids:
+            try:
+                with db.session.begin_nested():
+                    db.session.add(DailyReminderDelivery(user_id=user_id, day=day))
+                claimed.append(user_id)
+            except IntegrityError:
+                pass
+    db.session.commit()
+    return claimed
+
+def send_reminder_page(day, user_ids):
+    # Markers are claimed before sending: a crash can skip a reminder but never doubles one
+    claimed = claim_reminders(day, user_ids)
+    if not claimed:
+        return 0
+
+    users = db.session.query(User.id, User.username, User.email).filter(User.id.in_(claimed)).all()
+    new_quizzes = Quiz.query.options(*loader_options("student_catalog")).filter(
+        Quiz.date_of_quiz > day - timedelta(days=1),
+        Quiz.date_of_quiz <= day
+    ).all()
+
+    with mail.connect() as connection:
+        for user in users:
+            connection.send(Message(
+                "Quiz Master - Daily Reminder",
+                recipients=[user.email],
+                html=daily_reminder_template.render(user=user, new_quizzes=new_quizzes)
+            ))
+    return len(users)
+
+def prune_reminder_markers(today):
+    db.session.execute(delete(DailyReminderDelivery).where(
+        DailyReminderDelivery.day < today - timedelta(days=MARKER_RETENTION_DAYS)
+    ))
+    db.session.commit()
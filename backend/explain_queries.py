@@ -0,0 +1,78 @@
+"""Print SQLite EXPLAIN QUERY PLAN output for the queries behind each hot route.
+
+Run `flask explain-queries` before and after `flask db upgrade`: every plan is
+shown against an index-free copy of the schema ("before") and against the
+configured database ("after"), and any remaining full table scans are flagged.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import MetaData, create_engine, select, text
+from models import db, User, Chapter, Quiz, Question, Score
+
+USER_ID = 1
+QUIZ_ID = 1
+NOW = datetime(2025, 1, 1)
+
+HOT_QUERIES = [
+    ("POST /auth/login", lambda: select(User).where(User.email == "student@example.com")),
+    ("GET /admin/subjects/<id>/chapters", lambda: select(Chapter).where(Chapter.subject_id == 1)),
+    ("GET /admin/quizzes", lambda: select(Quiz).where(Quiz.id > 0).order_by(Quiz.id).limit(51)),
+    ("GET /admin/quizzes include=questions", lambda: select(Question).where(Question.quiz_id.in_([1, 2, 3]))),
+    ("GET /admin/dashboard-stats recent", lambda: select(Score).order_by(Score.timestamp.desc()).limit(10)),
+    ("GET /student/quizzes/available", lambda: select(Quiz).where(Quiz.date_of_quiz <= NOW.date(), Quiz.id > 0)
+        .order_by(Quiz.id).limit(51)),
+    ("GET /student/quizzes/<id>/start", lambda: select(Question).where(Question.quiz_id == QUIZ_ID)),
+    ("POST /student/quizzes/<id>/submit answer key", lambda: select(Question.id, Question.correct_option)
+        .where(Question.quiz_id == QUIZ_ID).order_by(Question.id)),
+    ("GET /student/results", lambda: select(Score).where(Score.user_id == USER_ID)
+        .order_by(Score.timestamp.desc(), Score.id.desc()).limit(51)),
+    ("GET /student/results/<id>", lambda: select(Score).where(Score.user_id == USER_ID, Score.quiz_id == QUIZ_ID)),
+    ("GET /student/performance recent", lambda: select(Score).where(Score.user_id == USER_ID)
+        .order_by(Score.timestamp.desc()).limit(5)),
+    ("task send_daily_reminders", lambda: select(User).where(
+        User.role == "student", User.last_visited_at < NOW - timedelta(hours=24))),
+    ("task generate_monthly_reports", lambda: select(Score).where(
+        Score.timestamp >= NOW - timedelta(days=31), Score.timestamp < NOW)),
+    ("DELETE /admin/chapters/<id> quizzes", lambda: select(Quiz.id).where(Quiz.chapter_id == 1)),
+    ("leaderboard / item analysis", lambda: select(Score).where(Score.quiz_id == QUIZ_ID)),
+]
+
+def _baseline_engine():
+    """In-memory copy of the schema with every secondary index and the score uniqueness removed."""
+    metadata = MetaData()
+    for table in db.metadata.sorted_tables:
+        copy = table.to_metadata(metadata)
+        copy.indexes.clear()
+        for constraint in list(copy.constraints):
+            if getattr(constraint, "name", None) == "uq_score_user_quiz":
+                copy.constraints.discard(constraint)
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    return engine
+
+def explain(connection, statement):
+    compiled = statement.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+    rows = connection.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+    return [row[-1] for row in rows]
+
+def is_table_scan(detail):
+    # "SCAN quiz USING INDEX ..." walks an index, a bare "SCAN quiz" reads the table
+    return detail.startswith("SCAN ") and " USING " not in detail
+
+def explain_hot_queries(out=print):
+    """Print before/after plans and return the routes that still scan a table."""
+    if db.engine.dialect.name != "sqlite":
+        raise RuntimeError("EXPLAIN QUERY PLAN is only available on SQLite")
+
+    scanning = []
+    with _baseline_engine().connect() as before, db.engine.connect() as after:
+        for route, build in HOT_QUERIES:
+            statement = build()
+            before_plan = explain(before, statement)
+            after_plan = explain(after, statement)
+            out(route)
+            out("  before: " + "; ".join(before_plan))
+            out("  after:  " + "; ".join(after_plan))
+            if any(is_table_scan(detail) for detail in after_plan):
+                scanning.append(route)
+                out("  !! full table scan")
+    return scanning
@@ -1,3 +1,13 @@
+import os
 from flask_mail import Mail
+from flask_migrate import Migrate
+from jinja2 import Environment, FileSystemLoader, select_autoescape
 
-mail = Mail()
\ No newline at end of file
+mail = Mail()
+migrate = Migrate()
+
+# Email templates are compiled once per process and reused for every message
+email_templates = Environment(
+    loader=FileSystemLoader(os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates", "emails")),
+    autoescape=select_autoescape(["html"])
+)
@@ -0,0 +1,139 @@
+import json
+from datetime import datetime
+import numpy as np
+from sqlalchemy import func, select
+from models import db, Quiz, Score, ItemAnalysisResult
+from answer_keys import get_answer_key
+
+# Classical test theory statistics over the packed per-attempt responses.
+# Only attempts packed in the quiz's current question layout are analysed;
+# attempts taken before questions were added or removed are counted as stale.
+
+OPTIONS = 4
+# Items discriminating below this are worth a look
+LOW_DISCRIMINATION = 0.2
+
+def response_matrix(quiz_id, answer_key):
+    """Return (attempts x questions uint8 matrix of picked options, stale attempt count)."""
+    rows = db.session.execute(
+        select(Score.responses)
+        .where(Score.quiz_id == quiz_id, Score.response_layout == answer_key.layout)
+        .execution_options(yield_per=10000)
+    ).scalars()
+    width = len(answer_key)
+    blobs = [blob for blob in rows if blob is not None and len(blob) == width]
+    stale = db.session.query(func.count(Score.id)).filter(Score.quiz_id == quiz_id).scalar() - len(blobs)
+    matrix = np.frombuffer(b"".join(blobs), dtype=np.uint8).reshape(len(blobs), width)
+    return matrix, stale
+
+def _nullable(values):
+    return [None if np.isnan(value) else round(float(value), 4) for value in values]
+
+def analyse(matrix, correct_options):
+    """Vectorized item statistics for an attempts x questions matrix of picked options."""
+    attempts, items = matrix.shape
+    key = np.frombuffer(bytes(correct_options), dtype=np.uint8)
+    correct = (matrix == key).astype(np.float64)
+
+    difficulty = correct.mean(axis=0) if attempts else np.full(items, np.nan)
+
+    # Corrected point-biserial: each item against the total of the other items
+    totals = correct.sum(axis=1)
+    rest = totals[:, None] - correct
+    item_dev = correct - correct.mean(axis=0) if attempts else correct
+    rest_dev = rest - rest.mean(axis=0) if attempts else rest
+    with np.errstate(invalid="ignore", divide="ignore"):
+        discrimination = (item_dev * rest_dev).sum(axis=0) / np.sqrt(
+            (item_dev ** 2).sum(axis=0) * (rest_dev ** 2).sum(axis=0)
+        )
+
+    # Option counts per item in one bincount: row i holds [unanswered, 1, 2, 3, 4]
+    offsets = np.arange(items, dtype=np.int64) * (OPTIONS + 1)
+    counts = np.bincount((matrix.astype(np.int64) + offsets).ravel(),
+                         minlength=items * (OPTIONS + 1)).reshape(items, OPTIONS + 1)
+    frequencies = counts / attempts if attempts else counts.astype(np.float64)
+
+    alpha = None
+    if items > 1 and attempts > 1:
+        total_variance = totals.var(ddof=1)
+        if total_variance > 0:
+            alpha = round(float(items / (items - 1) * (1 - correct.var(axis=0, ddof=1).sum() / total_variance)), 4)
+
+    return {
+        "attempts": attempts,
+        "cronbach_alpha": alpha,
+        "difficulty": _nullable(difficulty),
+        "discrimination": _nullable(discrimination),
+        "option_frequencies": [[round(float(f), 4) for f in row] for row in frequencies]
+    }
+
+def compute_item_analysis(quiz_id):
+    answer_key = get_answer_key(quiz_id)
+    if answer_key is None:
+        return None
+    matrix, stale = response_matrix(quiz_id, answer_key)
+    stats = analyse(matrix, answer_key.correct_options)
+
+    items = []
+    for i, question_id in enumerate(answer_key.question_ids):
+        frequencies = stats["option_frequencies"][i]
+        discrimination = stats["discrimination"][i]
+        items.append({
+            "question_id": question_id,
+            "correct_option": answer_key.correct_options[i],
+            "difficulty": stats["difficulty"][i],
+            "discrimination": discrimination,
+            "options": {str(option): frequencies[option] for option in range(1, OPTIONS + 1)},
+            "unanswered": frequencies[0],
+            "flagged": discrimination is None or discrimination < LOW_DISCRIMINATION
+        })
+    return {
+        "quiz_id": quiz_id,
+        "attempts": stats["attempts"],
+        "stale_attempts": stale,
+        "cronbach_alpha": stats["cronbach_alpha"],
+        "items": items
+    }
+
+def get_item_analysis(quiz_id, refresh=False):
+    """Return the quiz's analysis, recomputing only when questions or attempts changed."""
+    quiz_version = db.session.query(Quiz.content_version).filter(Quiz.id == quiz_id).scalar()
+    if quiz_version is None:
+        return None
+    score_count = db.session.query(func.count(Score.id)).filter(Score.quiz_id == quiz_id).scalar()
+
+    cached = db.session.get(ItemAnalysisResult, quiz_id)
+    if cached and not refresh and cached.content_version == quiz_version and cached.score_count == score_count:
+        return json.loads(cached.result)
+
+    result = compute_item_analysis(quiz_id)
+    if result is None:
+        # Deleted since the version lookup
+        return None
+    result["computed_at"] = datetime.utcnow().isoformat()
+    if cached is None:
+        cached = ItemAnalysisResult(quiz_id=quiz_id)
+        db.session.add(cached)
+    cached.content_version = quiz_version
+    cached.score_count = score_count
+    cached.computed_at = datetime.utcnow()
+    cached.result = json.dumps(result)
+    db.session.commit()
+    return result
+
+def refresh_item_analyses():
+    """Recompute every quiz whose cached analysis no longer matches its version or attempt count."""
+    counts = select(Score.quiz_id, func.count(Score.id).label("score_count")).group_by(Score.quiz_id).subquery()
+    stale = db.session.execute(
+        select(counts.c.quiz_id)
+        .join(Quiz, Quiz.id == counts.c.quiz_id)
+        .outerjoin(ItemAnalysisResult, ItemAnalysisResult.quiz_id == counts.c.quiz_id)
+        .where(
+            (ItemAnalysisResult.quiz_id.is_(None))
+            | (ItemAnalysisResult.score_count != counts.c.score_count)
+            | (ItemAnalysisResult.content_version != Quiz.content_version)
+        )
+    ).scalars().all()
+    for quiz_id in stale:
+        get_item_analysis(quiz_id, refresh=True)
+    return len(stale)
@@ -0,0 +1,334 @@
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import select
+from models import db, Score
+
+try:
+    import redis
+except ImportError:  # Redis is optional; the in-process boards work without it
+    redis = None
+
+# Per-quiz leaderboards ordered by total_scored. Ties share a rank (1 + the
+# number of strictly better scores) and the percentile is the classic
+# percentile rank: (below + half of the ties) / participants.
+
+class _Node:
+    __slots__ = ("key", "priority", "size", "left", "right")
+
+    def __init__(self, key):
+        self.key = key
+        self.priority = random.random()
+        self.size = 1
+        self.left = None
+        self.right = None
+
+def _size(node):
+    return node.size if node else 0
+
+def _update(node):
+    node.size = 1 + _size(node.left) + _size(node.right)
+    return node
+
+def _split(node, key):
+    """Split into (keys < key, keys >= key)."""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        return _update(node), right
+    left, right = _split(node.left, key)
+    node.left = right
+    return left, _update(node)
+
+def _merge(left, right):
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        return _update(left)
+    right.left = _merge(left, right.left)
+    return _update(right)
+
+class OrderStatisticTree:
+    """Treap keyed by comparable tuples with subtree sizes, so counting keys
+    below a bound and walking the first n keys are O(log n) and O(log n + n)."""
+
+    def __init__(self):
+        self._root = None
+
+    def __len__(self):
+        return _size(self._root)
+
+    def insert(self, key):
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, _Node(key)), right)
+
+    def remove(self, key):
+        left, rest = _split(self._root, key)
+        _, right = _split(rest, (key[0], key[1] + 1))
+        self._root = _merge(left, right)
+
+    def count_less(self, key):
+        count, node = 0, self._root
+        while node:
+            if node.key < key:
+                count += _size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return count
+
+    def first(self, n):
+        keys, stack, node = [], [], self._root
+        while (stack or node) and len(keys) < n:
+            if node:
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop()
+                keys.append(node.key)
+                node = node.right
+        return keys
+
+class LocalLeaderboards:
+    """In-process boards for single-process deployments; each process holds its own copy."""
+
+    def __init__(self):
+        self._boards = {}  # quiz_id -> (tree of (-score, user_id), {user_id: score})
+        self._lock = threading.Lock()
+        self._rebuilding = threading.Lock()
+        self.built = False
+
+    def needs_rebuild(self):
+        return not self.built
+
+    def begin_rebuild(self):
+        return self._rebuilding.acquire(blocking=False)
+
+    def end_rebuild(self):
+        self._rebuilding.release()
+
+    def add(self, quiz_id, user_id, score):
+        with self._lock:
+            tree, members = self._boards.setdefault(quiz_id, (OrderStatisticTree(), {}))
+            if user_id in members:
+                tree.remove((-members[user_id], user_id))
+            members[user_id] = score
+            tree.insert((-score, user_id))
+
+    def standing(self, quiz_id, score):
+        """Return (better, equal, total) for a score on this quiz."""
+        with self._lock:
+            board = self._boards.get(quiz_id)
+            if board is None:
+                return 0, 0, 0
+            tree = board[0]
+            better = tree.count_less((-score, float("-inf")))
+            return better, tree.count_less((-score, float("inf"))) - better, len(tree)
+
+    def top(self, quiz_id, n):
+        with self._lock:
+            board = self._boards.get(quiz_id)
+            return [(user_id, -score) for score, user_id in board[0].first(n)] if board else []
+
+    def discard(self, *quiz_ids):
+        with self._lock:
+            for quiz_id in quiz_ids:
+                self._boards.pop(quiz_id, None)
+
+    def rebuild(self, rows):
+        boards = {}
+        for quiz_id, user_id, score in rows:
+            tree, members = boards.setdefault(quiz_id, (OrderStatisticTree(), {}))
+            members[user_id] = score or 0
+            tree.insert((-(score or 0), user_id))
+        with self._lock:
+            self._boards = boards
+            self.built = True
+
+class RedisLeaderboards:
+    """One sorted set per quiz (member user_id, score total_scored), shared by every process."""
+
+    def __init__(self, client, prefix="leaderboard:"):
+        self._client = client
+        self._prefix = prefix
+        self._built = False
+
+    def _key(self, quiz_id):
+        return f"{self._prefix}quiz:{quiz_id}"
+
+    def needs_rebuild(self):
+        # Once any process has built the boards this process stops asking
+        if not self._built:
+            self._built = bool(self._client.exists(f"{self._prefix}built"))
+        return not self._built
+
+    def add(self, quiz_id, user_id, score):
+        self._client.zadd(self._key(quiz_id), {user_id: score})
+
+    def standing(self, quiz_id, score):
+        pipe = self._client.pipeline(transaction=False)
+        pipe.zcount(self._key(quiz_id), f"({score}", "+inf")
+        pipe.zcount(self._key(quiz_id), score, score)
+        pipe.zcard(self._key(quiz_id))
+        better, equal, total = pipe.execute()
+        return better, equal, total
+
+    def top(self, quiz_id, n):
+        return [(int(user_id), int(score))
+                for user_id, score in self._client.zrevrange(self._key(quiz_id), 0, n - 1, withscores=True)]
+
+    def discard(self, *quiz_ids):
+        if quiz_ids:
+            self._client.delete(*[self._key(quiz_id) for quiz_id in quiz_ids])
+
+    def begin_rebuild(self):
+        # Only one process rebuilds; the others keep serving whatever is there
+        return bool(self._client.set(f"{self._prefix}rebuilding", 1, nx=True, ex=600))
+
+    def end_rebuild(self):
+        self._client.delete(f"{self._prefix}rebuilding")
+
+    def rebuild(self, rows):
+        stale = set(self._client.scan_iter(match=self._key("*"), count=1000))
+        pipe = self._client.pipeline(transaction=False)
+        current, members = None, {}
+
+        def flush():
+            if members:
+                staging = f"{self._key(current)}:rebuild"
+                pipe.delete(staging)
+                pipe.zadd(staging, members)
+                pipe.rename(staging, self._key(current))
+                pipe.execute()
+                stale.discard(self._key(current).encode())
+
+        # Rows arrive grouped by quiz, so each board is swapped in as soon as it is complete
+        for quiz_id, user_id, score in rows:
+            if quiz_id != current:
+                flush()
+                current, members = quiz_id, {}
+            members[user_id] = score or 0
+        flush()
+        if stale:
+            self._client.delete(*stale)
+        self._client.set(f"{self._prefix}built", 1)
+
+def _create_leaderboards(app):
+    url = app.config.get("LEADERBOARD_URL")
+    if not url:
+        if app.config.get("WEB_CONCURRENCY", 1) > 1:
+            app.logger.warning("LEADERBOARD_URL is unset with %s web workers: each worker ranks only "
+                               "the submissions it handled", app.config["WEB_CONCURRENCY"])
+        return LocalLeaderboards()
+    if url.startswith("fakeredis://"):
+        import fakeredis
+        return RedisLeaderboards(fakeredis.FakeRedis())
+    if redis is None:
+        raise RuntimeError("LEADERBOARD_URL is set but the redis package is not installed")
+    return RedisLeaderboards(redis.Redis.from_url(url))
+
+# A score's timestamp is set a moment before its submission commits
+REPLAY_SLACK = timedelta(minutes=1)
+
+def rebuild_leaderboards(boards=None):
+    """Reload every board from Score in one streamed pass ordered by quiz.
+
+    Returns False without reading Score when another thread or process is
+    already rebuilding. Scores submitted while the pass runs may be
+    overwritten when a rebuilt board is swapped in, so the recent ones are
+    added again afterwards.
+    """
+    boards = boards or _leaderboards()
+    if not boards.begin_rebuild():
+        return False
+    try:
+        started = datetime.utcnow()
+        rows = db.session.execute(
+            select(Score.quiz_id, Score.user_id, Score.total_scored)
+            .order_by(Score.quiz_id)
+            .execution_options(yield_per=5000)
+        )
+        boards.rebuild(rows)
+        # End the pass's read transaction so the replay sees scores committed since
+        db.session.commit()
+        for quiz_id, user_id, score in db.session.execute(
+            select(Score.quiz_id, Score.user_id, Score.total_scored)
+            .where(Score.timestamp >= started - REPLAY_SLACK)
+        ):
+            boards.add(quiz_id, user_id, score or 0)
+    finally:
+        boards.end_rebuild()
+    return True
+
+def _leaderboards():
+    app = current_app._get_current_object()
+    boards = app.extensions.get("leaderboards")
+    if boards is None:
+        boards = app.extensions.setdefault("leaderboards", _create_leaderboards(app))
+    return boards
+
+_build_lock = threading.Lock()
+BUILD_RETRY_SECONDS = 5
+
+def _start_builder(app, boards):
+    """Build the boards on a background thread, waiting out another process's rebuild."""
+    def run():
+        while boards.needs_rebuild():
+            with app.app_context():
+                try:
+                    if rebuild_leaderboards(boards):
+                        return
+                except Exception:
+                    app.logger.exception("Leaderboard build failed")
+                finally:
+                    db.session.remove()
+            time.sleep(BUILD_RETRY_SECONDS)
+
+    thread = threading.Thread(target=run, name="leaderboard-builder", daemon=True)
+    app.extensions["leaderboard_builder"] = thread
+    thread.start()
+
+def get_leaderboards():
+    """Return the app's boards. Until they are built, from Score in the background,
+    they serve whatever they hold (empty in a fresh process); `flask
+    rebuild-leaderboards` builds the shared boards ahead of traffic."""
+    app = current_app._get_current_object()
+    boards = _leaderboards()
+    if boards.needs_rebuild():
+        with _build_lock:
+            if not app.config.get("LEADERBOARD_BACKGROUND_BUILD", True):
+                if boards.needs_rebuild():
+                    rebuild_leaderboards(boards)
+            else:
+                builder = app.extensions.get("leaderboard_builder")
+                if builder is None or not builder.is_alive():
+                    _start_builder(app, boards)
+    return boards
+
+def record_leaderboard_score(quiz_id, user_id, score):
+    get_leaderboards().add(quiz_id, user_id, score or 0)
+
+def discard_leaderboards(*quiz_ids):
+    get_leaderboards().discard(*quiz_ids)
+
+def quiz_standing(quiz_id, score, top_n):
+    """Rank and percentile of a score on a quiz, plus the top_n entries as (rank, user_id, score)."""
+    boards = get_leaderboards()
+    better, equal, total = boards.standing(quiz_id, score)
+    below = total - better - equal
+    top, rank, previous = [], 0, None
+    for position, (user_id, entry_score) in enumerate(boards.top(quiz_id, top_n), start=1):
+        if entry_score != previous:
+            rank, previous = position, entry_score
+        top.append((rank, user_id, entry_score))
+    return {
+        "rank": better + 1,
+        "participants": total,
+        "percentile": round((below + 0.5 * equal) / total * 100, 1) if total else None,
+        "top": top
+    }
@@ -0,0 +1,37 @@
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from models import User, Subject, Chapter, Quiz, Question, Score
+
+# Relationships are lazy by default; each route opts into exactly the graph it
+# serializes by naming one of these profiles.
+LOADER_PROFILES = {
+    # Credential check and last-visit bump; never touches the score history
+    "auth": (
+        load_only(User.id, User.email, User.password_hash, User.role),
+    ),
+    "profile": (
+        load_only(User.id, User.username, User.email, User.dob),
+    ),
+    # A student's scores with the chapter name each one is listed under
+    "results": (
+        load_only(Score.id, Score.quiz_id, Score.user_id, Score.total_scored,
+                  Score.total_questions, Score.timestamp),
+        joinedload(Score.quiz, innerjoin=True).load_only(Quiz.id, Quiz.chapter_id)
+        .joinedload(Quiz.chapter, innerjoin=True).load_only(Chapter.id, Chapter.name),
+    ),
+    # Quiz listings that show chapter and subject names
+    "student_catalog": (
+        load_only(Quiz.id, Quiz.chapter_id, Quiz.date_of_quiz, Quiz.time_duration, Quiz.question_count),
+        joinedload(Quiz.chapter).load_only(Chapter.id, Chapter.name, Chapter.subject_id)
+        .joinedload(Chapter.subject).load_only(Subject.id, Subject.name),
+    ),
+    # Taking a quiz: questions without the answer key
+    "exam": (
+        selectinload(Quiz.questions).load_only(
+            Question.id, Question.quiz_id, Question.question_text,
+            Question.option_1, Question.option_2, Question.option_3, Question.option_4
+        ),
+    ),
+}
+
+def loader_options(profile):
+    return LOADER_PROFILES[profile]
@@ -0,0 +1,243 @@
+import functools
+import re
+import threading
+import time
+from collections import deque
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from models import db
+
+# Prometheus-style latency histogram bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)+\s*\)", re.IGNORECASE)
+_WHITESPACE = re.compile(r"\s+")
+
+def normalize_sql(statement):
+    """Strip literals and collapse IN-lists so equivalent statements group together."""
+    statement = _STRING_LITERAL.sub("?", statement)
+    statement = _NUMBER_LITERAL.sub("?", statement)
+    statement = _IN_LIST.sub("IN (?)", statement)
+    return _WHITESPACE.sub(" ", statement).strip()
+
+class EndpointStats:
+    __slots__ = ("bucket_counts", "count", "latency_sum", "statements", "db_time", "statuses")
+
+    def __init__(self):
+        self.bucket_counts = [0] * len(LATENCY_BUCKETS)
+        self.count = 0
+        self.latency_sum = 0.0
+        self.statements = 0
+        self.db_time = 0.0
+        self.statuses = {}
+
+    def cumulative_buckets(self):
+        running, cumulative = 0, []
+        for bucket_count in self.bucket_counts:
+            running += bucket_count
+            cumulative.append(running)
+        return cumulative
+
+class MetricsRegistry:
+    """Process-wide request/SQL metrics. Hot-path work is a few additions under one lock."""
+
+    def __init__(self, slow_query_seconds=0.1, max_slow_queries=100):
+        self.slow_query_seconds = slow_query_seconds
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self._slow_queries = deque(maxlen=max_slow_queries)
+
+    def observe_request(self, endpoint, status, latency, statements, db_time):
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if latency <= bound:
+                    stats.bucket_counts[i] += 1
+                    break
+            stats.count += 1
+            stats.latency_sum += latency
+            stats.statements += statements
+            stats.db_time += db_time
+            stats.statuses[status] = stats.statuses.get(status, 0) + 1
+
+    def observe_statements(self, endpoint, statements, db_time):
+        """Add statements a request queued onto another thread (see attribute_queued_job)."""
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            if stats is None:
+                stats = self._endpoints[endpoint] = EndpointStats()
+            stats.statements += statements
+            stats.db_time += db_time
+
+    def observe_slow_query(self, endpoint, statement, duration):
+        sample = {
+            "endpoint": endpoint,
+            "sql": normalize_sql(statement),
+            "duration_ms": round(duration * 1000, 2),
+            "at": time.time()
+        }
+        with self._lock:
+            self._slow_queries.append(sample)
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {
+                endpoint: {
+                    "requests": stats.count,
+                    "statuses": {str(status): n for status, n in stats.statuses.items()},
+                    "latency_ms": {
+                        "avg": round(stats.latency_sum / stats.count * 1000, 2) if stats.count else 0,
+                        "buckets": dict(zip(
+                            [str(bound) for bound in LATENCY_BUCKETS] + ["+Inf"],
+                            stats.cumulative_buckets() + [stats.count]
+                        ))
+                    },
+                    "sql_statements": stats.statements,
+                    "sql_statements_per_request": round(stats.statements / stats.count, 2) if stats.count else 0,
+                    "db_time_ms": round(stats.db_time * 1000, 2)
+                }
+                for endpoint, stats in self._endpoints.items()
+            }
+            slow_queries = list(self._slow_queries)
+        return {"endpoints": endpoints, "slow_queries": slow_queries}
+
+    def render_prometheus(self):
+        def label(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+        with self._lock:
+            items = [(endpoint, stats.cumulative_buckets(), stats.count, stats.latency_sum,
+                      dict(stats.statuses), stats.statements, stats.db_time)
+                     for endpoint, stats in self._endpoints.items()]
+
+        lines = [
+            "# HELP quizmaster_request_duration_seconds Request latency by endpoint.",
+            "# TYPE quizmaster_request_duration_seconds histogram"
+        ]
+        for endpoint, cumulative, count, latency_sum, _, _, _ in items:
+            for bound, bucket_count in zip(LATENCY_BUCKETS, cumulative):
+                lines.append(f'quizmaster_request_duration_seconds_bucket{{endpoint="{label(endpoint)}",le="{bound}"}} {bucket_count}')
+            lines.append(f'quizmaster_request_duration_seconds_bucket{{endpoint="{label(endpoint)}",le="+Inf"}} {count}')
+            lines.append(f'quizmaster_request_duration_seconds_sum{{endpoint="{label(endpoint)}"}} {latency_sum}')
+            lines.append(f'quizmaster_request_duration_seconds_count{{endpoint="{label(endpoint)}"}} {count}')
+
+        lines += [
+            "# HELP quizmaster_requests_total Requests by endpoint and status code.",
+            "# TYPE quizmaster_requests_total counter"
+        ]
+        for endpoint, _, _, _, statuses, _, _ in items:
+            for status, n in statuses.items():
+                lines.append(f'quizmaster_requests_total{{endpoint="{label(endpoint)}",status="{status}"}} {n}')
+
+        lines += [
+            "# HELP quizmaster_sql_statements_total SQL statements executed while serving requests.",
+            "# TYPE quizmaster_sql_statements_total counter"
+        ]
+        for endpoint, _, _, _, _, statements, _ in items:
+            lines.append(f'quizmaster_sql_statements_total{{endpoint="{label(endpoint)}"}} {statements}')
+
+        lines += [
+            "# HELP quizmaster_sql_duration_seconds_total Time spent in SQL while serving requests.",
+            "# TYPE quizmaster_sql_duration_seconds_total counter"
+        ]
+        for endpoint, _, _, _, _, _, db_time in items:
+            lines.append(f'quizmaster_sql_duration_seconds_total{{endpoint="{label(endpoint)}"}} {db_time}')
+        return "\n".join(lines) + "\n"
+
+def _endpoint():
+    return request.endpoint or "unmatched"
+
+# The request a job running on this thread was queued by, see attribute_queued_job
+_queued = threading.local()
+
+def attribute_queued_job(fn):
+    """Wrap fn, about to run on another thread, so its statements count towards
+    the current request's endpoint. Returns fn unchanged outside a request."""
+    if not (has_request_context() and "metrics_start" in g):
+        return fn
+    registry = current_app.extensions["metrics"]
+    endpoint = _endpoint()
+
+    @functools.wraps(fn)
+    def job(*args):
+        _queued.endpoint, _queued.statements, _queued.db_time = endpoint, 0, 0.0
+        try:
+            result = fn(*args)
+            # Pending ORM writes would otherwise be flushed unattributed at the batch commit
+            db.session.flush()
+            return result
+        finally:
+            registry.observe_statements(endpoint, _queued.statements, _queued.db_time)
+            _queued.endpoint = None
+    return job
+
+def request_statements():
+    """SQL statements the current request has executed so far."""
+    return g.get("metrics_statements", 0) if has_request_context() else 0
+
+def instrument_engine(registry, engine):
+    """Attribute an engine's statements to the current request and sample its slow queries."""
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("metrics_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["metrics_query_start"].pop()
+        endpoint = None
+        if has_request_context() and "metrics_start" in g:
+            g.metrics_statements += 1
+            g.metrics_db_time += elapsed
+            endpoint = _endpoint()
+        elif getattr(_queued, "endpoint", None):
+            _queued.statements += 1
+            _queued.db_time += elapsed
+            endpoint = _queued.endpoint
+        if elapsed >= registry.slow_query_seconds:
+            registry.observe_slow_query(endpoint, statement, elapsed)
+
+    @event.listens_for(engine, "handle_error")
+    def _handle_error(exception_context):
+        starts = exception_context.connection.info.get("metrics_query_start") if exception_context.connection else None
+        if starts:
+            starts.pop()
+
+def init_metrics(app):
+    registry = MetricsRegistry(
+        slow_query_seconds=app.config.get("METRICS_SLOW_QUERY_MS", 100) / 1000,
+        max_slow_queries=app.config.get("METRICS_SLOW_QUERY_SAMPLES", 100)
+    )
+    app.extensions["metrics"] = registry
+
+    with app.app_context():
+        instrument_engine(registry, db.engine)
+
+    @app.before_request
+    def _start_request_metrics():
+        g.metrics_start = time.perf_counter()
+        g.metrics_statements = 0
+        g.metrics_db_time = 0.0
+
+    @app.after_request
+    def _note_response_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    # Teardown runs once the body is sent: for stream_with_context responses (the
+    # CSV exports) that is after the last chunk, so their streamed SQL counts too
+    @app.teardown_request
+    def _record_request_metrics(error=None):
+        if "metrics_start" in g:
+            registry.observe_request(
+                _endpoint(),
+                g.get("metrics_status", 500),
+                time.perf_counter() - g.pop("metrics_start"),
+                g.metrics_statements,
+                g.metrics_db_time
+            )
+
+    return registry
@@ -0,0 +1,62 @@
+"""cascading catalog deletes
+
+Rows orphaned by catalog deletes made before foreign keys were enforced
+(chapters, quizzes, questions, scores, drafts, analyses and rollup rows) are
+removed first. Deleted scores still count in the totals, daily and per-student
+rollups, so run `flask rebuild-rollups` and
+`flask check-student-stats --rebuild-all` afterwards if any were deleted.
+
+Revision ID: 0013_cascading_deletes
+Revises: 0012_replica_heartbeat
+Create Date: 2026-10-18 19:21:55.880937
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0013_cascading_deletes'
+down_revision = '0012_replica_heartbeat'
+branch_labels = None
+depends_on = None
+
+# table -> [(column, referred table)] whose rows go with the referred row
+CASCADES = {
+    'chapter': [('subject_id', 'subject')],
+    'quiz': [('chapter_id', 'chapter')],
+    'question': [('quiz_id', 'quiz')],
+    'score': [('quiz_id', 'quiz')],
+    'item_analysis_result': [('quiz_id', 'quiz')],
+    'answer_draft': [('quiz_id', 'quiz')],
+    'subject_score_stats': [('subject_id', 'subject')],
+    'chapter_score_stats': [('chapter_id', 'chapter'), ('subject_id', 'subject')],
+    'user_subject_score_stats': [('subject_id', 'subject')],
+}
+
+# SQLite foreign keys are unnamed; batch mode names the reflected ones with this
+NAMING_CONVENTION = {"fk": "fk_%(table_name)s_%(column_0_name)s_%(referred_table_name)s"}
+
+
+def _replace_foreign_keys(ondelete):
+    inspector = sa.inspect(op.get_bind())
+    for table, columns in CASCADES.items():
+        existing = {tuple(fk['constrained_columns']): fk['name'] for fk in inspector.get_foreign_keys(table)}
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred in columns:
+                name = f'fk_{table}_{column}_{referred}'
+                batch_op.drop_constraint(existing.get((column,)) or name, type_='foreignkey')
+                batch_op.create_foreign_key(name, referred, [column], ['id'], ondelete=ondelete)
+
+
+def upgrade():
+    # Rows whose parent was deleted before foreign keys were enforced: catalog
+    # rows, questions, scores and rollup rows alike (see the docstring)
+    for table, columns in CASCADES.items():
+        for column, referred in columns:
+            op.execute(f"DELETE FROM {table} WHERE {column} NOT IN (SELECT id FROM {referred})")
+    _replace_foreign_keys('CASCADE')
+
+
+def downgrade():
+    _replace_foreign_keys(None)
@@ -0,0 +1,38 @@
+"""quiz ids are never reused
+
+SQLite hands the id of the highest deleted row to the next insert unless the
+table is AUTOINCREMENT; the quiz table is rebuilt with it. Ids of quizzes
+deleted before this migration above the current maximum can still be reused
+once, so restart the web processes and clear QUIZ_PAYLOAD_URL's store after
+upgrading if any were deleted recently.
+
+Revision ID: 0014_quiz_autoincrement
+Revises: 0013_cascading_deletes
+Create Date: 2026-10-18 20:42:17.305118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0014_quiz_autoincrement'
+down_revision = '0013_cascading_deletes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('quiz', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': True}) as batch_op:
+        pass
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    with op.batch_alter_table('quiz', schema=None, recreate='always',
+                              table_kwargs={'sqlite_autoincrement': False}) as batch_op:
+        pass
@@ -1,42 +1,63 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from read_routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 class User(db.Model, UserMixin):
+    __table_args__ = (
+        # Daily reminder scan: inactive students
+        db.Index('ix_user_role_last_visited_at', 'role', 'last_visited_at'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(100), unique=True, nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
-    password_hash = db.Column(db.String(100), nullable=False)
+    password_hash = db.Column(db.String(256), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='student')
     dob = db.Column(db.Date)
-    scores = db.relationship('Score', back_populates='user', lazy='joined')
+    scores = db.relationship('Score', back_populates='user', lazy=True)
     last_visited_at = db.Column(db.DateTime, default=datetime.utcnow)
     
 class Subject(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), unique=True, nullable=False)
     description = db.Column(db.Text, nullable=True)
-    chapters = db.relationship('Chapter', back_populates='subject', lazy=True, cascade="all, delete-orphan")
+    chapters = db.relationship('Chapter', back_populates='subject', lazy=True, cascade="all, delete-orphan",
+                               passive_deletes=True)
 
 class Chapter(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id'), nullable=False)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False, index=True)
+    quiz_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    question_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     subject = db.relationship('Subject', back_populates='chapters')  # THIS WAS MISSING
-    quizzes = db.relationship('Quiz', back_populates='chapter', lazy=True, cascade="all, delete-orphan")
+    quizzes = db.relationship('Quiz', back_populates='chapter', lazy=True, cascade="all, delete-orphan",
+                              passive_deletes=True)
 
 class Quiz(db.Model):
+    # Never reuse the id of a deleted quiz: payload ETags and cached answer keys
+    # are keyed by (id, content_version), and a new quiz starts at version 1
+    __table_args__ = {"sqlite_autoincrement": True}
     id = db.Column(db.Integer, primary_key=True)
-    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id'), nullable=False)
-    date_of_quiz = db.Column(db.Date, default=datetime.utcnow)
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id', ondelete='CASCADE'), nullable=False, index=True)
+    date_of_quiz = db.Column(db.Date, default=datetime.utcnow, index=True)
     time_duration = db.Column(db.Integer)
     remarks = db.Column(db.Text, nullable=True)
-    chapter = db.relationship('Chapter', back_populates='quizzes', lazy='joined')
-    questions = db.relationship('Question', back_populates='quiz', lazy=True, cascade="all, delete-orphan")
-    scores = db.relationship('Score', back_populates='quiz', lazy=True)
+    question_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped by every admin edit that changes what students are served
+    content_version = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    chapter = db.relationship('Chapter', back_populates='quizzes', lazy=True)
+    questions = db.relationship('Question', back_populates='quiz', lazy=True, cascade="all, delete-orphan",
+                                passive_deletes=True)
+    # Scores go with their quiz; catalog_deletes takes them out of the rollups first
+    scores = db.relationship('Score', back_populates='quiz', lazy=True, cascade="all, delete-orphan",
+                             passive_deletes=True)
+    item_analysis = db.relationship('ItemAnalysisResult', lazy=True, uselist=False, cascade="all, delete-orphan",
+                                    passive_deletes=True)
+    answer_drafts = db.relationship('AnswerDraft', lazy=True, cascade="all, delete-orphan", passive_deletes=True)
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -47,15 +68,103 @@ class Question(db.Model):
     option_3 = db.Column(db.String(200), nullable=False)
     option_4 = db.Column(db.String(200), nullable=False)
     correct_option = db.Column(db.Integer, nullable=False)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False, index=True)
     quiz = db.relationship('Quiz', back_populates='questions')
 
 class Score(db.Model):
+    __table_args__ = (
+        # Also serves every lookup by user_id alone
+        db.UniqueConstraint('user_id', 'quiz_id', name='uq_score_user_quiz'),
+        # A student's history, newest first
+        db.Index('ix_score_user_id_timestamp', 'user_id', 'timestamp'),
+    )
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), nullable=False, index=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     total_scored = db.Column(db.Integer)
     total_questions = db.Column(db.Integer)
-    quiz = db.relationship('Quiz', back_populates='scores', lazy='joined')
-    user = db.relationship('User', back_populates='scores')
\ No newline at end of file
+    # One byte per question (0 = unanswered, else the option picked), in the
+    # answer key's question-id order; response_layout fingerprints that order
+    responses = db.Column(db.LargeBinary, nullable=True)
+    response_layout = db.Column(db.Integer, nullable=True)
+    quiz = db.relationship('Quiz', back_populates='scores', lazy=True)
+    user = db.relationship('User', back_populates='scores')
+
+# Analytics rollups, maintained incrementally on every Score insert
+class ScoreTotals(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    sum_scored = db.Column(db.Integer, nullable=False, default=0)
+    sum_questions = db.Column(db.Integer, nullable=False, default=0)
+    sum_percentage = db.Column(db.Float, nullable=False, default=0)
+
+class SubjectScoreStats(db.Model):
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    sum_scored = db.Column(db.Integer, nullable=False, default=0)
+    sum_questions = db.Column(db.Integer, nullable=False, default=0)
+    sum_percentage = db.Column(db.Float, nullable=False, default=0)
+    subject = db.relationship('Subject')
+
+class ChapterScoreStats(db.Model):
+    chapter_id = db.Column(db.Integer, db.ForeignKey('chapter.id', ondelete='CASCADE'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), nullable=False)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    sum_scored = db.Column(db.Integer, nullable=False, default=0)
+    sum_questions = db.Column(db.Integer, nullable=False, default=0)
+    sum_percentage = db.Column(db.Float, nullable=False, default=0)
+
+class DailyScoreStats(db.Model):
+    day = db.Column(db.Date, primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    sum_scored = db.Column(db.Integer, nullable=False, default=0)
+    sum_questions = db.Column(db.Integer, nullable=False, default=0)
+    sum_percentage = db.Column(db.Float, nullable=False, default=0)
+
+# Per-student rollups behind /student/performance, maintained on every Score insert
+class UserScoreStats(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    sum_scored = db.Column(db.Integer, nullable=False, default=0)
+    sum_questions = db.Column(db.Integer, nullable=False, default=0)
+    sum_percentage = db.Column(db.Float, nullable=False, default=0)
+
+class UserSubjectScoreStats(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    subject_id = db.Column(db.Integer, db.ForeignKey('subject.id', ondelete='CASCADE'), primary_key=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    sum_scored = db.Column(db.Integer, nullable=False, default=0)
+    sum_questions = db.Column(db.Integer, nullable=False, default=0)
+    sum_percentage = db.Column(db.Float, nullable=False, default=0)
+
+# Latest item analysis per quiz, valid while the quiz version and attempt count match
+class ItemAnalysisResult(db.Model):
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), primary_key=True)
+    content_version = db.Column(db.Integer, nullable=False)
+    score_count = db.Column(db.Integer, nullable=False)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    result = db.Column(db.Text, nullable=False)  # JSON
+
+# Last flushed autosave of an attempt in progress; removed when the attempt is submitted
+class AnswerDraft(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id', ondelete='CASCADE'), primary_key=True)
+    answers = db.Column(db.Text, nullable=False)  # JSON {question_id: option}, 0 = cleared
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+# Single row the primary rewrites periodically; its age on a replica is the replication lag
+class ReplicaHeartbeat(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    beat_at = db.Column(db.DateTime, nullable=False)
+
+# Checkpoint for monthly report emails, so reruns skip students already sent
+class MonthlyReportDelivery(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    month = db.Column(db.String(7), primary_key=True)  # YYYY-MM
+    sent_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Per-day marker claimed before a reminder is sent, so retried or overlapping runs skip the student
+class DailyReminderDelivery(db.Model):
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
@@ -0,0 +1,83 @@
+from datetime import datetime, timedelta
+from itertools import groupby
+from operator import attrgetter
+from flask_mail import Message
+from models import db, User, Chapter, Quiz, Score, MonthlyReportDelivery
+from extensions import mail, email_templates
+
+REPORT_CHUNK_SIZE = 200
+STREAM_BATCH_SIZE = 1000
+
+monthly_report_template = email_templates.get_template("monthly_report.html")
+
+def report_month(month=None):
+    """Return (YYYY-MM key, start, end) for `month`, defaulting to the previous calendar month."""
+    if month:
+        start = datetime.strptime(month, "%Y-%m")
+    else:
+        this_month = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        start = (this_month - timedelta(days=1)).replace(day=1)
+    end = start.replace(year=start.year + 1, month=1) if start.month == 12 else start.replace(month=start.month + 1)
+    return start.strftime("%Y-%m"), start, end
+
+def _delivered(month):
+    return db.session.query(MonthlyReportDelivery.user_id).filter(MonthlyReportDelivery.month == month)
+
+def iter_pending_user_chunks(month, start, end, chunk_size=REPORT_CHUNK_SIZE):
+    """Stream ids of students with scores in the month who have not been sent a report yet."""
+    query = db.session.query(Score.user_id).join(User, User.id == Score.user_id).filter(
+        User.role == "student",
+        Score.timestamp >= start,
+        Score.timestamp < end,
+        Score.user_id.notin_(_delivered(month))
+    ).distinct().order_by(Score.user_id).yield_per(STREAM_BATCH_SIZE)
+
+    chunk = []
+    for user_id, in query:
+        chunk.append(user_id)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def send_reports(month, start, end, user_ids):
+    """Render and send the month's report to each user from one streamed, user-ordered query."""
+    rows = db.session.query(
+        Score.user_id,
+        User.email,
+        Chapter.name.label("chapter_name"),
+        Score.total_scored,
+        Score.total_questions,
+        Score.timestamp
+    ).join(User, User.id == Score.user_id).join(
+        Quiz, Quiz.id == Score.quiz_id
+    ).join(Chapter, Chapter.id == Quiz.chapter_id).filter(
+        Score.user_id.in_(user_ids),
+        Score.user_id.notin_(_delivered(month)),
+        Score.timestamp >= start,
+        Score.timestamp < end
+    ).order_by(Score.user_id, Score.timestamp).yield_per(STREAM_BATCH_SIZE)
+
+    # Render while streaming; sending waits until the cursor is exhausted because
+    # each checkpoint commit would otherwise close the open result set
+    month_label = start.strftime("%B %Y")
+    rendered = []
+    for user_id, scores in groupby(rows, key=attrgetter("user_id")):
+        scores = list(scores)
+        total_scored = sum(score.total_scored or 0 for score in scores)
+        total_questions = sum(score.total_questions or 0 for score in scores)
+        rendered.append((user_id, scores[0].email, monthly_report_template.render(
+            month=month_label,
+            scores=scores,
+            total_quizzes=len(scores),
+            avg_score=round(total_scored / total_questions * 100, 1) if total_questions else 0
+        )))
+
+    with mail.connect() as connection:
+        for user_id, email, html in rendered:
+            connection.send(Message(f"Monthly Quiz Report - {month_label}", recipients=[email], html=html))
+            # Checkpoint straight after sending so a rerun never mails this student twice
+            db.session.add(MonthlyReportDelivery(user_id=user_id, month=month))
+            db.session.commit()
+    return len(rendered)
@@ -0,0 +1,119 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from flask import abort, jsonify, make_response, request
+from sqlalchemy import and_, or_
+
+# Shared keyset pagination for list routes. A route describes its rows as a
+# base select (FROM, joins, filters), a dict of selectable Fields and an
+# ordering that ends in a unique column. Clients get `items` plus an opaque
+# `next_cursor`, may pass `limit` (capped per route) and `fields=a,b` to have
+# only those columns selected in SQL.
+
+class Field:
+    """One output field: the columns it needs and how to turn them into a JSON value."""
+
+    def __init__(self, *columns, format=None):
+        self.columns = columns
+        self.format = format or (lambda value: value)
+
+def iso(value):
+    return value.isoformat() if value is not None else None
+
+class Page:
+    def __init__(self, rows, items, next_cursor):
+        self.rows = rows
+        self.items = items
+        self.next_cursor = next_cursor
+
+def _bad_request(message):
+    abort(make_response(jsonify({"error": message}), 400))
+
+def encode_cursor(values):
+    payload = [value.isoformat() if isinstance(value, (date, datetime)) else value for value in values]
+    return base64.urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode()).decode().rstrip("=")
+
+def _cursor_value(column, value):
+    """A decoded cursor value as the key column's Python type; TypeError/ValueError if it is not one."""
+    if value is None:
+        return None
+    python_type = column.type.python_type
+    if python_type in (date, datetime):
+        return python_type.fromisoformat(value)
+    if python_type is float and isinstance(value, int) and not isinstance(value, bool):
+        return float(value)
+    # JSON booleans are ints to Python, and lists/objects must never reach the WHERE clause
+    if not isinstance(value, python_type) or isinstance(value, bool) != (python_type is bool):
+        raise TypeError(f"expected {python_type.__name__}")
+    return value
+
+def decode_cursor(cursor, keys):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (binascii.Error, ValueError):
+        _bad_request("Invalid cursor")
+    if not isinstance(values, list) or len(values) != len(keys):
+        _bad_request("Invalid cursor")
+    try:
+        return [_cursor_value(column, value) for (column, _), value in zip(keys, values)]
+    except (TypeError, ValueError):
+        _bad_request("Invalid cursor")
+
+def _after(keys, values):
+    """Rows strictly after `values` in the (column, descending) ordering, as an OR-chain."""
+    clauses = []
+    for i, (column, descending) in enumerate(keys):
+        step = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*[keys[j][0] == values[j] for j in range(i)], step))
+    return or_(*clauses)
+
+def requested_fields(fields, default=None):
+    raw = request.args.get("fields")
+    if not raw:
+        return list(default or fields)
+    names = [name.strip() for name in raw.split(",") if name.strip()]
+    unknown = [name for name in names if name not in fields]
+    if unknown or not names:
+        _bad_request(f"Unknown field(s): {', '.join(unknown) or raw}. Allowed: {', '.join(fields)}")
+    return names
+
+def paginate(session, base, fields, keys, default_limit=50, max_limit=200, extra=None, default_fields=None):
+    """Run one page of `base` and return a Page.
+
+    `keys` is a list of (column, descending) whose last column is unique. `extra`
+    maps labels to columns the route needs on every row (e.g. for cache tags)
+    without them appearing in the items.
+    """
+    limit = min(max(request.args.get("limit", default_limit, type=int), 1), max_limit)
+    names = requested_fields(fields, default_fields)
+
+    columns = {}
+    for name in names:
+        for i, column in enumerate(fields[name].columns):
+            columns[f"{name}__{i}"] = column
+    for label, column in (extra or {}).items():
+        columns[label] = column
+    for i, (column, _) in enumerate(keys):
+        columns[f"_key{i}"] = column
+
+    stmt = base.add_columns(*[column.label(label) for label, column in columns.items()])
+    cursor = request.args.get("cursor")
+    if cursor:
+        stmt = stmt.where(_after(keys, decode_cursor(cursor, keys)))
+    stmt = stmt.order_by(*[column.desc() if descending else column.asc() for column, descending in keys])
+
+    # One extra row tells whether another page exists
+    rows = session.execute(stmt.limit(limit + 1)).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    items = []
+    for row in rows:
+        mapping = row._mapping
+        items.append({
+            name: fields[name].format(*[mapping[f"{name}__{i}"] for i in range(len(fields[name].columns))])
+            for name in names
+        })
+    next_cursor = encode_cursor([rows[-1]._mapping[f"_key{i}"] for i in range(len(keys))]) if has_more else None
+    return Page(rows, items, next_cursor)
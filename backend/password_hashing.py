@@ -0,0 +1,80 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool's queue is full; callers should answer 503."""
+
+def _method_prefix(method):
+    # werkzeug expands bare names ("scrypt") to their full parameter string
+    return generate_password_hash("", method=method).split("$", 1)[0]
+
+class PasswordHasher:
+    """Runs werkzeug hashing on a bounded process pool so request threads stay free.
+
+    At most `max_pending` hashes may be queued or running; beyond that callers
+    wait up to `queue_timeout` seconds and then get HashingBusy. With
+    `workers=0` hashing runs inline, which is what tests and the dev server want.
+    """
+
+    def __init__(self, method, workers, max_pending, queue_timeout):
+        self.method = method
+        self.method_prefix = _method_prefix(method)
+        self.workers = workers
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._pool = ProcessPoolExecutor(max_workers=workers) if workers else None
+        self._pid = os.getpid()
+
+    def _run(self, fn, *args):
+        if self._pool is None:
+            return fn(*args)
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HashingBusy()
+        try:
+            future = self._pool.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future.result()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split("$", 1)[0] != self.method_prefix
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+def create_hasher(config):
+    workers = config.get("PASSWORD_HASH_WORKERS", 0)
+    return PasswordHasher(
+        method=config.get("PASSWORD_HASH_METHOD", "scrypt"),
+        workers=workers,
+        max_pending=config.get("PASSWORD_HASH_MAX_PENDING") or max(workers, 1) * 4,
+        queue_timeout=config.get("PASSWORD_HASH_QUEUE_TIMEOUT", 2.0)
+    )
+
+_create_lock = threading.Lock()
+
+def get_hasher():
+    app = current_app._get_current_object()
+    hasher = app.extensions.get("password_hasher")
+    # A pool inherited across fork() is unusable; build a fresh one per process
+    if hasher is None or hasher._pid != os.getpid():
+        with _create_lock:
+            hasher = app.extensions.get("password_hasher")
+            if hasher is None or hasher._pid != os.getpid():
+                hasher = app.extensions["password_hasher"] = create_hasher(app.config)
+    return hasher
+
+def hash_password(password):
+    return get_hasher().hash(password)
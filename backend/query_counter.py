@@ -0,0 +1,36 @@
+import threading
+from contextlib import contextmanager
+from sqlalchemy import event
+from models import db
+
+class QueryCounter:
+    """Counts SQL statements and loaded ORM instances on the current thread while active.
+
+    Registers global engine and mapper listeners, so it is for offline tooling
+    such as tests/test_query_budgets.py; requests read metrics.request_statements().
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.instances = 0
+        self._thread_id = threading.get_ident()
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if threading.get_ident() == self._thread_id:
+            self.count += 1
+
+    def _on_load(self, target, context):
+        if threading.get_ident() == self._thread_id:
+            self.instances += 1
+
+@contextmanager
+def count_queries():
+    counter = QueryCounter()
+    engine = db.engine
+    event.listen(engine, "before_cursor_execute", counter._on_execute)
+    event.listen(db.Model, "load", counter._on_load, propagate=True)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", counter._on_execute)
+        event.remove(db.Model, "load", counter._on_load)
@@ -0,0 +1,170 @@
+import csv
+import io
+import json
+from sqlalchemy import insert
+from models import db, Quiz, Question
+from counters import question_added
+from answer_keys import invalidate_answer_keys
+from content_versions import bump_quiz_versions, quiz_cache_tags
+from response_cache import invalidate_cache_tags
+
+IMPORT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+
+TITLE_MAX = Question.title.type.length
+TEXT_MAX = Question.question_text.type.length
+OPTION_MAX = Question.option_1.type.length
+
+UNDECODABLE = "File is not valid UTF-8; the rest of the upload was not read"
+
+def iter_csv_rows(stream):
+    """Yield one dict per CSV record without reading the whole upload.
+
+    Expected columns: quiz_id, title, text, option_1..option_4, correct.
+    Malformed records and undecodable bytes come through as error rows.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""))
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except UnicodeDecodeError:
+            yield {"_error": UNDECODABLE}
+            return
+        except csv.Error as e:
+            yield {"_error": f"Invalid CSV: {e}"}
+            continue
+        row["options"] = [row.pop(f"option_{i}", None) for i in range(1, 5)]
+        yield row
+
+def iter_jsonl_rows(stream):
+    """Yield one dict per JSON line; blank lines are skipped."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig")
+    try:
+        for line in text:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield {"_error": f"Invalid JSON: {e}"}
+                continue
+            yield row if isinstance(row, dict) else {"_error": "Each line must be a JSON object"}
+    except UnicodeDecodeError:
+        yield {"_error": UNDECODABLE}
+
+ROW_READERS = {"csv": iter_csv_rows, "jsonl": iter_jsonl_rows}
+
+def _validate_row(row, quiz_exists):
+    if "_error" in row:
+        return None, row["_error"]
+
+    try:
+        quiz_id = int(row.get("quiz_id"))
+    except (TypeError, ValueError):
+        return None, "quiz_id must be an integer"
+    if not quiz_exists(quiz_id):
+        return None, f"Quiz {quiz_id} does not exist"
+
+    title = (row.get("title") or "").strip()
+    text = (row.get("text") or "").strip()
+    if not title or not text:
+        return None, "title and text are required"
+    if len(title) > TITLE_MAX or len(text) > TEXT_MAX:
+        return None, f"title/text longer than {TITLE_MAX}/{TEXT_MAX} characters"
+
+    options = row.get("options")
+    if not isinstance(options, list) or len(options) != 4 or not all(
+        isinstance(option, str) and option.strip() for option in options
+    ):
+        return None, "Exactly 4 non-empty options required"
+    if any(len(option) > OPTION_MAX for option in options):
+        return None, f"Options must be at most {OPTION_MAX} characters"
+
+    # JSONL true/false would otherwise pass int() as 1/0
+    if isinstance(row.get("correct"), bool):
+        return None, "correct must be an integer"
+    try:
+        correct = int(row.get("correct"))
+    except (TypeError, ValueError):
+        return None, "correct must be an integer"
+    if not 1 <= correct <= 4:
+        return None, "correct must be between 1 and 4"
+
+    return {
+        "title": title,
+        "question_text": text,
+        "option_1": options[0],
+        "option_2": options[1],
+        "option_3": options[2],
+        "option_4": options[3],
+        "correct_option": correct,
+        "quiz_id": quiz_id
+    }, None
+
+def _flush_chunk(chunk):
+    """Insert one chunk with a single executemany and commit it with its counter updates."""
+    per_quiz = {}
+    for values in chunk:
+        per_quiz[values["quiz_id"]] = per_quiz.get(values["quiz_id"], 0) + 1
+    try:
+        db.session.execute(insert(Question), chunk)
+        for quiz_id, added in per_quiz.items():
+            question_added(quiz_id, added)
+        bump_quiz_versions(*per_quiz)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    invalidate_answer_keys(*per_quiz)
+    invalidate_cache_tags(*quiz_cache_tags(*per_quiz))
+
+def import_questions(rows, chunk_size=IMPORT_CHUNK_SIZE):
+    """Validate and insert streamed question rows, one transaction per chunk.
+
+    Only the current chunk and the set of seen quiz ids are held in memory, so
+    memory use does not depend on the size of the upload.
+    """
+    known_quizzes = {}
+
+    def quiz_exists(quiz_id):
+        if quiz_id not in known_quizzes:
+            known_quizzes[quiz_id] = db.session.query(Quiz.id).filter_by(id=quiz_id).first() is not None
+        return known_quizzes[quiz_id]
+
+    report = {"imported": 0, "failed": 0, "errors": [], "errors_truncated": False}
+
+    def record_error(row_number, error):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_REPORTED_ERRORS:
+            report["errors"].append({"row": row_number, "error": error})
+        else:
+            report["errors_truncated"] = True
+
+    chunk, chunk_rows = [], []
+
+    def flush():
+        try:
+            _flush_chunk(chunk)
+            report["imported"] += len(chunk)
+        except Exception as e:
+            for row_number in chunk_rows:
+                record_error(row_number, f"Chunk insert failed: {e}")
+        chunk.clear()
+        chunk_rows.clear()
+
+    for row_number, row in enumerate(rows, start=1):
+        values, error = _validate_row(row, quiz_exists)
+        if error:
+            record_error(row_number, error)
+            continue
+        chunk.append(values)
+        chunk_rows.append(row_number)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk:
+        flush()
+
+    return report
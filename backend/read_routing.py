@@ -0,0 +1,270 @@
+import glob
+import os
+import sqlite3
+import threading
+import time
+from contextvars import ContextVar
+from datetime import datetime
+from functools import wraps
+from flask import current_app
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, select, update, insert
+from sqlalchemy.engine import make_url
+
+# Read/write routing. Handlers and tasks decorated with @read_only send their
+# SELECTs to a read replica: either READ_REPLICA_URL, or for a file-backed
+# SQLite primary a snapshot that the Celery beat task copies every
+# SQLITE_SNAPSHOT_INTERVAL seconds, shared by every process on the host and
+# opened with mode=ro. Flushes and DML statements always go to the primary, and
+# so do reads while the replica lags more than READ_REPLICA_MAX_LAG.
+
+_read_only = ContextVar("read_only", default=False)
+
+def read_only(f):
+    """Route the SELECTs issued while f runs to the read replica, when one is configured."""
+    @wraps(f)
+    def wrapper(*args, **kwargs):
+        token = _read_only.set(True)
+        try:
+            return f(*args, **kwargs)
+        finally:
+            _read_only.reset(token)
+    return wrapper
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and _read_only.get() and not self._flushing and not getattr(clause, "is_dml", False):
+            replica = get_read_replica()
+            if replica is not None:
+                engine = replica.engine_for_reads()
+                if engine is not None:
+                    return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+class _Replica:
+    def __init__(self, app, max_lag):
+        self.max_lag = max_lag
+        self.engine = None
+        self.lag = None
+        self.routed = 0
+        self.fallbacks = 0
+        self.last_error = None
+        self._metrics = app.extensions.get("metrics")
+        self._lock = threading.Lock()
+
+    def _create_engine(self, url, **options):
+        engine = create_engine(url, **options)
+        if self._metrics is not None:
+            from metrics import instrument_engine
+            instrument_engine(self._metrics, engine)
+        return engine
+
+    def engine_for_reads(self):
+        # Too stale (or never measured): serve from the primary instead
+        usable = self.engine is not None and self.lag is not None and (not self.max_lag or self.lag <= self.max_lag)
+        with self._lock:
+            if usable:
+                self.routed += 1
+            else:
+                self.fallbacks += 1
+        return self.engine if usable else None
+
+    def stats(self):
+        with self._lock:
+            return {
+                "kind": self.kind,
+                "lag_seconds": round(self.lag, 3) if self.lag is not None else None,
+                "max_lag_seconds": self.max_lag or None,
+                "routed_reads": self.routed,
+                "primary_fallbacks": self.fallbacks,
+                "last_error": self.last_error
+            }
+
+    def _loop(self, interval, step):
+        while True:
+            time.sleep(interval)
+            step()
+
+class ReplicaBind(_Replica):
+    """A separately replicated database. Lag is measured with a heartbeat row the
+    primary rewrites every interval: replica lag = now - the beat it can see."""
+
+    kind = "replica"
+
+    def __init__(self, app, url, primary, max_lag, interval):
+        super().__init__(app, max_lag)
+        self.interval = interval
+        self._primary = primary
+        self._first_beat = None
+        self.engine = self._create_engine(url, pool_pre_ping=True)
+        self._beat()
+        threading.Thread(target=self._loop, args=(interval, self._beat), name="replica-heartbeat", daemon=True).start()
+
+    def _beat(self):
+        from models import ReplicaHeartbeat
+        now = datetime.utcnow()
+        try:
+            with self.engine.connect() as conn:
+                seen = conn.execute(select(ReplicaHeartbeat.beat_at).where(ReplicaHeartbeat.id == 1)).scalar()
+            with self._primary.begin() as conn:
+                if not conn.execute(update(ReplicaHeartbeat).where(ReplicaHeartbeat.id == 1).values(beat_at=now)).rowcount:
+                    conn.execute(insert(ReplicaHeartbeat).values(id=1, beat_at=now))
+            # No beat replicated yet: the replica trails by at least our first beat
+            self._first_beat = self._first_beat or now
+            self.lag = max((now - (seen or self._first_beat)).total_seconds(), 0.0)
+            self.last_error = None
+        except Exception as e:
+            self.lag = None
+            self.last_error = str(e)
+
+    def stats(self):
+        return dict(super().stats(), heartbeat_interval_seconds=self.interval)
+
+def _snapshot_base(primary_path, directory):
+    return os.path.join(directory or os.path.dirname(primary_path), os.path.basename(primary_path)) + ".snapshot-"
+
+def _snapshot_generations(base):
+    """(taken_at, path) of every complete snapshot, newest first."""
+    generations = []
+    for path in glob.glob(glob.escape(base) + "*"):
+        stamp = path[len(base):]
+        if stamp.isdigit():
+            generations.append((int(stamp) / 1e6, path))
+    return sorted(generations, reverse=True)
+
+def write_sqlite_snapshot(primary_path, directory=None, keep=2):
+    """Copy a file-backed SQLite primary into a new snapshot generation.
+
+    Run by one process per host (the Celery beat task or the CLI command); web
+    processes only open the newest complete copy. The copy is written under a
+    temporary name and renamed into place, and all but the newest `keep`
+    generations are removed, so a process still reading the previous one keeps
+    working until it notices the new one. Returns the new snapshot's path.
+    """
+    base = _snapshot_base(primary_path, directory)
+    target = f"{base}{time.time_ns() // 1000}"
+    source = sqlite3.connect(primary_path, timeout=30)
+    copy = sqlite3.connect(target + ".tmp")
+    try:
+        source.backup(copy)
+        # Readers open the copy read-only, which a WAL file without its -shm cannot do
+        copy.execute("PRAGMA journal_mode=DELETE")
+    finally:
+        copy.close()
+        source.close()
+    os.replace(target + ".tmp", target)
+    for _, path in _snapshot_generations(base)[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            # Still open somewhere (Windows); the next refresh retries
+            pass
+    return target
+
+class SQLiteSnapshot(_Replica):
+    """Read-only copy of a file-backed SQLite primary, shared by every process on the host.
+
+    write_sqlite_snapshot() produces the copies; this only follows the newest
+    one, checking every second on a background thread. Until a copy exists,
+    reads stay on the primary. Lag is the age of the copy in use.
+    """
+
+    kind = "sqlite_snapshot"
+
+    def __init__(self, app, primary_path, directory, max_lag, interval):
+        super().__init__(app, max_lag)
+        self.interval = interval
+        self.refreshes = 0
+        self.snapshot_at = None
+        self._base = _snapshot_base(primary_path, directory)
+        self._tick_lock = threading.Lock()
+        threading.Thread(target=self._follow, name="sqlite-snapshot", daemon=True).start()
+
+    def _follow(self):
+        while True:
+            self._tick()
+            time.sleep(min(self.interval, 1.0))
+
+    def _tick(self):
+        with self._tick_lock:
+            self._follow_newest()
+        if self.snapshot_at is not None:
+            self.lag = max(time.time() - self.snapshot_at, 0.0)
+
+    def _follow_newest(self):
+        try:
+            generations = _snapshot_generations(self._base)
+            if generations and generations[0][0] != self.snapshot_at:
+                taken_at, path = generations[0]
+                engine = self._create_engine(f"sqlite:///file:{path}?mode=ro&uri=true")
+                previous, self.engine = self.engine, engine
+                self.snapshot_at = taken_at
+                self.refreshes += 1
+                if previous is not None:
+                    previous.dispose()
+            self.last_error = None
+        except Exception as e:
+            self.last_error = str(e)
+
+    def stats(self):
+        return dict(super().stats(), refreshes=self.refreshes, refresh_interval_seconds=self.interval)
+
+def _sqlite_primary_path(app, primary):
+    primary_url = make_url(app.config["SQLALCHEMY_DATABASE_URI"])
+    if primary.dialect.name == "sqlite" and primary_url.database not in (None, "", ":memory:"):
+        return os.path.abspath(primary.url.database)
+    return None
+
+def refresh_sqlite_snapshot():
+    """Write a new shared snapshot when SQLITE_READ_SNAPSHOT applies; returns its path or None."""
+    from models import db
+    app = current_app._get_current_object()
+    path = _sqlite_primary_path(app, db.engine)
+    if not app.config.get("SQLITE_READ_SNAPSHOT") or path is None:
+        return None
+    return write_sqlite_snapshot(path, app.config.get("SQLITE_SNAPSHOT_DIR"))
+
+def _create_replica(app, primary):
+    max_lag = app.config.get("READ_REPLICA_MAX_LAG", 60)
+    url = app.config.get("READ_REPLICA_URL")
+    if url:
+        return ReplicaBind(app, url, primary, max_lag, app.config.get("READ_REPLICA_HEARTBEAT_INTERVAL", 5))
+    primary_path = _sqlite_primary_path(app, primary)
+    if app.config.get("SQLITE_READ_SNAPSHOT") and primary_path is not None:
+        return SQLiteSnapshot(app, primary_path, app.config.get("SQLITE_SNAPSHOT_DIR"),
+                              max_lag, app.config.get("SQLITE_SNAPSHOT_INTERVAL", 30))
+    return None
+
+_replica_lock = threading.Lock()
+_NO_REPLICA = object()
+
+def get_read_replica():
+    """The app's replica (started on first use), or None when reads stay on the primary."""
+    app = current_app._get_current_object()
+    replica = app.extensions.get("read_replica")
+    if replica is None:
+        with _replica_lock:
+            replica = app.extensions.get("read_replica")
+            if replica is None:
+                from models import db
+                replica = app.extensions["read_replica"] = _create_replica(app, db.engine) or _NO_REPLICA
+    return None if replica is _NO_REPLICA else replica
+
+def read_replica_stats():
+    replica = get_read_replica()
+    return replica.stats() if replica else None
+
+def render_prometheus():
+    stats = read_replica_stats()
+    if stats is None:
+        return ""
+    lines = [
+        "# HELP quizmaster_read_replica_lag_seconds How far the read replica trails the primary.",
+        "# TYPE quizmaster_read_replica_lag_seconds gauge",
+        f'quizmaster_read_replica_lag_seconds{{kind="{stats["kind"]}"}} {stats["lag_seconds"] if stats["lag_seconds"] is not None else "NaN"}',
+        "# HELP quizmaster_read_replica_reads_total Read-only session binds by where they were served.",
+        "# TYPE quizmaster_read_replica_reads_total counter",
+        f'quizmaster_read_replica_reads_total{{target="replica"}} {stats["routed_reads"]}',
+        f'quizmaster_read_replica_reads_total{{target="primary"}} {stats["primary_fallbacks"]}'
+    ]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,246 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, g, request
+
+try:
+    import redis
+except ImportError:  # Redis is optional; the in-process backend works without it
+    redis = None
+
+# Headers worth replaying from a cached response; everything else is rebuilt
+_KEPT_HEADERS = ("ETag", "Cache-Control")
+
+def _pack(response):
+    meta = {
+        "status": response.status_code,
+        "mimetype": response.mimetype,
+        "headers": [[name, response.headers[name]] for name in _KEPT_HEADERS if name in response.headers]
+    }
+    return json.dumps(meta).encode() + b"\n" + response.get_data()
+
+def _unpack(packed):
+    meta, body = packed.split(b"\n", 1)
+    meta = json.loads(meta)
+    response = current_app.response_class(body, status=meta["status"], mimetype=meta["mimetype"])
+    for name, value in meta["headers"]:
+        response.headers[name] = value
+    return response
+
+class LocalCacheBackend:
+    """Per-process LRU with per-entry expiry and a tag -> keys index."""
+
+    def __init__(self, max_entries, max_ttl):
+        self.max_ttl = max_ttl
+        self._max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, packed, tags)
+        self._tags = {}
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def _drop(self, key):
+        _, _, tags = self._entries.pop(key)
+        for tag in tags:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, packed, ttl, tags):
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + ttl, packed, frozenset(tags))
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
+            while len(self._entries) > self._max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, tags):
+        with self._lock:
+            keys = set()
+            for tag in tags:
+                keys |= self._tags.get(tag, set())
+            for key in keys:
+                self._drop(key)
+            return len(keys)
+
+    def size(self):
+        return len(self._entries)
+
+class RedisCacheBackend:
+    """Entries are plain keys with an expiry; each tag is a set of the keys it covers."""
+
+    def __init__(self, client, max_ttl, prefix="response_cache:"):
+        self.max_ttl = max_ttl
+        self._client = client
+        self._prefix = prefix
+
+    def _key(self, key):
+        return f"{self._prefix}entry:{key}"
+
+    def _tag(self, tag):
+        return f"{self._prefix}tag:{tag}"
+
+    def get(self, key):
+        return self._client.get(self._key(key))
+
+    def set(self, key, packed, ttl, tags):
+        pipe = self._client.pipeline(transaction=False)
+        pipe.set(self._key(key), packed, ex=ttl)
+        for tag in tags:
+            pipe.sadd(self._tag(tag), self._key(key))
+            # Entries never outlive max_ttl, so neither does any tag they belong to
+            pipe.expire(self._tag(tag), self.max_ttl)
+        pipe.execute()
+
+    def invalidate(self, tags):
+        tag_keys = [self._tag(tag) for tag in tags]
+        if not tag_keys:
+            return 0
+        keys = self._client.sunion(tag_keys)
+        pipe = self._client.pipeline(transaction=False)
+        if keys:
+            pipe.delete(*keys)
+        pipe.delete(*tag_keys)
+        pipe.execute()
+        return len(keys)
+
+    def size(self):
+        return sum(1 for _ in self._client.scan_iter(match=self._key("*"), count=1000))
+
+class ResponseCache:
+    def __init__(self, backend, default_ttl):
+        self.backend = backend
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self._hits = {}
+        self._misses = {}
+        self.invalidated = 0
+
+    def _count(self, counts, endpoint):
+        with self._lock:
+            counts[endpoint] = counts.get(endpoint, 0) + 1
+
+    def lookup(self, endpoint, key):
+        packed = self.backend.get(key)
+        self._count(self._hits if packed is not None else self._misses, endpoint)
+        return packed
+
+    def store(self, key, packed, ttl, tags):
+        self.backend.set(key, packed, min(ttl or self.default_ttl, self.backend.max_ttl), tags)
+
+    def invalidate(self, *tags):
+        dropped = self.backend.invalidate(set(tags))
+        with self._lock:
+            self.invalidated += dropped
+        return dropped
+
+    def stats(self):
+        with self._lock:
+            endpoints = sorted(set(self._hits) | set(self._misses))
+            per_endpoint = {
+                endpoint: {"hits": self._hits.get(endpoint, 0), "misses": self._misses.get(endpoint, 0)}
+                for endpoint in endpoints
+            }
+            invalidated = self.invalidated
+        hits = sum(item["hits"] for item in per_endpoint.values())
+        misses = sum(item["misses"] for item in per_endpoint.values())
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "evictions": getattr(self.backend, "evictions", None),
+            "hits": hits,
+            "misses": misses,
+            "hit_ratio": round(hits / (hits + misses), 4) if hits + misses else None,
+            "invalidated_entries": invalidated,
+            "endpoints": per_endpoint
+        }
+
+    def render_prometheus(self):
+        stats = self.stats()
+        lines = [
+            "# HELP quizmaster_response_cache_lookups_total Response cache lookups by endpoint and result.",
+            "# TYPE quizmaster_response_cache_lookups_total counter"
+        ]
+        for endpoint, counts in stats["endpoints"].items():
+            lines.append(f'quizmaster_response_cache_lookups_total{{endpoint="{endpoint}",result="hit"}} {counts["hits"]}')
+            lines.append(f'quizmaster_response_cache_lookups_total{{endpoint="{endpoint}",result="miss"}} {counts["misses"]}')
+        lines += [
+            "# HELP quizmaster_response_cache_entries Entries currently held by the response cache.",
+            "# TYPE quizmaster_response_cache_entries gauge",
+            f"quizmaster_response_cache_entries {stats['entries']}"
+        ]
+        return "\n".join(lines) + "\n"
+
+def _create_backend(app):
+    url = app.config.get("RESPONSE_CACHE_URL")
+    max_ttl = app.config.get("RESPONSE_CACHE_TTL", 300)
+    if not url:
+        return LocalCacheBackend(app.config.get("RESPONSE_CACHE_MAX_ENTRIES", 1024), max_ttl)
+    if url.startswith("fakeredis://"):
+        import fakeredis
+        return RedisCacheBackend(fakeredis.FakeRedis(), max_ttl)
+    if redis is None:
+        raise RuntimeError("RESPONSE_CACHE_URL is set but the redis package is not installed")
+    return RedisCacheBackend(redis.Redis.from_url(url), max_ttl)
+
+def get_response_cache():
+    app = current_app._get_current_object()
+    cache = app.extensions.get("response_cache")
+    if cache is None:
+        cache = app.extensions.setdefault(
+            "response_cache",
+            ResponseCache(_create_backend(app), app.config.get("RESPONSE_CACHE_TTL", 300))
+        )
+    return cache
+
+def cache_tags(*tags):
+    """Tag the response being built by the current cached view."""
+    if "response_cache_tags" in g:
+        g.response_cache_tags.update(tags)
+
+def invalidate_cache_tags(*tags):
+    return get_response_cache().invalidate(*tags)
+
+def cached_response(tags=(), ttl=None):
+    """Cache successful GET responses of a view, keyed by path and query string.
+
+    Apply below the auth decorator so cached entries are only served to callers
+    that passed it. `tags` may be a callable taking the view kwargs; the view can
+    add more with cache_tags() while it runs. `ttl` may be a callable too.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET" or not current_app.config.get("RESPONSE_CACHE_ENABLED", True):
+                return f(*args, **kwargs)
+
+            cache = get_response_cache()
+            key = f"{request.endpoint}:{request.full_path}"
+            packed = cache.lookup(request.endpoint, key)
+            if packed is not None:
+                return _unpack(packed).make_conditional(request)
+
+            g.response_cache_tags = set(tags(**kwargs) if callable(tags) else tags)
+            response = current_app.make_response(f(*args, **kwargs))
+            if response.status_code == 200 and not response.is_streamed:
+                cache.store(key, _pack(response), ttl() if callable(ttl) else ttl, g.response_cache_tags)
+            return response
+        return wrapper
+    return decorator
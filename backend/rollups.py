@@ -0,0 +1,212 @@
+from datetime import datetime
+from sqlalchemy import and_, case, delete, func, insert, literal, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from models import (
+    db, Chapter, Quiz, Score, ScoreTotals, SubjectScoreStats, ChapterScoreStats, DailyScoreStats,
+    UserScoreStats, UserSubjectScoreStats
+)
+
+# The global totals live in a single row
+TOTALS_ID = 1
+
+ROLLUP_MODELS = (ScoreTotals, SubjectScoreStats, ChapterScoreStats, DailyScoreStats)
+STUDENT_STATS_MODELS = (UserScoreStats, UserSubjectScoreStats)
+
+SUMS = ["attempts", "sum_scored", "sum_questions", "sum_percentage"]
+
+def _upsert(model, keys, deltas, extra=None):
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+        stmt = dialect_insert(table).values(**keys, **(extra or {}), **deltas)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={col: table.c[col] + stmt.excluded[col] for col in deltas}
+        )
+        db.session.execute(stmt)
+        return
+
+    result = db.session.execute(
+        update(table)
+        .where(*[table.c[key] == value for key, value in keys.items()])
+        .values({col: table.c[col] + value for col, value in deltas.items()})
+    )
+    if result.rowcount == 0:
+        db.session.execute(insert(table).values(**keys, **(extra or {}), **deltas))
+
+def record_score(score, chapter_id, subject_id):
+    """Fold a freshly inserted Score into every rollup, in the caller's transaction."""
+    scored = score.total_scored or 0
+    questions = score.total_questions or 0
+    deltas = {
+        "attempts": 1,
+        "sum_scored": scored,
+        "sum_questions": questions,
+        "sum_percentage": scored * 100.0 / questions if questions else 0.0
+    }
+    day = (score.timestamp or datetime.utcnow()).date()
+
+    _upsert(ScoreTotals, {"id": TOTALS_ID}, deltas)
+    _upsert(SubjectScoreStats, {"subject_id": subject_id}, deltas)
+    _upsert(ChapterScoreStats, {"chapter_id": chapter_id}, deltas, extra={"subject_id": subject_id})
+    _upsert(DailyScoreStats, {"day": day}, deltas)
+    _upsert(UserScoreStats, {"user_id": score.user_id}, deltas)
+    _upsert(UserSubjectScoreStats, {"user_id": score.user_id, "subject_id": subject_id}, deltas)
+
+def _aggregates():
+    percentage = case(
+        (Score.total_questions > 0, func.coalesce(Score.total_scored, 0) * 100.0 / Score.total_questions),
+        else_=0.0
+    )
+    return [
+        func.count(Score.id),
+        func.coalesce(func.sum(Score.total_scored), 0),
+        func.coalesce(func.sum(Score.total_questions), 0),
+        func.coalesce(func.sum(percentage), 0.0)
+    ]
+
+def rebuild_rollups():
+    """Recompute all rollup tables from Score with set-based INSERT ... SELECTs."""
+    sums = SUMS
+    for model in ROLLUP_MODELS:
+        db.session.execute(delete(model))
+
+    db.session.execute(insert(ScoreTotals).from_select(
+        ["id"] + sums,
+        select(literal(TOTALS_ID), *_aggregates())
+    ))
+    db.session.execute(insert(ChapterScoreStats).from_select(
+        ["chapter_id", "subject_id"] + sums,
+        select(Quiz.chapter_id, Chapter.subject_id, *_aggregates())
+        .join(Quiz, Quiz.id == Score.quiz_id)
+        .join(Chapter, Chapter.id == Quiz.chapter_id)
+        .group_by(Quiz.chapter_id, Chapter.subject_id)
+    ))
+    db.session.execute(insert(SubjectScoreStats).from_select(
+        ["subject_id"] + sums,
+        select(
+            ChapterScoreStats.subject_id,
+            func.sum(ChapterScoreStats.attempts),
+            func.sum(ChapterScoreStats.sum_scored),
+            func.sum(ChapterScoreStats.sum_questions),
+            func.sum(ChapterScoreStats.sum_percentage)
+        ).group_by(ChapterScoreStats.subject_id)
+    ))
+    db.session.execute(insert(DailyScoreStats).from_select(
+        ["day"] + sums,
+        select(func.date(Score.timestamp), *_aggregates())
+        .where(Score.timestamp.isnot(None))
+        .group_by(func.date(Score.timestamp))
+    ))
+    db.session.commit()
+
+def _score_sources(condition, placement_only):
+    """(model, keys, aggregate of the matching Scores per rollup row) for each rollup.
+
+    placement_only keeps the rollups keyed by chapter or subject, the ones a
+    quiz moving to another chapter affects.
+    """
+    scores = [agg.label(name) for agg, name in zip(_aggregates(), SUMS)]
+
+    def placed(*columns):
+        return select(*columns, *scores).select_from(Score) \
+            .join(Quiz, Quiz.id == Score.quiz_id).join(Chapter, Chapter.id == Quiz.chapter_id) \
+            .where(condition).group_by(*columns)
+
+    sources = [
+        (ChapterScoreStats, ["chapter_id"], placed(Quiz.chapter_id, Chapter.subject_id)),
+        (SubjectScoreStats, ["subject_id"], placed(Chapter.subject_id)),
+        (UserSubjectScoreStats, ["user_id", "subject_id"], placed(Score.user_id, Chapter.subject_id)),
+    ]
+    if not placement_only:
+        sources += [
+            (ScoreTotals, ["id"], select(literal(TOTALS_ID).label("id"), *scores).where(condition)),
+            (DailyScoreStats, ["day"], select(func.date(Score.timestamp).label("day"), *scores)
+                .where(condition, Score.timestamp.isnot(None)).group_by(func.date(Score.timestamp))),
+            (UserScoreStats, ["user_id"], select(Score.user_id, *scores).where(condition).group_by(Score.user_id)),
+        ]
+    return sources
+
+def remove_scores(condition, placement_only=False):
+    """Take the Scores matching condition out of the rollups, in the caller's
+    transaction; call it before the rows are deleted or moved."""
+    for model, keys, source in _score_sources(condition, placement_only):
+        removed = source.subquery()
+        table = model.__table__
+        db.session.execute(
+            update(table)
+            .where(*[table.c[key] == removed.c[key] for key in keys])
+            .values({col: table.c[col] - removed.c[col] for col in SUMS})
+        )
+        # Rebuilds never produce empty rows, and check_student_stats would flag them
+        if model is not ScoreTotals:
+            db.session.execute(delete(table).where(table.c.attempts <= 0))
+
+def add_scores(condition, placement_only=False):
+    """Fold existing Scores matching condition into the rollups, in the caller's
+    transaction; the counterpart of remove_scores once rows have moved."""
+    dialect = db.session.get_bind().dialect.name
+    for model, keys, source in _score_sources(condition, placement_only):
+        table = model.__table__
+        columns = [column.key for column in source.selected_columns]
+        if dialect in ("sqlite", "postgresql"):
+            dialect_insert = sqlite.insert if dialect == "sqlite" else postgresql.insert
+            stmt = dialect_insert(table).from_select(columns, source)
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=keys,
+                set_={col: table.c[col] + stmt.excluded[col] for col in SUMS}
+            ))
+            continue
+        for row in db.session.execute(source).mappings().all():
+            _upsert(model, {key: row[key] for key in keys}, {col: row[col] for col in SUMS},
+                    extra={col: row[col] for col in columns if col not in keys and col not in SUMS})
+
+def _student_stats_sources(user_ids=None):
+    """Per-user and per-(user, subject) aggregates computed straight from Score."""
+    user_totals = select(Score.user_id, *_aggregates()).group_by(Score.user_id)
+    subject_totals = select(Score.user_id, Chapter.subject_id, *_aggregates()) \
+        .join(Quiz, Quiz.id == Score.quiz_id) \
+        .join(Chapter, Chapter.id == Quiz.chapter_id) \
+        .group_by(Score.user_id, Chapter.subject_id)
+    if user_ids is not None:
+        user_totals = user_totals.where(Score.user_id.in_(user_ids))
+        subject_totals = subject_totals.where(Score.user_id.in_(user_ids))
+    return user_totals, subject_totals
+
+def rebuild_student_stats(user_ids=None):
+    """Recompute the per-student stats from Score, for everyone or just user_ids."""
+    user_totals, subject_totals = _student_stats_sources(user_ids)
+    for model in STUDENT_STATS_MODELS:
+        stmt = delete(model)
+        if user_ids is not None:
+            stmt = stmt.where(model.user_id.in_(user_ids))
+        db.session.execute(stmt)
+    db.session.execute(insert(UserScoreStats).from_select(["user_id"] + SUMS, user_totals))
+    db.session.execute(insert(UserSubjectScoreStats).from_select(["user_id", "subject_id"] + SUMS, subject_totals))
+    db.session.commit()
+
+def _drifted(model, expected, keys):
+    """Keys whose stored row disagrees with the recomputed aggregate, in either direction."""
+    expected = expected.subquery()
+    stored = model.__table__
+    matches = and_(*[stored.c[key] == expected.c[i] for i, key in enumerate(keys)])
+    differs = or_(
+        stored.c[keys[0]].is_(None),
+        stored.c.attempts != expected.c[len(keys)],
+        stored.c.sum_scored != expected.c[len(keys) + 1],
+        stored.c.sum_questions != expected.c[len(keys) + 2],
+        func.abs(stored.c.sum_percentage - expected.c[len(keys) + 3]) > 1e-6
+    )
+    missing_or_wrong = select(*[expected.c[i] for i in range(len(keys))]) \
+        .select_from(expected.outerjoin(stored, matches)).where(differs)
+    orphaned = select(*[stored.c[key] for key in keys]) \
+        .select_from(stored.outerjoin(expected, matches)).where(expected.c[0].is_(None))
+    return {tuple(row) for row in db.session.execute(missing_or_wrong.union(orphaned))}
+
+def check_student_stats():
+    """Return the user ids whose per-student stats have drifted from Score."""
+    user_totals, subject_totals = _student_stats_sources()
+    drifted = {user_id for user_id, in _drifted(UserScoreStats, user_totals, ["user_id"])}
+    drifted |= {user_id for user_id, _ in _drifted(UserSubjectScoreStats, subject_totals, ["user_id", "subject_id"])}
+    return sorted(drifted)
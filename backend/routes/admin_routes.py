@@ -1,9 +1,29 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify
 from models import db, User, Subject, Chapter, Quiz, Question
 import jwt
 from functools import wraps
-from sqlalchemy import func
-from models import Score
+from sqlalchemy import func, select
+from models import Score, ScoreTotals, SubjectScoreStats, DailyScoreStats
+from datetime import datetime, timedelta
+from counters import quiz_added, quiz_removed, question_added, question_removed
+from rollups import TOTALS_ID, add_scores, remove_scores
+from answer_keys import invalidate_answer_keys
+from content_versions import (
+    bump_quiz_versions, bump_chapter_versions, bump_subject_versions, quiz_cache_tags, quiz_payload_stats
+)
+from pagination import Field, iso, paginate
+from response_cache import cache_tags, cached_response, get_response_cache, invalidate_cache_tags
+from autosave import autosave_stats
+from sqlite_tuning import sqlite_writer_stats
+from read_routing import read_only, read_replica_stats, render_prometheus as render_replica_prometheus
+from csv_export import COHORT_CSV_HEADER, csv_response, iter_cohort_score_rows
+from question_import import ROW_READERS, import_questions
+from item_analysis import get_item_analysis
+from catalog_deletes import (
+    catalog_size, chapter_quiz_ids, delete_chapter, delete_quizzes, delete_subject, forget_deleted, subject_quiz_ids
+)
+from tasks import delete_catalog_task
+import os
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
 ALGORITHM = "HS256"
@@ -35,12 +55,19 @@ def admin_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+SUBJECT_FIELDS = {
+    "id": Field(Subject.id),
+    "name": Field(Subject.name),
+    "description": Field(Subject.description)
+}
+
 @admin_bp.route("/subjects", methods=["GET", "POST"])
 @admin_required
+@cached_response(tags=["subjects"])
 def handle_subjects():
     if request.method == "GET":
-        subjects = Subject.query.all()
-        return jsonify([{"id": sub.id, "name": sub.name, "description": sub.description} for sub in subjects])
+        page = paginate(db.session, select().select_from(Subject), SUBJECT_FIELDS, [(Subject.id, False)])
+        return jsonify({"items": page.items, "next_cursor": page.next_cursor})
     
     elif request.method == "POST":
         data = request.get_json()
@@ -54,6 +81,7 @@ def handle_subjects():
             )
             db.session.add(subject)
             db.session.commit()
+            invalidate_cache_tags("subjects")
             return jsonify({"message": "Subject added"}), 201
         except Exception as e:
             db.session.rollback()
@@ -70,12 +98,19 @@ def manage_subject(subject_id):
         data = request.get_json()
         subject.name = data.get("name", subject.name)
         subject.description = data.get("description", subject.description)
+        bump_subject_versions(subject_id)
         db.session.commit()
+        invalidate_cache_tags("subjects", f"subject:{subject_id}")
         return jsonify({"message": "Subject updated"}), 200
         
     elif request.method == "DELETE":
-        db.session.delete(subject)
+        if catalog_size(subject_id=subject_id) > current_app.config.get("CATALOG_DELETE_ASYNC_ROWS", 20000):
+            task = delete_catalog_task.delay(subject_id=subject_id)
+            return jsonify({"message": "Subject deletion started", "task_id": task.id}), 202
+        quiz_ids = [quiz_id for quiz_id, in db.session.execute(subject_quiz_ids(subject_id))]
+        delete_subject(subject_id)
         db.session.commit()
+        forget_deleted(quiz_ids, subject_id=subject_id)
         return jsonify({"message": "Subject deleted"}), 200
 
 @admin_bp.route("/subjects/<int:subject_id>/chapters", methods=["POST"])
@@ -93,21 +128,24 @@ def add_chapter(subject_id):
     )
     db.session.add(chapter)
     db.session.commit()
+    invalidate_cache_tags(f"subject:{subject_id}")
     return jsonify({"message": "Chapter added"}), 201
 
 # Get chapters for a subject
 @admin_bp.route("/subjects/<int:subject_id>/chapters", methods=["GET"])
 @admin_required
+@cached_response(tags=lambda subject_id: [f"subject:{subject_id}"])
 def get_chapters(subject_id):
     chapters = Chapter.query.filter_by(subject_id=subject_id).all()
     chapters_data = []
     for chapter in chapters:
-        total_questions = sum(len(quiz.questions) for quiz in chapter.quizzes)
+        cache_tags(f"chapter:{chapter.id}")
         chapters_data.append({
             "id": chapter.id,
             "name": chapter.name,
             "description": chapter.description,
-            "total_questions": total_questions
+            "total_quizzes": chapter.quiz_count,
+            "total_questions": chapter.question_count
         })
     return jsonify(chapters_data), 200
 
@@ -123,42 +161,76 @@ def manage_chapter(chapter_id):
         data = request.get_json()
         chapter.name = data.get("name", chapter.name)
         chapter.description = data.get("description", chapter.description)
+        bump_chapter_versions(chapter_id)
         db.session.commit()
+        invalidate_cache_tags(f"chapter:{chapter_id}")
         return jsonify({"message": "Chapter updated"}), 200
         
     elif request.method == "DELETE":
-        db.session.delete(chapter)
+        if catalog_size(chapter_id=chapter_id) > current_app.config.get("CATALOG_DELETE_ASYNC_ROWS", 20000):
+            task = delete_catalog_task.delay(chapter_id=chapter_id)
+            return jsonify({"message": "Chapter deletion started", "task_id": task.id}), 202
+        quiz_ids = [quiz_id for quiz_id, in db.session.execute(chapter_quiz_ids(chapter_id))]
+        delete_chapter(chapter_id)
         db.session.commit()
+        forget_deleted(quiz_ids, chapter_id=chapter_id)
         return jsonify({"message": "Chapter deleted"}), 200
     
 
 # Quiz routes
+QUIZ_PAGE_DEFAULT = 50
+QUIZ_PAGE_MAX = 200
+
+QUIZ_FIELDS = {
+    "id": Field(Quiz.id),
+    "chapter_id": Field(Quiz.chapter_id),
+    "chapter_name": Field(Chapter.name),
+    "subject_id": Field(Chapter.subject_id),
+    "subject_name": Field(Subject.name),
+    "date": Field(Quiz.date_of_quiz, format=iso),
+    "duration": Field(Quiz.time_duration),
+    "remarks": Field(Quiz.remarks),
+    "total_questions": Field(Quiz.question_count)
+}
+
 @admin_bp.route("/quizzes", methods=["GET"])
 @admin_required
+@cached_response(tags=["quiz_list"])
 def get_quizzes():
-    quizzes = Quiz.query.all()
-    quizzes_data = []
-    for quiz in quizzes:
-        chapter = Chapter.query.get(quiz.chapter_id)
-        subject = Subject.query.get(chapter.subject_id)
-        quizzes_data.append({
-            "id": quiz.id,
-            "chapter_id": quiz.chapter_id,
-            "chapter_name": chapter.name,
-            "subject_id": chapter.subject_id,
-            "subject_name": subject.name,
-            "date": quiz.date_of_quiz.isoformat(),
-            "duration": quiz.time_duration,
-            "remarks": quiz.remarks,
-            "questions": [{
-                "id": q.id,
-                "title": q.title,
-                "text": q.question_text,
-                "options": [q.option_1, q.option_2, q.option_3, q.option_4],
-                "correct": q.correct_option
-            } for q in quiz.questions]
-        })
-    return jsonify(quizzes_data), 200
+    include = set(filter(None, request.args.get("include", "").split(",")))
+    include_questions = "questions" in include
+
+    base = select().select_from(Quiz).join(Chapter, Chapter.id == Quiz.chapter_id) \
+        .join(Subject, Subject.id == Chapter.subject_id)
+    page = paginate(db.session, base, QUIZ_FIELDS, [(Quiz.id, False)],
+                    default_limit=QUIZ_PAGE_DEFAULT, max_limit=QUIZ_PAGE_MAX,
+                    extra={"tag_quiz_id": Quiz.id, "tag_chapter_id": Quiz.chapter_id,
+                           "tag_subject_id": Chapter.subject_id})
+    for row in page.rows:
+        cache_tags(f"quiz:{row.tag_quiz_id}", f"chapter:{row.tag_chapter_id}", f"subject:{row.tag_subject_id}")
+
+    if include_questions:
+        questions = {row.tag_quiz_id: [] for row in page.rows}
+        if questions:
+            for q in db.session.execute(select(
+                Question.id, Question.quiz_id, Question.title, Question.question_text,
+                Question.option_1, Question.option_2, Question.option_3, Question.option_4,
+                Question.correct_option
+            ).where(Question.quiz_id.in_(list(questions))).order_by(Question.id)):
+                questions[q.quiz_id].append({
+                    "id": q.id,
+                    "title": q.title,
+                    "text": q.question_text,
+                    "options": [q.option_1, q.option_2, q.option_3, q.option_4],
+                    "correct": q.correct_option
+                })
+        for row, item in zip(page.rows, page.items):
+            item["questions"] = questions[row.tag_quiz_id]
+
+    return jsonify({
+        "items": page.items,
+        "next_cursor": page.next_cursor
+    }), 200
 
 @admin_bp.route("/quizzes", methods=["POST"])
 @admin_required
@@ -171,17 +243,91 @@ def create_quiz():
             remarks=data.get("remarks", "")
         )
         db.session.add(quiz)
+        quiz_added(quiz.chapter_id)
         db.session.commit()
+        invalidate_cache_tags("quiz_list", f"chapter:{quiz.chapter_id}")
         return jsonify({"message": "Quiz created", "id": quiz.id}), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
 
+@admin_bp.route("/quizzes/<int:quiz_id>", methods=["PUT", "DELETE"])
+@admin_required
+def manage_quiz(quiz_id):
+    quiz = Quiz.query.get(quiz_id)
+    if not quiz:
+        return jsonify({"error": "Quiz not found"}), 404
+
+    if request.method == "PUT":
+        data = request.get_json()
+        old_chapter_id = quiz.chapter_id
+        new_chapter_id = data.get("chapter_id", quiz.chapter_id)
+        if new_chapter_id != quiz.chapter_id:
+            if not Chapter.query.get(new_chapter_id):
+                return jsonify({"error": "Chapter not found"}), 404
+            quiz_removed(quiz.chapter_id, quiz.question_count)
+            quiz_added(new_chapter_id, quiz.question_count)
+            # The chapter and subject rollups follow the quiz's scores to their new placement
+            remove_scores(Score.quiz_id == quiz_id, placement_only=True)
+            quiz.chapter_id = new_chapter_id
+            db.session.flush()
+            add_scores(Score.quiz_id == quiz_id, placement_only=True)
+        quiz.time_duration = data.get("duration", quiz.time_duration)
+        quiz.remarks = data.get("remarks", quiz.remarks)
+        quiz.content_version = Quiz.content_version + 1
+        db.session.commit()
+        invalidate_answer_keys(quiz_id)
+        invalidate_cache_tags(f"quiz:{quiz_id}", f"chapter:{old_chapter_id}", f"chapter:{new_chapter_id}")
+        return jsonify({"message": "Quiz updated"}), 200
+
+    elif request.method == "DELETE":
+        chapter_id = quiz.chapter_id
+        delete_quizzes([quiz_id])
+        db.session.commit()
+        forget_deleted([quiz_id], chapter_id=chapter_id)
+        invalidate_cache_tags(f"quiz:{quiz_id}")
+        return jsonify({"message": "Quiz deleted"}), 200
+
+@admin_bp.route("/deletions/<task_id>", methods=["GET"])
+@admin_required
+def get_deletion_status(task_id):
+    result = delete_catalog_task.AsyncResult(task_id)
+    status = {"state": result.state}
+    if result.failed():
+        status["error"] = str(result.info)
+    elif isinstance(result.info, dict):
+        info = dict(result.info)
+        quiz_ids = info.pop("quiz_ids", None)
+        if result.successful() and quiz_ids is not None:
+            forget_deleted(quiz_ids, info.pop("subject_id", None), info.pop("chapter_id", None))
+        status.update(info)
+    return jsonify(status), 200
+
+@admin_bp.route("/quizzes/<int:quiz_id>/item-analysis", methods=["GET"])
+@admin_required
+def get_quiz_item_analysis(quiz_id):
+    result = get_item_analysis(quiz_id, refresh=request.args.get("refresh") == "1")
+    if result is None:
+        return jsonify({"error": "Quiz not found"}), 404
+    return jsonify(result), 200
+
 # Question routes
+def _correct_option(value):
+    """The option number 1-4, or None; answer keys pack it into one byte per question."""
+    if isinstance(value, bool):
+        return None
+    try:
+        option = int(value)
+    except (TypeError, ValueError):
+        return None
+    return option if 1 <= option <= 4 else None
+
 @admin_bp.route("/questions", methods=["POST"])
 @admin_required
 def create_question():
     data = request.get_json()
+    if _correct_option(data.get("correct")) is None:
+        return jsonify({"error": "correct must be between 1 and 4"}), 400
     try:
         question = Question(
             title=data["title"],
@@ -190,16 +336,34 @@ def create_question():
             option_2=data["options"][1],
             option_3=data["options"][2],
             option_4=data["options"][3],
-            correct_option=data["correct"],
+            correct_option=_correct_option(data["correct"]),
             quiz_id=data["quiz_id"]
         )
         db.session.add(question)
+        question_added(question.quiz_id)
+        bump_quiz_versions(question.quiz_id)
         db.session.commit()
+        invalidate_answer_keys(question.quiz_id)
+        invalidate_cache_tags(*quiz_cache_tags(question.quiz_id))
         return jsonify({"message": "Question added"}), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
 
+@admin_bp.route("/questions/import", methods=["POST"])
+@admin_required
+def import_question_bank():
+    upload = request.files.get("file")
+    if not upload:
+        return jsonify({"error": "CSV or JSONL file required"}), 400
+
+    fmt = request.form.get("format") or os.path.splitext(upload.filename or "")[1].lstrip(".").lower()
+    if fmt not in ROW_READERS:
+        return jsonify({"error": "Format must be csv or jsonl"}), 400
+
+    report = import_questions(ROW_READERS[fmt](upload.stream))
+    return jsonify(report), 200
+
 @admin_bp.route("/questions/<int:question_id>", methods=["PUT", "DELETE"])
 @admin_required
 def manage_question(question_id):
@@ -214,7 +378,11 @@ def manage_question(question_id):
         # Update question fields
         question.title = data.get("title", question.title)
         question.question_text = data.get("text", question.question_text)
-        question.correct_option = data.get("correct", question.correct_option)
+        if "correct" in data:
+            correct = _correct_option(data["correct"])
+            if correct is None:
+                return jsonify({"error": "correct must be between 1 and 4"}), 400
+            question.correct_option = correct
         
         # Update options only if 4 are provided
         if len(options) == 4:
@@ -225,35 +393,70 @@ def manage_question(question_id):
         else:
             return jsonify({"error": "Exactly 4 options required"}), 400
 
+        bump_quiz_versions(question.quiz_id)
         db.session.commit()
+        invalidate_answer_keys(question.quiz_id)
+        invalidate_cache_tags(f"quiz:{question.quiz_id}")
         return jsonify({"message": "Question updated"}), 200
 
     elif request.method == "DELETE":
+        question_removed(question.quiz_id)
+        bump_quiz_versions(question.quiz_id)
         db.session.delete(question)
         db.session.commit()
+        invalidate_answer_keys(question.quiz_id)
+        invalidate_cache_tags(*quiz_cache_tags(question.quiz_id))
         return jsonify({"message": "Question deleted"}), 200
 
 
+@admin_bp.route("/export/scores.csv", methods=["GET"])
+@admin_required
+def export_cohort_scores():
+    return csv_response(COHORT_CSV_HEADER, iter_cohort_score_rows(), "cohort_scores.csv",
+                        compress=request.args.get("gzip") == "1")
+
+@admin_bp.route("/metrics", methods=["GET"])
+@admin_required
+def get_metrics():
+    registry = current_app.extensions["metrics"]
+    response_cache = get_response_cache()
+    if request.args.get("format") == "prometheus":
+        return Response(registry.render_prometheus() + response_cache.render_prometheus() + render_replica_prometheus(),
+                        mimetype="text/plain; version=0.0.4")
+    snapshot = registry.snapshot()
+    snapshot["response_cache"] = response_cache.stats()
+    snapshot["quiz_payloads"] = quiz_payload_stats()
+    snapshot["autosave"] = autosave_stats()
+    snapshot["sqlite_writer"] = sqlite_writer_stats()
+    snapshot["read_replica"] = read_replica_stats()
+    return jsonify(snapshot), 200
+
 @admin_bp.route("/dashboard-stats", methods=["GET"])
 @admin_required
+@read_only
 def get_dashboard_stats():
     # Overall Statistics
     total_students = User.query.filter_by(role='student').count()
-    total_quizzes = Quiz.query.count()
-    total_questions = Question.query.count()
-    
-    # Performance Metrics
-    avg_scores = db.session.query(
-        func.avg(Score.total_scored).label('avg_score'),
-        func.avg(Score.total_scored * 100.0 / Score.total_questions).label('avg_percentage')
+    catalog = db.session.query(
+        func.coalesce(func.sum(Chapter.quiz_count), 0),
+        func.coalesce(func.sum(Chapter.question_count), 0)
     ).first()
 
+    # Performance Metrics, read from the incrementally maintained rollups
+    totals = ScoreTotals.query.get(TOTALS_ID)
+    attempts = totals.attempts if totals else 0
+
     # Subject Breakdown
     subject_stats = db.session.query(
-        Subject.name,
-        func.count(Quiz.id).label('quiz_count'),
-        func.avg(Score.total_scored * 100.0 / Score.total_questions).label('avg_score')
-    ).join(Chapter, Subject.id == Chapter.subject_id).join(Quiz, Chapter.id == Quiz.chapter_id).join(Score, Quiz.id == Score.quiz_id).group_by(Subject.name).all()
+        Subject.name, SubjectScoreStats.attempts, SubjectScoreStats.sum_percentage
+    ).join(SubjectScoreStats, Subject.id == SubjectScoreStats.subject_id).filter(
+        SubjectScoreStats.attempts > 0
+    ).all()
+
+    # Daily activity for the last 30 days
+    daily_stats = DailyScoreStats.query.filter(
+        DailyScoreStats.day >= datetime.utcnow().date() - timedelta(days=30)
+    ).order_by(DailyScoreStats.day).all()
 
     # Recent Activity
     recent_attempts = Score.query.order_by(Score.timestamp.desc()).limit(10).all()
@@ -261,16 +464,21 @@ def get_dashboard_stats():
     return jsonify({
         "overview": {
             "students": total_students,
-            "quizzes": total_quizzes,
-            "questions": total_questions,
-            "avg_score": round(avg_scores.avg_score, 1) if avg_scores.avg_score else 0,
-            "avg_percentage": round(avg_scores.avg_percentage, 1) if avg_scores.avg_percentage else 0
+            "quizzes": catalog[0],
+            "questions": catalog[1],
+            "avg_score": round(totals.sum_scored / attempts, 1) if attempts else 0,
+            "avg_percentage": round(totals.sum_percentage / attempts, 1) if attempts else 0
         },
         "subjects": [{
-            "name": sub[0],
-            "quizzes": sub[1],
-            "avg_score": round(sub[2], 1) if sub[2] else 0
-        } for sub in subject_stats],
+            "name": name,
+            "quizzes": sub_attempts,
+            "avg_score": round(sum_percentage / sub_attempts, 1)
+        } for name, sub_attempts, sum_percentage in subject_stats],
+        "daily": [{
+            "date": day.day.isoformat(),
+            "attempts": day.attempts,
+            "avg_percentage": round(day.sum_percentage / day.attempts, 1) if day.attempts else 0
+        } for day in daily_stats],
         "recent_activity": [{
             "user_id": ra.user_id,
             "quiz_id": ra.quiz_id,
@@ -278,4 +486,4 @@ def get_dashboard_stats():
             "total": ra.total_questions,
             "timestamp": ra.timestamp.isoformat()
         } for ra in recent_attempts]
-    })
\ No newline at end of file
+    })
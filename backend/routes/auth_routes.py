@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
-from werkzeug.security import check_password_hash, generate_password_hash
 from models import db, User, Subject
+from loader_profiles import loader_options
+from password_hashing import HashingBusy, get_hasher, hash_password
+from sqlite_tuning import write
+from sqlalchemy import update
 from flask_cors import cross_origin
 import jwt
 from datetime import datetime
@@ -48,10 +51,13 @@ def signup():
                      'a lowercase letter, a digit, and a special character'
         }), 400
 
-    if User.query.filter_by(email=email).first():
+    if db.session.query(User.id).filter_by(email=email).first():
         return jsonify({'error': 'Email already exists'}), 400
 
-    hashed_password = generate_password_hash(password)
+    try:
+        hashed_password = hash_password(password)
+    except HashingBusy:
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
 
     new_user = User(username=username, email=email, password_hash=hashed_password, role=role)
     db.session.add(new_user)
@@ -60,25 +66,39 @@ def signup():
 
     return jsonify({'message': 'User registered successfully', 'role': new_user.role}), 201
 
+def _record_login(user_id, new_hash=None):
+    values = {"last_visited_at": datetime.utcnow()}
+    if new_hash:
+        values["password_hash"] = new_hash
+    db.session.execute(update(User).where(User.id == user_id).values(**values))
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     data = request.get_json()
     email = data.get('email', '').strip()
     password = data.get('password', '').strip()
 
-    user = User.query.filter_by(email=email).first()
+    user = User.query.options(*loader_options("auth")).filter_by(email=email).first()
     
-    if not user or not check_password_hash(user.password_hash, password):
-        return jsonify({'error': 'Invalid credentials'}), 401
+    hasher = get_hasher()
+    try:
+        if not user or not hasher.verify(user.password_hash, password):
+            return jsonify({'error': 'Invalid credentials'}), 401
 
-    user.last_visited_at = datetime.utcnow()
-    db.session.commit()
+        # Upgrade hashes made with older method/cost settings while we know the password
+        new_hash = hasher.hash(password) if hasher.needs_rehash(user.password_hash) else None
+    except HashingBusy:
+        return jsonify({'error': 'Server busy, please retry'}), 503, {'Retry-After': '1'}
+
+    role = user.role
+    token = jwt.encode({'user_id': user.id, 'role': role}, 'geet', algorithm='HS256')
 
-    token = jwt.encode({'user_id': user.id, 'role': user.role}, 'geet', algorithm='HS256')
+    # Nothing in the response depends on this write, so don't wait for the writer
+    write(_record_login, user.id, new_hash, wait=False)
 
     return jsonify({
         'message': 'Login successful',
-        'role': user.role,
+        'role': role,
         "token": token
     }), 200
 
@@ -1,15 +1,28 @@
 import os
-from flask import Blueprint, request, jsonify,send_from_directory,after_this_request
-from models import db, User, Quiz, Question, Score, Chapter, Subject
+import zlib
+from flask import Blueprint, request, jsonify,send_from_directory,after_this_request,abort
+from models import db, User, Quiz, Question, Score, Chapter, Subject, UserScoreStats, UserSubjectScoreStats
 import jwt
 from functools import wraps
 from datetime import datetime
-from sqlalchemy.orm import joinedload
-from sqlalchemy import func
+from sqlalchemy import func, select
 from tasks import export_csv_task, init_celery
 from flask_mail import Message
 from extensions import mail
 from flask import current_app
+from rollups import record_score
+from leaderboard import quiz_standing, record_leaderboard_score
+from answer_keys import get_answer_key
+from autosave import AnswerError, clean_answers, discard_autosave, pop_saved_answers, save_answers, saved_answers
+from loader_profiles import loader_options
+from content_versions import (
+    available_quizzes_etag, get_payload_cache, not_modified, quiz_etag, quiz_payload, serialize, versioned_response
+)
+from pagination import Field, iso, paginate
+from sqlite_tuning import write
+from read_routing import read_only
+from csv_export import SCORE_CSV_HEADER, csv_response, iter_user_score_rows
+from sqlalchemy.exc import IntegrityError
 
 student_bp = Blueprint("student", __name__, url_prefix="/student")
 
@@ -44,20 +57,56 @@ def student_required(f):
 # --- Student Routes --- #
 
 # Get available quizzes (student version)
+AVAILABLE_QUIZ_FIELDS = {
+    "id": Field(Quiz.id),
+    "date_of_quiz": Field(Quiz.date_of_quiz, format=iso),
+    "chapter": Field(Chapter.name),
+    "subject": Field(Subject.name),
+    "duration": Field(Quiz.time_duration),
+    "total_questions": Field(Quiz.question_count)
+}
+
 # In get_available_quizzes route, add date_of_quiz:
 @student_bp.route("/quizzes/available", methods=["GET"])
 @student_required
 def get_available_quizzes():
-    quizzes = Quiz.query.filter(Quiz.date_of_quiz <= datetime.utcnow()).all()
-    return jsonify([{
-        "id": q.id,
-        "date_of_quiz": q.date_of_quiz.isoformat(), 
-        "chapter": q.chapter.name,
-        "subject": q.chapter.subject.name,
-        "duration": q.time_duration,
-        "total_questions": len(q.questions)
-    } for q in quizzes])
+    now = datetime.utcnow()
+    # Each page (cursor, limit, fields) is its own representation of the catalog
+    etag = f"{available_quizzes_etag(now)}-{zlib.crc32(request.query_string):08x}"
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    payloads = get_payload_cache()
+    cached_payload = payloads.get(etag)
+    if cached_payload is None:
+        base = select().select_from(Quiz).join(Chapter, Chapter.id == Quiz.chapter_id) \
+            .join(Subject, Subject.id == Chapter.subject_id).where(Quiz.date_of_quiz <= now)
+        page = paginate(db.session, base, AVAILABLE_QUIZ_FIELDS, [(Quiz.id, False)])
+        cached_payload = serialize({"items": page.items, "next_cursor": page.next_cursor})
+        payloads.set(etag, cached_payload)
+    return versioned_response(etag, cached_payload)
+
+
+def _record_submission(user_id, quiz_id, answer_key, posted):
+    # Grade the autosaved attempt; answers posted with the submit take precedence
+    answers = pop_saved_answers(user_id, quiz_id)
+    answers.update(posted)
+    responses = answer_key.responses(answers)
+    correct = answer_key.grade_responses(responses)
 
+    score = Score(
+        user_id=user_id,
+        quiz_id=quiz_id,
+        total_scored=correct,
+        total_questions=len(answer_key),
+        responses=responses.tobytes(),
+        response_layout=answer_key.layout
+    )
+    # The unique (user_id, quiz_id) constraint rejects duplicate submissions
+    db.session.add(score)
+    record_score(score, answer_key.chapter_id, answer_key.subject_id)
+    return correct
 
 # Submit quiz answers
 @student_bp.route("/quizzes/<int:quiz_id>/submit", methods=["POST"])
@@ -66,60 +115,111 @@ def submit_quiz(quiz_id):
     try:
         data = request.get_json()
         user_id = verify_token(request.headers['Authorization'])["user_id"]
-        
-        if Score.query.filter_by(user_id=user_id, quiz_id=quiz_id).first():
-            return jsonify({"error": "Already submitted"}), 400
 
-        questions = Question.query.filter_by(quiz_id=quiz_id).all()
-        correct = sum(
-            1 for q in questions 
-            if str(data['answers'].get(str(q.id))) == str(q.correct_option)
-        )
-
-        score = Score(
-            user_id=user_id,
-            quiz_id=quiz_id,
-            total_scored=correct,
-            total_questions=len(questions)
-        )
-        
-        db.session.add(score)
-        db.session.commit()
+        answer_key = get_answer_key(quiz_id)
+        if answer_key is None:
+            return jsonify({"error": "Quiz not found"}), 404
+
+        posted = {
+            str(question_id): option
+            for question_id, option in ((data or {}).get('answers') or {}).items() if option is not None
+        }
+        correct = write(_record_submission, user_id, quiz_id, answer_key, posted)
+        total = len(answer_key)
+        discard_autosave(user_id, quiz_id)
+        record_leaderboard_score(quiz_id, user_id, correct)
 
         return jsonify({
             "score": correct,
-            "total": len(questions),
-            "percentage": round((correct / len(questions)) * 100, 2)
+            "total": total,
+            "percentage": round((correct / total) * 100, 2) if total else 0
         })
 
+    except IntegrityError as e:
+        db.session.rollback()
+        # Only the one-score-per-quiz constraint means a duplicate; a quiz deleted
+        # after its answer key was read fails the score's foreign key instead
+        if db.session.query(Score.id).filter_by(user_id=user_id, quiz_id=quiz_id).first():
+            return jsonify({"error": "Already submitted"}), 400
+        if db.session.query(Quiz.id).filter_by(id=quiz_id).first() is None:
+            return jsonify({"error": "Quiz not found"}), 404
+        print(f"Submission error: {str(e)}")
+        return jsonify({"error": "Internal server error"}), 500
     except Exception as e:
         db.session.rollback()
         print(f"Submission error: {str(e)}")
         return jsonify({"error": "Internal server error"}), 500
 
+@student_bp.route("/quizzes/<int:quiz_id>/answers", methods=["PUT"])
+@student_required
+def autosave_answers(quiz_id):
+    # Buffered only; the background flusher writes the draft
+    user_id = verify_token(request.headers['Authorization'])["user_id"]
+    # Submit grades against the current key; validating a save may use a cached one
+    answer_key = get_answer_key(quiz_id, current=False)
+    if answer_key is None:
+        return jsonify({"error": "Quiz not found"}), 404
+    try:
+        answers = clean_answers(answer_key, (request.get_json(silent=True) or {}).get("answers"))
+    except AnswerError as e:
+        return jsonify({"error": str(e)}), 400
+    if answers:
+        save_answers(user_id, quiz_id, answers)
+    return jsonify({"saved": len(answers)}), 202
+
+@student_bp.route("/quizzes/<int:quiz_id>/answers", methods=["GET"])
+@student_required
+def get_saved_answers(quiz_id):
+    user_id = verify_token(request.headers['Authorization'])["user_id"]
+    answers = saved_answers(user_id, quiz_id)
+    return jsonify({"answers": {question_id: option or None for question_id, option in answers.items()}}), 200
+
+RESULT_FIELDS = {
+    "quiz_id": Field(Score.quiz_id),
+    "chapter": Field(Chapter.name),
+    "score": Field(Score.total_scored, Score.total_questions, format=lambda scored, total: f"{scored}/{total}"),
+    "date": Field(Score.timestamp, format=iso)
+}
+
 @student_bp.route("/results", methods=["GET"])
 @student_required
 def get_results():
     user_id = verify_token(request.headers['Authorization'])["user_id"]
-    scores = Score.query.filter_by(user_id=user_id).all()
-    return jsonify([{
-        "quiz_id": s.quiz_id,
-        "chapter": s.quiz.chapter.name,
-        "score": f"{s.total_scored}/{s.total_questions}",
-        "date": s.timestamp.isoformat()
-    } for s in scores])
+    base = select().select_from(Score).join(Quiz, Quiz.id == Score.quiz_id) \
+        .join(Chapter, Chapter.id == Quiz.chapter_id).where(Score.user_id == user_id)
+    # Newest first, walking ix_score_user_id_timestamp
+    page = paginate(db.session, base, RESULT_FIELDS, [(Score.timestamp, True), (Score.id, True)])
+    return jsonify({"items": page.items, "next_cursor": page.next_cursor})
+
+@student_bp.route("/export", methods=["POST"])
+@student_required
+def request_export():
+    user_id = verify_token(request.headers['Authorization'])["user_id"]
+    export_csv_task.delay(user_id)
+    return jsonify({"message": "Export started! You'll receive an email when ready."}), 202
+
+@student_bp.route("/export.csv", methods=["GET"])
+@student_required
+def stream_export():
+    user_id = verify_token(request.headers['Authorization'])["user_id"]
+    return csv_response(SCORE_CSV_HEADER, iter_user_score_rows(user_id), "quiz_history.csv",
+                        compress=request.args.get("gzip") == "1")
 
 @student_bp.route("/results/<int:quiz_id>", methods=["GET"])
 @student_required
 def get_single_result(quiz_id):
     user_id = verify_token(request.headers['Authorization'])["user_id"]
-    result = Score.query.options(
-        joinedload(Score.quiz).joinedload(Quiz.chapter)
-    ).filter_by(
+    result = Score.query.options(*loader_options("results")).filter_by(
         user_id=user_id,
         quiz_id=quiz_id
     ).first_or_404()
 
+    top_n = min(max(request.args.get("top", current_app.config.get("LEADERBOARD_TOP_N", 10), type=int), 0), 50)
+    standing = quiz_standing(quiz_id, result.total_scored or 0, top_n)
+    usernames = dict(db.session.query(User.id, User.username).filter(
+        User.id.in_([user_id for _, user_id, _ in standing["top"]])
+    )) if standing["top"] else {}
+
     return jsonify({
         "quiz": {
             "chapter": {
@@ -128,14 +228,25 @@ def get_single_result(quiz_id):
         },
         "total_scored": result.total_scored,
         "total_questions": result.total_questions,
-        "timestamp": result.timestamp.isoformat()
+        "timestamp": result.timestamp.isoformat(),
+        "leaderboard": {
+            "rank": standing["rank"],
+            "percentile": standing["percentile"],
+            "participants": standing["participants"],
+            "top": [{
+                "rank": rank,
+                "username": usernames.get(entry_user_id),
+                "score": score,
+                "is_you": entry_user_id == user_id
+            } for rank, entry_user_id, score in standing["top"]]
+        }
     })
 
 @student_bp.route("/profile", methods=["GET", "PUT"])
 @student_required
 def profile():
     user_id = verify_token(request.headers['Authorization'])["user_id"]
-    user = User.query.get_or_404(user_id)
+    user = User.query.options(*loader_options("profile")).get_or_404(user_id)
     
     if request.method == "GET":
         return jsonify({
@@ -157,19 +268,22 @@ def profile():
 @student_bp.route("/quizzes/<int:quiz_id>/start", methods=["GET"])
 @student_required
 def start_quiz(quiz_id):
-    quiz = Quiz.query.get_or_404(quiz_id)
-    return jsonify({
-        "questions": [{
-            "id": q.id,
-            "question": q.question_text,
-            "options": [q.option_1, q.option_2, q.option_3, q.option_4]
-        } for q in quiz.questions],
-        "duration": quiz.time_duration ,
-        "updated_at": quiz.date_of_quiz.isoformat()
-    })
+    version = db.session.query(Quiz.content_version).filter(Quiz.id == quiz_id).scalar()
+    if version is None:
+        abort(404)
+    etag = quiz_etag(quiz_id, version)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    payload = quiz_payload(quiz_id, version)
+    if payload is None:
+        abort(404)
+    return versioned_response(*payload)
 
 @student_bp.route("/performance", methods=["GET"])
 @student_required
+@read_only
 def get_student_performance():
     user_id = verify_token(request.headers['Authorization'])["user_id"]
     
@@ -180,31 +294,34 @@ def get_student_performance():
         Score.total_questions,
         Score.timestamp
     ).join(Chapter, Quiz.chapter_id == Chapter.id).join(Score, Quiz.id == Score.quiz_id).filter(Score.user_id == user_id).order_by(Score.timestamp.desc()).limit(5).all()
-    # Overall Performance
-    scores = Score.query.filter_by(user_id=user_id).all()
-    total_quizzes = len(scores)
-    average_score = sum(s.total_scored for s in scores) / sum(s.total_questions for s in scores) * 100 if scores else 0
+    # Overall Performance: one primary-key lookup and one index range scan,
+    # whatever the length of the student's history
+    stats = db.session.get(UserScoreStats, user_id)
+    total_correct = stats.sum_scored if stats else 0
+    total_attempted = stats.sum_questions if stats else 0
+    average_score = total_correct / total_attempted * 100 if total_attempted else 0
     
     subjects = db.session.query(
         Subject.name,
-        func.avg(Score.total_scored).label('avg_score'),
-        func.sum(Score.total_scored).label('total_correct'),
-        func.sum(Score.total_questions).label('total_questions')
-    ).join(Chapter, Subject.id == Chapter.subject_id).join(Quiz, Chapter.id == Quiz.chapter_id).join(Score, Quiz.id == Score.quiz_id).filter(Score.user_id == user_id).group_by(Subject.name).all()
+        UserSubjectScoreStats.sum_scored,
+        UserSubjectScoreStats.sum_questions
+    ).join(Subject, Subject.id == UserSubjectScoreStats.subject_id).filter(
+        UserSubjectScoreStats.user_id == user_id
+    ).order_by(Subject.name).all()
 
     # Format response
     return jsonify({
         "overview": {
-            "total_quizzes": total_quizzes,
+            "total_quizzes": stats.attempts if stats else 0,
             "average_score": round(average_score, 1),
-            "total_correct": sum(s.total_scored for s in scores),
-            "total_attempted": sum(s.total_questions for s in scores)
+            "total_correct": total_correct,
+            "total_attempted": total_attempted
         },
         "subjects": [{
-            "name": sub[0],
-            "accuracy": round((sub[1]/sub[3])*100, 1) if sub[3] else 0,
-            "total_questions": sub[3],
-            "correct": sub[2]
+            "name": sub.name,
+            "accuracy": round((sub.sum_scored/sub.sum_questions)*100, 1) if sub.sum_questions else 0,
+            "total_questions": sub.sum_questions,
+            "correct": sub.sum_scored
         } for sub in subjects]
         ,
         "recent_attempts": [{
@@ -0,0 +1,202 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from flask import current_app
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from models import db
+from metrics import attribute_queued_job
+
+# SQLite production mode for file databases. Every pooled connection runs in
+# WAL with synchronous=NORMAL, a memory map and a busy timeout, so readers never
+# wait on the writer. With SQLITE_WRITE_QUEUE=1, the student hot path (quiz
+# submits, login bookkeeping, autosave flushes) goes through one writer thread
+# per process that commits whatever is queued as one transaction (group
+# commit): concurrent submits stop fighting over the database lock, and N small
+# writes cost one fsync instead of N. Admin CRUD, question imports and Celery
+# tasks are not queued; they commit in their own sessions and wait out the
+# writer through busy_timeout.
+
+def is_sqlite_file(uri):
+    url = make_url(uri)
+    return (url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+            and url.query.get("mode") != "memory")
+
+def sqlite_production_mode(config):
+    return config.get("SQLITE_PRODUCTION_MODE", True) and is_sqlite_file(config["SQLALCHEMY_DATABASE_URI"])
+
+def sqlite_engine_options(config):
+    """Engine options for create_app(); call before db.init_app()."""
+    options = dict(config.get("SQLALCHEMY_ENGINE_OPTIONS") or {})
+    options.setdefault("pool_size", config.get("SQLITE_POOL_SIZE", 8))
+    options.setdefault("max_overflow", config.get("SQLITE_MAX_OVERFLOW", 8))
+    options.setdefault("pool_timeout", config.get("SQLITE_POOL_TIMEOUT", 30))
+    connect_args = dict(options.get("connect_args") or {})
+    # pysqlite's own lock wait, in seconds; busy_timeout below matches it
+    connect_args.setdefault("timeout", config.get("SQLITE_BUSY_TIMEOUT_MS", 5000) / 1000)
+    options["connect_args"] = connect_args
+    return options
+
+def init_sqlite(app):
+    with app.app_context():
+        engine = db.engine
+    if engine.dialect.name != "sqlite":
+        return
+    # Catalog deletes rely on ON DELETE CASCADE, which SQLite only enforces per connection
+    pragmas = ["PRAGMA foreign_keys=ON"]
+    if sqlite_production_mode(app.config):
+        pragmas += [
+            "PRAGMA journal_mode=WAL",
+            "PRAGMA synchronous=NORMAL",
+            f"PRAGMA busy_timeout={int(app.config.get('SQLITE_BUSY_TIMEOUT_MS', 5000))}",
+            f"PRAGMA mmap_size={int(app.config.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))}",
+            f"PRAGMA cache_size=-{int(app.config.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))}",
+            "PRAGMA temp_store=MEMORY",
+        ]
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+class SQLiteWriter:
+    """One thread that runs queued write jobs, committing each batch together.
+
+    A job is a function doing its writes through db.session; its return value
+    (plain data, not ORM instances) resolves the caller's future once the batch
+    commits. If a batch fails, its jobs are retried one transaction each so
+    only the failing job sees the error.
+    """
+
+    def __init__(self, app, batch_size=64, linger=0.0):
+        self._app = app
+        self._batch_size = batch_size
+        self._linger = linger
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.jobs = 0
+        self.batches = 0
+        self.largest_batch = 0
+        self.retried_batches = 0
+        threading.Thread(target=self._run, name="sqlite-writer", daemon=True).start()
+
+    def submit(self, fn, *args):
+        future = Future()
+        self._queue.put((future, fn, args))
+        return future
+
+    def _take(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._linger
+        while len(batch) < self._batch_size:
+            try:
+                remaining = deadline - time.monotonic()
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return [job for job in batch if job[0].set_running_or_notify_cancel()]
+
+    def _run(self):
+        while True:
+            batch = self._take()
+            if not batch:
+                continue
+            with self._app.app_context():
+                try:
+                    self._execute(batch)
+                finally:
+                    db.session.remove()
+
+    def _commit(self, jobs):
+        try:
+            results = [fn(*args) for _, fn, args in jobs]
+            db.session.commit()
+            return results
+        except BaseException:
+            db.session.rollback()
+            raise
+
+    def _execute(self, batch):
+        with self._lock:
+            self.jobs += len(batch)
+            self.batches += 1
+            self.largest_batch = max(self.largest_batch, len(batch))
+        try:
+            results = self._commit(batch)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][0].set_exception(e)
+                return
+            with self._lock:
+                self.retried_batches += 1
+            for job in batch:
+                try:
+                    job[0].set_result(self._commit([job])[0])
+                except Exception as job_error:
+                    job[0].set_exception(job_error)
+            return
+        for (future, _, _), result in zip(batch, results):
+            future.set_result(result)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "jobs": self.jobs,
+                "batches": self.batches,
+                "average_batch": round(self.jobs / self.batches, 2) if self.batches else None,
+                "largest_batch": self.largest_batch,
+                "retried_batches": self.retried_batches,
+                "queued": self._queue.qsize()
+            }
+
+_writer_lock = threading.Lock()
+
+def get_sqlite_writer():
+    """The process's writer when the write queue applies to this app, else None."""
+    app = current_app._get_current_object()
+    writer = app.extensions.get("sqlite_writer")
+    if writer is None:
+        if not (app.config.get("SQLITE_WRITE_QUEUE", False) and sqlite_production_mode(app.config)):
+            return None
+        with _writer_lock:
+            writer = app.extensions.get("sqlite_writer")
+            if writer is None:
+                writer = app.extensions["sqlite_writer"] = SQLiteWriter(
+                    app,
+                    batch_size=app.config.get("SQLITE_WRITE_BATCH_SIZE", 64),
+                    linger=app.config.get("SQLITE_WRITE_LINGER_MS", 0) / 1000
+                )
+    return writer
+
+def write(fn, *args, wait=True):
+    """Run fn(*args) as a committed write and return its result.
+
+    With the write queue the job runs on the writer thread in its own session,
+    its statements still counted towards the calling request's metrics;
+    wait=False returns the future instead of blocking. Without it the job runs
+    and commits in the caller's session.
+    """
+    writer = get_sqlite_writer()
+    if writer is None:
+        try:
+            result = fn(*args)
+            db.session.commit()
+            return result
+        except BaseException:
+            db.session.rollback()
+            raise
+    future = writer.submit(attribute_queued_job(fn), *args)
+    if wait:
+        return future.result()
+    logger = current_app.logger
+    future.add_done_callback(
+        lambda done: done.exception() and logger.error("Queued write %s failed", fn.__name__, exc_info=done.exception())
+    )
+    return future
+
+def sqlite_writer_stats():
+    writer = current_app.extensions.get("sqlite_writer")
+    return writer.stats() if writer else None
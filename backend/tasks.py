@@ -1,97 +1,160 @@
-from datetime import datetime, timedelta
-from jinja2 import Template
-import csv
-import os
+from datetime import date, datetime, timedelta
+from celery import Celery, Task, group
+from celery.signals import worker_process_init
+from config import Config
+from read_routing import read_only
+
+# One Flask app per process. The web process registers its own app through
+# init_celery(); a worker builds one lazily (or at process start) and reuses it
+# for every task instead of calling create_app() per invocation.
+_flask_app = None
+
+def get_flask_app():
+    global _flask_app
+    if _flask_app is None:
+        from app import create_app
+        _flask_app = create_app()
+    return _flask_app
+
+class FlaskTask(Task):
+    """Runs each task inside an app context pushed from the process-wide app."""
+
+    def __call__(self, *args, **kwargs):
+        with get_flask_app().app_context():
+            return self.run(*args, **kwargs)
+
+celery = Celery(
+    __name__,
+    broker=Config.CELERY_BROKER_URL,
+    backend=Config.CELERY_RESULT_BACKEND,
+    task_cls=FlaskTask
+)
+celery.conf.update(
+    task_serializer="json",
+    accept_content=["json"],
+    result_serializer="json",
+    timezone="UTC",
+    enable_utc=True,
+    beat_schedule={
+        "prewarm-quiz-payloads": {"task": "tasks.prewarm_quiz_payloads_task", "schedule": Config.QUIZ_PREWARM_INTERVAL},
+        # One writer for the host's shared SQLite read snapshot; a no-op unless SQLITE_READ_SNAPSHOT=1
+        "refresh-sqlite-snapshot": {"task": "tasks.refresh_sqlite_snapshot_task", "schedule": Config.SQLITE_SNAPSHOT_INTERVAL}
+    },
+    broker_connection_retry_on_startup=Config.broker_connection_retry_on_startup
+)
+
+def init_celery(app):
+    """Bind the web process's app so tasks run (or are enqueued) without building another."""
+    global _flask_app
+    _flask_app = app
+    celery.conf.update(
+        broker_url=app.config["CELERY_BROKER_URL"],
+        result_backend=app.config["CELERY_RESULT_BACKEND"]
+    )
+    app.extensions["celery"] = celery
+    return celery
+
+@worker_process_init.connect
+def _init_worker_process(**kwargs):
+    # Build the app and its engine once per forked worker; connections pooled
+    # by the parent must not be shared across processes
+    app = get_flask_app()
+    with app.app_context():
+        from models import db
+        db.engine.dispose(close=False)
 
 @celery.task
 def send_daily_reminders():
-    from app import create_app
-    app, _ = create_app()
-    with app.app_context():
-        from models import User, Quiz, Score
-        from extensions import mail
-        
-        now = datetime.utcnow()
-        cutoff_time = now - timedelta(hours=24)
-        
-        # Get inactive users (no visits in last 24h)
-        inactive_users = User.query.filter(
-            User.last_visited_at < cutoff_time,
-            User.role == 'student'
-        ).all()
+    from daily_reminders import iter_inactive_student_pages, prune_reminder_markers
+
+    now = datetime.utcnow()
+    cutoff_time = now - timedelta(hours=24)
+    prune_reminder_markers(now.date())
+
+    # Only one page of ids is held at a time; each page becomes its own subtask
+    pages = 0
+    for user_ids in iter_inactive_student_pages(cutoff_time):
+        send_daily_reminder_page.delay(now.date().isoformat(), user_ids)
+        pages += 1
+    return pages
 
 @celery.task
-def generate_monthly_reports():
-    from app import create_app
-    app, _ = create_app()
-    with app.app_context():
-        from models import User, Score, Quiz, Chapter
-        from extensions import mail
-        
-        first_day = datetime.utcnow().replace(day=1, hour=0, minute=0, second=0)
-        last_month = first_day - timedelta(days=1)
-        
-        for user in User.query.filter_by(role='student').all():
-            scores = Score.query.filter(
-                Score.user_id == user.id,
-                Score.timestamp >= last_month.replace(month=last_month.month, day=1),
-                Score.timestamp < first_day
-            ).join(Quiz).join(Chapter).all()
-            
-            if scores:
-                report_html = render_template('monthly_report.html',
-                    user=user,
-                    scores=scores,
-                    month=last_month.strftime('%B %Y')
-                )
-                
-                msg = Message(
-                    f"Monthly Quiz Report - {last_month.strftime('%B %Y')}",
-                    recipients=[user.email],
-                    html=report_html
-                )
-                mail.send(msg)
-
-def export_user_csv(user_id):
-    from models import Score, Quiz, Chapter
-    scores = Score.query.filter_by(user_id=user_id).join(Quiz).join(Chapter).all()
-    
-    filename = f"quiz_report_{user_id}_{datetime.utcnow().timestamp()}.csv"
-    filepath = os.path.join(app.config['TEMP_DIR'], filename)
-    
-    with open(filepath, 'w', newline='') as f:
-        writer = csv.writer(f)
-        writer.writerow(['Quiz ID', 'Chapter', 'Date', 'Score', 'Total', 'Percentage'])
-        for score in scores:
-            writer.writerow([
-                score.quiz_id,
-                score.quiz.chapter.name,
-                score.timestamp.date(),
-                score.total_scored,
-                score.total_questions,
-                f"{(score.total_scored/score.total_questions)*100:.2f}%"
-            ])
-    
-    return filepath
+def send_daily_reminder_page(day, user_ids):
+    from daily_reminders import send_reminder_page
+    return send_reminder_page(date.fromisoformat(day), user_ids)
+
+@celery.task
+@read_only
+def generate_monthly_reports(month=None):
+    # Only enumerates pending students; each chunk re-checks deliveries on the primary
+    from monthly_reports import iter_pending_user_chunks, report_month
+
+    month, start, end = report_month(month)
+    chunks = list(iter_pending_user_chunks(month, start, end))
+    if chunks:
+        group(send_monthly_report_chunk.s(month, user_ids) for user_ids in chunks).apply_async()
+    return len(chunks)
+
+@celery.task
+def send_monthly_report_chunk(month, user_ids):
+    from monthly_reports import report_month, send_reports
+
+    month, start, end = report_month(month)
+    return send_reports(month, start, end, user_ids)
+
+@celery.task
+def rebuild_analytics_rollups():
+    from rollups import rebuild_rollups
+    rebuild_rollups()
+
+@celery.task
+def refresh_item_analyses_task():
+    from item_analysis import refresh_item_analyses
+    return refresh_item_analyses()
+
+@celery.task
+def prewarm_quiz_payloads_task():
+    from content_versions import prewarm_quiz_payloads
+    return prewarm_quiz_payloads()
+
+@celery.task
+def refresh_sqlite_snapshot_task():
+    from read_routing import refresh_sqlite_snapshot
+    return refresh_sqlite_snapshot()
+
+@celery.task(bind=True)
+def delete_catalog_task(self, subject_id=None, chapter_id=None):
+    from flask import current_app
+    from catalog_deletes import delete_in_chunks, forget_deleted
+
+    def on_chunk(quiz_ids, deleted, total):
+        forget_deleted(quiz_ids)
+        self.update_state(state="PROGRESS", meta={"deleted_quizzes": deleted, "total_quizzes": total})
+
+    chunk_size = current_app.config.get("CATALOG_DELETE_CHUNK_QUIZZES", 50)
+    quiz_ids = delete_in_chunks(subject_id, chapter_id, chunk_size, on_chunk)
+    forget_deleted([], subject_id, chapter_id)
+    # The ids let the web process that reports completion clear its own caches
+    return {"deleted_quizzes": len(quiz_ids), "total_quizzes": len(quiz_ids), "quiz_ids": quiz_ids,
+            "subject_id": subject_id, "chapter_id": chapter_id}
 
 @celery.task
 def export_csv_task(user_id):
-    from app import create_app
-    app, _ = create_app()
-    with app.app_context():
-        from models import User
-        from extensions import mail
-        
-        user = User.query.get(user_id)
-        filepath = export_user_csv(user_id)
-        
-        msg = Message(
-            "Your Quiz Export is Ready",
-            recipients=[user.email]
-        )
-        msg.body = "Please find attached your quiz history export."
-        with open(filepath, 'rb') as f:
-            msg.attach("quiz_history.csv", "text/csv", f.read())
-        
-        mail.send(msg)
-        os.remove(filepath)
\ No newline at end of file
+    from models import User
+    from extensions import mail
+    from loader_profiles import loader_options
+    from flask_mail import Message
+    from csv_export import SCORE_CSV_HEADER, iter_csv, iter_user_score_rows
+    
+    user = User.query.options(*loader_options("profile")).get(user_id)
+    # Encode straight into the attachment; no temp file to write and read back
+    attachment = b"".join(iter_csv(SCORE_CSV_HEADER, iter_user_score_rows(user_id)))
+    
+    msg = Message(
+        "Your Quiz Export is Ready",
+        recipients=[user.email]
+    )
+    msg.body = "Please find attached your quiz history export."
+    msg.attach("quiz_history.csv", "text/csv", attachment)
+    
+    mail.send(msg)
\ No newline at end of file
@@ -0,0 +1,52 @@
+import os
+import sys
+
+# Config reads the environment when it is imported: every test app gets a
+# throwaway in-memory database, no background autosave flusher, and
+# leaderboards built inline on first use
+os.environ["DATABASE_URL"] = "sqlite://"
+os.environ["AUTOSAVE_FLUSH_INTERVAL"] = "0"
+os.environ["LEADERBOARD_BACKGROUND_BUILD"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+import pytest
+from models import db, User
+
+@pytest.fixture(scope="session")
+def token():
+    def token(user, role):
+        return jwt.encode({"user_id": user.id, "role": role}, "geet", algorithm="HS256")
+    return token
+
+@pytest.fixture
+def app():
+    from app import create_app
+    app = create_app()
+    app.config["RESPONSE_CACHE_ENABLED"] = False
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def admin_headers(app, token):
+    with app.app_context():
+        admin = User(username="admin", email="admin@example.com", password_hash="!", role="admin")
+        db.session.add(admin)
+        db.session.commit()
+        return {"Authorization": token(admin, "admin")}
+
+@pytest.fixture
+def student_headers(app, token):
+    with app.app_context():
+        student = User(username="student", email="student@example.com", password_hash="!", role="student")
+        db.session.add(student)
+        db.session.commit()
+        return {"Authorization": token(student, "student")}
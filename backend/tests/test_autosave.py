@@ -0,0 +1,76 @@
+import pytest
+from flask import Flask
+from sqlalchemy import select
+from models import db, Subject, Chapter, Quiz, Question, AnswerDraft
+import autosave
+from autosave import check_autosave_config, flush_all_autosaves, get_autosave_buffer
+
+@pytest.fixture
+def quiz(app):
+    with app.app_context():
+        quiz = Quiz(chapter=Chapter(name="Chapter", subject=Subject(name="Subject")), time_duration=30)
+        for correct in (1, 2, 3):
+            quiz.questions.append(Question(title="Q", question_text="?", option_1="a", option_2="b",
+                                           option_3="c", option_4="d", correct_option=correct))
+        db.session.add(quiz)
+        db.session.commit()
+        return quiz.id, [question.id for question in quiz.questions]
+
+def _save(client, headers, quiz_id, answers):
+    response = client.put(f"/student/quizzes/{quiz_id}/answers", json={"answers": answers}, headers=headers)
+    assert response.status_code == 202
+
+def _drafts(app):
+    with app.app_context():
+        return db.session.scalars(select(AnswerDraft.answers)).all()
+
+def test_submit_grades_flushed_and_buffered_answers(app, client, quiz, student_headers):
+    quiz_id, (first, second, third) = quiz
+    _save(client, student_headers, quiz_id, {str(first): 1, str(second): 4})
+    with app.app_context():
+        assert flush_all_autosaves() == 1
+        assert get_autosave_buffer().pending() == 0
+    assert len(_drafts(app)) == 1
+    # Overwrites a flushed answer and adds one that is only buffered
+    _save(client, student_headers, quiz_id, {str(second): 2, str(third): 3})
+    assert client.get(f"/student/quizzes/{quiz_id}/answers", headers=student_headers).get_json() == {
+        "answers": {str(first): 1, str(second): 2, str(third): 3}
+    }
+
+    response = client.post(f"/student/quizzes/{quiz_id}/submit", json={"answers": {}}, headers=student_headers)
+    assert response.get_json()["score"] == 3
+    assert _drafts(app) == []
+    with app.app_context():
+        assert get_autosave_buffer().pending() == 0
+        assert flush_all_autosaves() == 0
+    assert _drafts(app) == []
+
+def test_submit_during_a_flush_grades_the_batch_and_leaves_no_draft(app, client, quiz, student_headers, monkeypatch):
+    quiz_id, (first, second, third) = quiz
+    _save(client, student_headers, quiz_id, {str(first): 1, str(second): 2})
+    write_drafts = autosave._write_drafts
+    submitted = []
+
+    def submit_then_write(batch):
+        # The flush has taken the batch from the buffer but not written it yet
+        response = client.post(f"/student/quizzes/{quiz_id}/submit", json={"answers": {str(third): 3}},
+                               headers=student_headers)
+        submitted.append(response.get_json()["score"])
+        return write_drafts(batch)
+
+    monkeypatch.setattr(autosave, "_write_drafts", submit_then_write)
+    with app.app_context():
+        assert flush_all_autosaves() == 1
+        assert get_autosave_buffer().pending() == 0
+    assert submitted == [3]
+    assert _drafts(app) == []
+
+@pytest.mark.parametrize("url,workers,fails", [(None, 1, False), (None, 4, True), ("fakeredis://", 4, False)])
+def test_several_workers_need_a_shared_buffer(url, workers, fails):
+    app = Flask(__name__)
+    app.config.update(AUTOSAVE_URL=url, WEB_CONCURRENCY=workers)
+    if fails:
+        with pytest.raises(RuntimeError, match="AUTOSAVE_URL"):
+            check_autosave_config(app)
+    else:
+        check_autosave_config(app)
@@ -0,0 +1,77 @@
+import csv
+import gzip
+import io
+import pytest
+import csv_export
+from models import db, Subject, Chapter, Quiz, Score, User
+
+def _seed(app, students=2, quizzes=3):
+    with app.app_context():
+        chapter = Chapter(name="Chapter", subject=Subject(name="Subject"))
+        quiz_list = [Quiz(chapter=chapter, time_duration=30) for _ in range(quizzes)]
+        db.session.add_all(quiz_list)
+        for s in range(students):
+            user = User(username=f"s{s}", email=f"s{s}@example.com", password_hash="!", role="student")
+            db.session.add_all(Score(user=user, quiz=quiz, total_scored=q + s, total_questions=5)
+                               for q, quiz in enumerate(quiz_list))
+        db.session.commit()
+
+def _endpoint_metrics(app, endpoint):
+    return app.extensions["metrics"].snapshot()["endpoints"].get(endpoint)
+
+def test_streamed_export_records_metrics_after_the_body(app, client, admin_headers):
+    _seed(app)
+    response = client.get("/admin/export/scores.csv", headers=admin_headers)
+    assert _endpoint_metrics(app, "admin.export_cohort_scores") is None
+    response.get_data()
+    response.close()
+
+    stats = _endpoint_metrics(app, "admin.export_cohort_scores")
+    assert stats["requests"] == 1
+    assert stats["statuses"] == {"200": 1}
+    # The cohort query runs while the body streams, after the view returned
+    assert stats["sql_statements"] >= 1
+
+def _rows(data):
+    return list(csv.reader(io.StringIO(data.decode("utf-8"))))
+
+@pytest.fixture
+def small_chunks(monkeypatch):
+    # Several chunks per export instead of one, so chunk boundaries are exercised
+    monkeypatch.setattr(csv_export, "ROWS_PER_CHUNK", 2)
+
+@pytest.mark.parametrize("compress", [False, True], ids=["plain", "gzip"])
+def test_cohort_export_streams_every_score(app, client, admin_headers, small_chunks, compress):
+    _seed(app, students=2, quizzes=3)
+    response = client.get(f"/admin/export/scores.csv{'?gzip=1' if compress else ''}", headers=admin_headers)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.mimetype == ("application/gzip" if compress else "text/csv")
+    assert response.headers["Content-Disposition"].endswith("cohort_scores.csv.gz" if compress else "cohort_scores.csv")
+    data = response.get_data()
+    rows = _rows(gzip.decompress(data) if compress else data)
+
+    assert rows[0] == csv_export.COHORT_CSV_HEADER
+    assert len(rows) == 1 + 2 * 3
+    assert [(row[1], row[6], row[7], row[8]) for row in rows[1:4]] == [
+        ("s0", "0", "5", "0.00%"), ("s0", "1", "5", "20.00%"), ("s0", "2", "5", "40.00%")
+    ]
+    assert {row[1] for row in rows[4:]} == {"s1"}
+
+@pytest.mark.parametrize("compress", [False, True], ids=["plain", "gzip"])
+def test_student_export_streams_only_their_scores(app, client, token, small_chunks, compress):
+    _seed(app, students=2, quizzes=3)
+    with app.app_context():
+        student = db.session.query(User).filter_by(username="s1").one()
+        headers = {"Authorization": token(student, "student")}
+    response = client.get(f"/student/export.csv{'?gzip=1' if compress else ''}", headers=headers)
+    assert response.status_code == 200
+    assert response.is_streamed
+    assert response.headers["Content-Disposition"].endswith("quiz_history.csv.gz" if compress else "quiz_history.csv")
+    data = response.get_data()
+    rows = _rows(gzip.decompress(data) if compress else data)
+
+    assert rows[0] == csv_export.SCORE_CSV_HEADER
+    assert [(row[3], row[4], row[5]) for row in rows[1:]] == [
+        ("1", "5", "20.00%"), ("2", "5", "40.00%"), ("3", "5", "60.00%")
+    ]
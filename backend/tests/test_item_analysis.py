@@ -0,0 +1,72 @@
+import numpy as np
+from models import db, Subject, Chapter, Quiz, Question
+import item_analysis
+from item_analysis import analyse, get_item_analysis
+
+KEY = [1, 2, 3]
+# Picked options per attempt (0 = unanswered); scored against KEY this is
+#   [1, 1, 1]  total 3
+#   [1, 1, 0]  total 2
+#   [1, 0, 0]  total 1
+#   [0, 0, 0]  total 0
+PICKS = [
+    [1, 2, 3],
+    [1, 2, 4],
+    [1, 3, 0],
+    [4, 0, 0],
+]
+
+def _matrix(rows):
+    return np.array(rows, dtype=np.uint8).reshape(len(rows), -1)
+
+def test_analyse_matches_hand_computed_statistics():
+    stats = analyse(_matrix(PICKS), KEY)
+    assert stats["attempts"] == 4
+    assert stats["difficulty"] == [0.75, 0.5, 0.25]
+    # Item against the rest score: item 1 has cov 0.75 over sqrt(0.75 * 2.75),
+    # item 2 has 1 over sqrt(1 * 2), item 3 mirrors item 1
+    assert stats["discrimination"] == [0.5222, 0.7071, 0.5222]
+    # Item variances 1/4 + 1/3 + 1/4 = 5/6, total variance 5/3: 3/2 * (1 - 1/2)
+    assert stats["cronbach_alpha"] == 0.75
+    assert stats["option_frequencies"] == [
+        [0.0, 0.75, 0.0, 0.0, 0.25],
+        [0.25, 0.0, 0.5, 0.25, 0.0],
+        [0.5, 0.0, 0.0, 0.25, 0.25],
+    ]
+
+def test_analyse_zero_variance():
+    # Everyone answers everything correctly: no spread to correlate or split
+    stats = analyse(_matrix([KEY] * 3), KEY)
+    assert stats["difficulty"] == [1.0, 1.0, 1.0]
+    assert stats["discrimination"] == [None, None, None]
+    assert stats["cronbach_alpha"] is None
+
+    # One constant item among varied ones only loses its own discrimination
+    stats = analyse(_matrix([[1, 2, 3], [1, 2, 0], [1, 0, 0]]), KEY)
+    assert stats["discrimination"][0] is None
+    assert stats["discrimination"][1:] == [0.5, 0.5]
+    assert stats["cronbach_alpha"] is not None
+
+def test_analyse_single_item():
+    stats = analyse(_matrix([[1], [0], [1]]), [1])
+    assert stats["difficulty"] == [0.6667]
+    # The rest score is always 0, and alpha needs at least two items
+    assert stats["discrimination"] == [None]
+    assert stats["cronbach_alpha"] is None
+
+def test_analyse_without_attempts():
+    stats = analyse(np.zeros((0, 3), dtype=np.uint8), KEY)
+    assert stats["attempts"] == 0
+    assert stats["difficulty"] == [None, None, None]
+    assert stats["cronbach_alpha"] is None
+
+def test_quiz_deleted_during_analysis_is_not_found(app, monkeypatch):
+    with app.app_context():
+        quiz = Quiz(chapter=Chapter(name="Chapter", subject=Subject(name="Subject")), time_duration=30)
+        quiz.questions.append(Question(title="Q", question_text="?", option_1="a", option_2="b",
+                                       option_3="c", option_4="d", correct_option=1))
+        db.session.add(quiz)
+        db.session.commit()
+        # The version lookup still sees the quiz, the answer key no longer does
+        monkeypatch.setattr(item_analysis, "get_answer_key", lambda quiz_id: None)
+        assert get_item_analysis(quiz.id) is None
@@ -0,0 +1,64 @@
+import pytest
+from models import db, User, Subject, Chapter, Quiz, Score
+from leaderboard import _leaderboards, get_leaderboards, quiz_standing, rebuild_leaderboards
+from query_counter import count_queries
+
+@pytest.fixture(params=[None, "fakeredis://"], ids=["local", "redis"])
+def boards_app(app, request):
+    app.config["LEADERBOARD_URL"] = request.param
+    with app.app_context():
+        quiz = Quiz(chapter=Chapter(name="Chapter", subject=Subject(name="Subject")), time_duration=30)
+        users = [User(username=f"u{i}", email=f"u{i}@example.com", password_hash="!", role="student")
+                 for i in range(3)]
+        db.session.add_all([quiz, *users])
+        db.session.flush()
+        db.session.add_all([Score(user=user, quiz=quiz, total_scored=i, total_questions=5)
+                            for i, user in enumerate(users[:2])])
+        db.session.commit()
+    return app
+
+def test_score_submitted_during_a_rebuild_survives_it(boards_app):
+    with boards_app.app_context():
+        boards = get_leaderboards()
+        quiz_id = db.session.query(Quiz.id).scalar()
+        late_user = db.session.query(User.id).filter_by(username="u2").scalar()
+        rebuild = boards.rebuild
+
+        def racing_rebuild(rows):
+            rows = list(rows)
+            # A submission commits and reaches the live board after the pass read Score
+            db.session.add(Score(user_id=late_user, quiz_id=quiz_id, total_scored=4, total_questions=5))
+            db.session.commit()
+            boards.add(quiz_id, late_user, 4)
+            rebuild(iter(rows))
+
+        boards.rebuild = racing_rebuild
+        rebuild_leaderboards(boards)
+        standing = quiz_standing(quiz_id, 4, 10)
+        assert standing["participants"] == 3
+        assert standing["top"][0][1:] == (late_user, 4)
+
+def test_no_score_scan_while_another_process_rebuilds(app):
+    app.config["LEADERBOARD_URL"] = "fakeredis://"
+    with app.app_context():
+        boards = _leaderboards()
+        assert boards.begin_rebuild()
+        with count_queries() as counter:
+            standing = quiz_standing(1, 3, 10)
+        assert counter.count == 0
+        assert standing["participants"] == 0
+
+        boards.end_rebuild()
+        assert rebuild_leaderboards()
+        assert not boards.needs_rebuild()
+
+def test_first_request_does_not_build_the_boards(boards_app):
+    boards_app.config["LEADERBOARD_BACKGROUND_BUILD"] = True
+    with boards_app.app_context():
+        quiz_id = db.session.query(Quiz.id).scalar()
+        with count_queries() as counter:
+            get_leaderboards()
+        assert counter.count == 0
+
+        boards_app.extensions["leaderboard_builder"].join(timeout=10)
+        assert quiz_standing(quiz_id, 1, 10)["participants"] == 2
@@ -0,0 +1,44 @@
+import base64
+import json
+from datetime import date
+import pytest
+from werkzeug.exceptions import HTTPException
+from models import Quiz
+from pagination import decode_cursor, encode_cursor
+
+KEYS = [(Quiz.date_of_quiz, True), (Quiz.id, False)]
+
+def _raw(payload):
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+def test_cursor_round_trip():
+    values = [date(2024, 5, 17), 42]
+    assert decode_cursor(encode_cursor(values), KEYS) == values
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    _raw(b"not json"),
+    _raw(b'{"date": "2024-05-17", "id": 42}'),
+    _raw(b'["2024-05-17"]'),
+    _raw(b'["2024-05-17", 42, 7]'),
+    _raw(b'["not a date", 42]'),
+    _raw(b'[20240517, 42]'),
+    _raw(b'["2024-05-17", [42]]'),
+    _raw(b'["2024-05-17", {"id": 42}]'),
+    _raw(b'["2024-05-17", "42"]'),
+    _raw(b'["2024-05-17", true]'),
+    _raw(b'["2024-05-17", 42.5]'),
+], ids=["base64", "json", "object", "too-short", "too-long", "bad-date", "date-not-string",
+        "list-id", "object-id", "string-id", "bool-id", "float-id"])
+def test_tampered_cursor_is_a_bad_request(app, cursor):
+    with app.test_request_context():
+        with pytest.raises(HTTPException) as error:
+            decode_cursor(cursor, KEYS)
+    assert error.value.response.status_code == 400
+    assert error.value.response.get_json() == {"error": "Invalid cursor"}
+
+@pytest.mark.parametrize("values", [["x", "y"], [[1]], [{"id": 1}]], ids=["length", "list", "object"])
+def test_list_route_rejects_tampered_cursor(client, admin_headers, values):
+    response = client.get(f"/admin/quizzes?cursor={_raw(json.dumps(values).encode())}", headers=admin_headers)
+    assert response.status_code == 400
+    assert response.get_json() == {"error": "Invalid cursor"}
@@ -0,0 +1,116 @@
+"""Per-route budgets for SQL statements and loaded ORM instances.
+
+The app is seeded once with a student who has a long score history, and each
+route below is called in order (later entries rely on earlier ones, e.g. the
+second autosave finds the answer key the first one loaded). A route that issues
+more statements or loads more ORM instances than its budget fails, so a
+relationship that silently turns eager again shows up immediately.
+"""
+from datetime import date, datetime, timedelta
+import pytest
+from werkzeug.security import generate_password_hash
+from models import db, User, Subject, Chapter, Quiz, Question, Score
+from query_counter import count_queries
+
+SUBJECTS = 2
+CHAPTERS_PER_SUBJECT = 2
+QUIZZES_PER_CHAPTER = 50
+QUESTIONS_PER_QUIZ = 5
+# Every quiz but the last has a score, so login/profile must not scale with this
+HISTORY = SUBJECTS * CHAPTERS_PER_SUBJECT * QUIZZES_PER_CHAPTER - 1
+QUIZZES = HISTORY + 1
+
+STUDENT_EMAIL = "budget.student@example.com"
+STUDENT_PASSWORD = "Budget#Pass1"
+
+# (method, path, role, json body, max statements, max loaded instances)
+BUDGETS = [
+    ("POST", "/auth/login", None, {"email": STUDENT_EMAIL, "password": STUDENT_PASSWORD}, 2, 1),
+    ("GET", "/student/profile", "student", None, 1, 1),
+    # One aggregate for the ETag, then one page of plain rows for the list
+    ("GET", "/student/quizzes/available", "student", None, 2, 0),
+    # Version lookup for the ETag, then quiz and questions
+    ("GET", "/student/quizzes/1/start", "student", None, 3, 1 + QUESTIONS_PER_QUIZ),
+    ("GET", "/student/results", "student", None, 1, 0),
+    # The score row, then usernames for the leaderboard's top entries
+    ("GET", "/student/results/1", "student", None, 2, 3),
+    # Recent attempts plus the two per-student stats lookups; nothing scales with history
+    ("GET", "/student/performance", "student", None, 3, 1),
+    # The first autosave loads the answer key; after that autosaves only touch the buffer
+    ("PUT", f"/student/quizzes/{QUIZZES}/answers", "student", {"answers": {}}, 2, 0),
+    ("PUT", f"/student/quizzes/{QUIZZES}/answers", "student", {"answers": {}}, 0, 0),
+    ("GET", f"/student/quizzes/{QUIZZES}/answers", "student", None, 1, 0),
+    # Grading confirms the cached answer key's content version first
+    ("POST", f"/student/quizzes/{QUIZZES}/submit", "student", {"answers": {}}, 9, 0),
+    ("GET", "/admin/subjects", "admin", None, 1, 0),
+    # List routes fetch one look-ahead row to detect the next page, in the same statement
+    ("GET", "/admin/quizzes?limit=50", "admin", None, 1, 0),
+    ("GET", "/admin/quizzes?limit=50&include=questions", "admin", None, 2, 0),
+    ("GET", "/admin/subjects/1/chapters", "admin", None, 1, CHAPTERS_PER_SUBJECT),
+    ("GET", "/admin/dashboard-stats", "admin", None, 6, 12),
+]
+
+def seed():
+    from counters import recompute_counters
+    from rollups import rebuild_rollups, rebuild_student_stats
+    from leaderboard import get_leaderboards
+
+    student = User(username="budget_student", email=STUDENT_EMAIL,
+                   password_hash=generate_password_hash(STUDENT_PASSWORD), role="student")
+    admin = User(username="budget_admin", email="budget.admin@example.com",
+                 password_hash="!", role="admin")
+    db.session.add_all([student, admin])
+
+    quizzes = []
+    for s in range(SUBJECTS):
+        subject = Subject(name=f"Budget subject {s}")
+        for c in range(CHAPTERS_PER_SUBJECT):
+            chapter = Chapter(name=f"Chapter {s}.{c}", subject=subject)
+            for _ in range(QUIZZES_PER_CHAPTER):
+                quiz = Quiz(chapter=chapter, date_of_quiz=date.today() - timedelta(days=1), time_duration=30)
+                for q in range(QUESTIONS_PER_QUIZ):
+                    quiz.questions.append(Question(
+                        title=f"Q{q}", question_text="?", option_1="a", option_2="b",
+                        option_3="c", option_4="d", correct_option=q % 4 + 1
+                    ))
+                quizzes.append(quiz)
+        db.session.add(subject)
+    db.session.flush()
+
+    for quiz in quizzes[:HISTORY]:
+        db.session.add(Score(user=student, quiz=quiz, total_scored=3, total_questions=QUESTIONS_PER_QUIZ,
+                             timestamp=datetime.utcnow()))
+    db.session.commit()
+    recompute_counters()
+    rebuild_rollups()
+    rebuild_student_stats()
+    # Leaderboards load from Score on first use; do it here rather than inside a measured request
+    get_leaderboards()
+    return student, admin
+
+@pytest.fixture(scope="module")
+def seeded(token):
+    from app import create_app
+    app = create_app()
+    # Budgets measure the database work behind each route, not cache hits
+    app.config["RESPONSE_CACHE_ENABLED"] = False
+    with app.app_context():
+        db.create_all()
+        student, admin = seed()
+        tokens = {"student": token(student, "student"), "admin": token(admin, "admin")}
+    yield app, app.test_client(), tokens
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.mark.parametrize("method,path,role,body,max_statements,max_instances", BUDGETS,
+                         ids=[f"{method} {path}" for method, path, *_ in BUDGETS])
+def test_query_budget(seeded, method, path, role, body, max_statements, max_instances):
+    app, client, tokens = seeded
+    headers = {"Authorization": tokens[role]} if role else {}
+    with app.app_context(), count_queries() as counter:
+        response = client.open(path, method=method, json=body, headers=headers)
+
+    assert response.status_code < 400, response.get_data(as_text=True)
+    assert counter.count <= max_statements, f"{counter.count} statements, budget {max_statements}"
+    assert counter.instances <= max_instances, f"{counter.instances} instances, budget {max_instances}"
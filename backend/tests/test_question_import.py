@@ -0,0 +1,27 @@
+import io
+import json
+import pytest
+from question_import import iter_jsonl_rows, import_questions
+
+@pytest.fixture
+def quiz_id(client, admin_headers):
+    client.post("/admin/subjects", json={"name": "Subject"}, headers=admin_headers)
+    client.post("/admin/subjects/1/chapters", json={"name": "Chapter"}, headers=admin_headers)
+    return client.post("/admin/quizzes", json={"chapter_id": 1}, headers=admin_headers).json["id"]
+
+def _jsonl(*rows):
+    return io.BytesIO("".join(json.dumps(row) + "\n" for row in rows).encode())
+
+@pytest.mark.parametrize("correct,error", [
+    (True, "correct must be an integer"),
+    (False, "correct must be an integer"),
+    ("x", "correct must be an integer"),
+    (5, "correct must be between 1 and 4"),
+])
+def test_jsonl_rejects_non_option_correct(app, quiz_id, correct, error):
+    row = {"quiz_id": quiz_id, "title": "Q", "text": "?", "options": ["a", "b", "c", "d"]}
+    with app.app_context():
+        report = import_questions(iter_jsonl_rows(_jsonl({**row, "correct": 2}, {**row, "correct": correct})))
+    assert report["imported"] == 1
+    assert report["failed"] == 1
+    assert error in json.dumps(report["errors"])
@@ -0,0 +1,104 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from models import db, Quiz
+from content_versions import SingleFlight, get_payload_cache, get_shared_payloads, quiz_etag
+
+@pytest.fixture
+def chapter_id(client, admin_headers):
+    client.post("/admin/subjects", json={"name": "Subject"}, headers=admin_headers)
+    client.post("/admin/subjects/1/chapters", json={"name": "Chapter"}, headers=admin_headers)
+    return 1
+
+def _create_quiz(client, admin_headers, chapter_id, text):
+    quiz_id = client.post("/admin/quizzes", json={"chapter_id": chapter_id}, headers=admin_headers).json["id"]
+    client.post("/admin/questions", headers=admin_headers, json={
+        "quiz_id": quiz_id, "title": "Q", "text": text, "options": ["a", "b", "c", "d"], "correct": 1
+    })
+    return quiz_id
+
+def _start(client, student_headers, quiz_id):
+    response = client.get(f"/student/quizzes/{quiz_id}/start", headers=student_headers)
+    assert response.status_code == 200
+    return response
+
+def test_new_quiz_never_gets_a_deleted_quizs_id_or_payload(client, admin_headers, student_headers, chapter_id):
+    old_id = _create_quiz(client, admin_headers, chapter_id, "old question")
+    old = _start(client, student_headers, old_id)
+    assert client.delete(f"/admin/quizzes/{old_id}", headers=admin_headers).status_code == 200
+
+    new_id = _create_quiz(client, admin_headers, chapter_id, "new question")
+    assert new_id != old_id
+    new = _start(client, student_headers, new_id)
+    assert new.json["questions"][0]["question"] == "new question"
+    assert new.headers["ETag"] != old.headers["ETag"]
+
+def test_deleting_a_quiz_evicts_its_payloads(app, client, admin_headers, student_headers, chapter_id):
+    app.config["QUIZ_PAYLOAD_URL"] = "fakeredis://"
+    quiz_id = _create_quiz(client, admin_headers, chapter_id, "question")
+    _start(client, student_headers, quiz_id)
+    with app.app_context():
+        version = db.session.get(Quiz, quiz_id).content_version
+        etag = quiz_etag(quiz_id, version)
+        assert get_payload_cache().get(etag) is not None
+        assert get_shared_payloads().get(etag) is not None
+
+    assert client.delete(f"/admin/quizzes/{quiz_id}", headers=admin_headers).status_code == 200
+    with app.app_context():
+        assert get_payload_cache().get(etag) is None
+        assert get_shared_payloads().get(etag) is None
+
+def test_available_list_revalidates_against_the_catalog(app, client, admin_headers, student_headers, chapter_id):
+    app.config["RESPONSE_CACHE_ENABLED"] = True
+    first = client.get("/student/quizzes/available", headers=student_headers)
+    assert first.json["items"] == []
+    assert client.get("/student/quizzes/available",
+                      headers={**student_headers, "If-None-Match": first.headers["ETag"]}).status_code == 304
+
+    quiz_id = _create_quiz(client, admin_headers, chapter_id, "question")
+    second = client.get("/student/quizzes/available",
+                        headers={**student_headers, "If-None-Match": first.headers["ETag"]})
+    assert second.status_code == 200
+    assert [item["id"] for item in second.json["items"]] == [quiz_id]
+
+CALLERS = 8
+
+def _run_flight(fn):
+    """Start CALLERS concurrent calls of one key; fn runs once every caller has joined."""
+    flight = SingleFlight()
+    joined = threading.Event()
+    calls = []
+
+    def leader():
+        calls.append(threading.current_thread().name)
+        assert joined.wait(10)
+        return fn()
+
+    with ThreadPoolExecutor(CALLERS) as pool:
+        futures = [pool.submit(flight.do, "quiz-1-v1", leader) for _ in range(CALLERS)]
+        deadline = time.monotonic() + 10
+        while flight.stats()["coalesced"] < CALLERS - 1 and time.monotonic() < deadline:
+            time.sleep(0.001)
+        joined.set()
+        outcomes = []
+        for future in futures:
+            try:
+                outcomes.append(future.result(timeout=10))
+            except Exception as e:
+                outcomes.append(e)
+    assert len(calls) == 1
+    assert flight.stats() == {"executions": 1, "coalesced": CALLERS - 1, "in_flight": 0}
+    return outcomes
+
+def test_single_flight_shares_one_execution():
+    payload = object()
+    assert all(outcome is payload for outcome in _run_flight(lambda: payload))
+
+def test_single_flight_raises_the_leaders_error_in_every_caller():
+    error = RuntimeError("payload build failed")
+
+    def fail():
+        raise error
+
+    assert all(outcome is error for outcome in _run_flight(fail))
@@ -0,0 +1,30 @@
+import os
+import sqlite3
+from flask import Flask
+from read_routing import SQLiteSnapshot, write_sqlite_snapshot
+
+def _primary(tmp_path):
+    path = str(tmp_path / "primary.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE t (x)")
+    return path
+
+def test_snapshot_reads_stay_on_the_primary_until_a_copy_exists(tmp_path):
+    primary = _primary(tmp_path)
+    snapshot = SQLiteSnapshot(Flask(__name__), primary, None, max_lag=60, interval=30)
+    snapshot._tick()
+    assert snapshot.engine_for_reads() is None
+
+    path = write_sqlite_snapshot(primary)
+    snapshot._tick()
+    assert snapshot.engine_for_reads().url.database.endswith(os.path.basename(path))
+    assert snapshot.stats()["refreshes"] == 1
+
+def test_processes_share_the_newest_snapshot_and_old_ones_are_pruned(tmp_path):
+    primary = _primary(tmp_path)
+    followers = [SQLiteSnapshot(Flask(__name__), primary, None, max_lag=60, interval=30) for _ in range(2)]
+    paths = [write_sqlite_snapshot(primary) for _ in range(3)]
+    for follower in followers:
+        follower._tick()
+        assert follower.engine.url.database.endswith(os.path.basename(paths[-1]))
+    assert sorted(tmp_path.glob("primary.db.snapshot-*")) == sorted(map(tmp_path.joinpath, paths[-2:]))
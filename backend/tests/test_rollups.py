@@ -0,0 +1,117 @@
+"""The denormalized counters and score rollups are maintained incrementally by
+the write routes; after any mix of writes they must match a full recompute."""
+import io
+import pytest
+from sqlalchemy import select
+from models import db, User, Chapter, Quiz, Question, UserScoreStats, UserSubjectScoreStats
+from counters import recompute_counters
+from rollups import ROLLUP_MODELS, STUDENT_STATS_MODELS, check_student_stats, rebuild_rollups, rebuild_student_stats
+
+SUBJECTS = 2
+CHAPTERS_PER_SUBJECT = 2
+QUIZZES_PER_CHAPTER = 2
+QUESTIONS_PER_QUIZ = 3
+STUDENTS = 3
+
+def _counters():
+    return (
+        sorted(db.session.execute(select(Quiz.id, Quiz.question_count)).all()),
+        sorted(db.session.execute(select(Chapter.id, Chapter.quiz_count, Chapter.question_count)).all())
+    )
+
+def _rollups():
+    snapshot = {}
+    for model in ROLLUP_MODELS + STUDENT_STATS_MODELS:
+        table = model.__table__
+        snapshot[table.name] = sorted(
+            tuple(round(value, 6) if isinstance(value, float) else value for value in row)
+            for row in db.session.execute(select(table)).all()
+        )
+    return snapshot
+
+@pytest.fixture
+def catalog(app, client, admin_headers, token):
+    """Subjects, chapters, quizzes and questions created through the admin API, and
+    students who each submitted every quiz, answering one more question right
+    than the previous student."""
+    for s in range(SUBJECTS):
+        assert client.post("/admin/subjects", json={"name": f"Subject {s}"}, headers=admin_headers).status_code == 201
+        for c in range(CHAPTERS_PER_SUBJECT):
+            client.post(f"/admin/subjects/{s + 1}/chapters", json={"name": f"Chapter {s}.{c}"}, headers=admin_headers)
+
+    questions = {}
+    with app.app_context():
+        chapter_ids = db.session.scalars(select(Chapter.id).order_by(Chapter.id)).all()
+    for chapter_id in chapter_ids:
+        for _ in range(QUIZZES_PER_CHAPTER):
+            quiz_id = client.post("/admin/quizzes", json={"chapter_id": chapter_id}, headers=admin_headers).json["id"]
+            for q in range(QUESTIONS_PER_QUIZ):
+                response = client.post("/admin/questions", headers=admin_headers, json={
+                    "quiz_id": quiz_id, "title": f"Q{q}", "text": "?", "options": ["a", "b", "c", "d"], "correct": 1
+                })
+                assert response.status_code == 201
+            questions[quiz_id] = []
+    with app.app_context():
+        for quiz_id in questions:
+            questions[quiz_id] = db.session.scalars(
+                select(Question.id).filter_by(quiz_id=quiz_id).order_by(Question.id)
+            ).all()
+        students = [User(username=f"student{i}", email=f"student{i}@example.com", password_hash="!", role="student")
+                    for i in range(STUDENTS)]
+        db.session.add_all(students)
+        db.session.commit()
+        headers = [{"Authorization": token(student, "student")} for student in students]
+
+    for i, student_headers in enumerate(headers):
+        for quiz_id, question_ids in questions.items():
+            answers = {str(question_id): 1 if n < i + 1 else 2 for n, question_id in enumerate(question_ids)}
+            response = client.post(f"/student/quizzes/{quiz_id}/submit", json={"answers": answers}, headers=student_headers)
+            assert response.status_code == 200
+    return questions
+
+def _assert_consistent(app):
+    with app.app_context():
+        assert check_student_stats() == []
+        counters, rollups = _counters(), _rollups()
+        recompute_counters()
+        rebuild_rollups()
+        rebuild_student_stats()
+        assert _counters() == counters
+        assert _rollups() == rollups
+
+def test_submissions_keep_rollups_consistent(app, catalog):
+    _assert_consistent(app)
+
+def test_catalog_edits_keep_counters_and_rollups_consistent(app, client, admin_headers, catalog):
+    quiz_ids = list(catalog)
+    # Remove a question from a scored quiz, and add one through the importer
+    assert client.delete(f"/admin/questions/{catalog[quiz_ids[0]][0]}", headers=admin_headers).status_code == 200
+    upload = b"quiz_id,title,text,option_1,option_2,option_3,option_4,correct\n" \
+             + f"{quiz_ids[1]},Imported,?,a,b,c,d,3\n".encode()
+    report = client.post("/admin/questions/import", headers=admin_headers,
+                         data={"file": (io.BytesIO(upload), "bank.csv")}).json
+    assert report["imported"] == 1
+    # Move a scored quiz into the other subject, then delete another quiz and a chapter
+    other_subject_chapter = CHAPTERS_PER_SUBJECT + 1
+    assert client.put(f"/admin/quizzes/{quiz_ids[0]}", json={"chapter_id": other_subject_chapter},
+                      headers=admin_headers).status_code == 200
+    assert client.delete(f"/admin/quizzes/{quiz_ids[-1]}", headers=admin_headers).status_code == 200
+    assert client.delete("/admin/chapters/2", headers=admin_headers).status_code == 200
+
+    _assert_consistent(app)
+
+def test_subject_delete_keeps_rollups_consistent(app, client, admin_headers, catalog):
+    assert client.delete("/admin/subjects/1", headers=admin_headers).status_code == 200
+    _assert_consistent(app)
+
+def test_check_student_stats_reports_and_repairs_drift(app, catalog):
+    with app.app_context():
+        first, second = db.session.scalars(select(User.id).filter_by(role="student").order_by(User.id).limit(2)).all()
+        db.session.get(UserScoreStats, first).attempts += 1
+        db.session.delete(db.session.get(UserSubjectScoreStats, (second, 1)))
+        db.session.commit()
+
+        drifted = check_student_stats()
+        assert drifted == [first, second]
+        rebuild_student_stats(drifted)
+        assert check_student_stats() == []
@@ -0,0 +1,48 @@
+"""Daily reminders and monthly reports claim or checkpoint each delivery, so a
+task that runs twice (a retry, or a beat tick delivered twice) mails each
+student once."""
+from collections import Counter
+from datetime import date, datetime
+import pytest
+from models import db, User, Subject, Chapter, Quiz, Score
+from extensions import mail
+from tasks import send_daily_reminder_page, send_monthly_report_chunk
+
+MONTH = "2026-09"
+
+@pytest.fixture
+def outbox(app):
+    # Record messages without connecting to an SMTP server
+    app.extensions["mail"].suppress = True
+    with mail.record_messages() as outbox:
+        yield outbox
+
+@pytest.fixture
+def student_ids(app):
+    with app.app_context():
+        students = [User(username=f"s{i}", email=f"s{i}@example.com", password_hash="!", role="student")
+                    for i in range(3)]
+        quiz = Quiz(chapter=Chapter(name="Chapter", subject=Subject(name="Subject")), time_duration=30)
+        db.session.add_all(Score(user=student, quiz=quiz, total_scored=2, total_questions=4,
+                                 timestamp=datetime(2026, 9, 15)) for student in students)
+        db.session.commit()
+        return [student.id for student in students]
+
+def _recipients(outbox):
+    return Counter(recipient for message in outbox for recipient in message.recipients)
+
+def test_reminder_page_run_twice_sends_one_reminder_per_student(outbox, student_ids):
+    day = date(2026, 10, 1).isoformat()
+    assert send_daily_reminder_page(day, student_ids) == 3
+    # A retry, and an overlapping page, find every marker already claimed
+    assert send_daily_reminder_page(day, student_ids) == 0
+    assert send_daily_reminder_page(day, student_ids[1:]) == 0
+    assert _recipients(outbox) == {f"s{i}@example.com": 1 for i in range(3)}
+
+    # The next day is a new delivery
+    assert send_daily_reminder_page(date(2026, 10, 2).isoformat(), student_ids) == 3
+
+def test_monthly_report_chunk_run_twice_sends_one_report_per_student(outbox, student_ids):
+    assert send_monthly_report_chunk(MONTH, student_ids) == 3
+    assert send_monthly_report_chunk(MONTH, student_ids) == 0
+    assert _recipients(outbox) == {f"s{i}@example.com": 1 for i in range(3)}
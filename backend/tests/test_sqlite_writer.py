@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+import config
+from models import db, Subject
+from sqlite_tuning import get_sqlite_writer
+
+@pytest.fixture
+def file_app(tmp_path, monkeypatch):
+    from app import create_app
+    monkeypatch.setattr(config.Config, "SQLALCHEMY_DATABASE_URI", f"sqlite:///{tmp_path / 'quizmaster.db'}")
+    monkeypatch.setattr(config.Config, "SQLITE_WRITE_QUEUE", True)
+    # Long enough for every job below to join the first job's batch
+    monkeypatch.setattr(config.Config, "SQLITE_WRITE_LINGER_MS", 500)
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        db.session.add(Subject(name="Existing"))
+        db.session.commit()
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+def _add_subject(name):
+    db.session.add(Subject(name=name))
+    db.session.flush()
+    return name
+
+def test_failing_job_only_fails_its_own_future(file_app):
+    names = ["One", "Two", "Existing", "Three", "Four"]
+    with file_app.app_context():
+        writer = get_sqlite_writer()
+        futures = [writer.submit(_add_subject, name) for name in names]
+
+        for name, future in zip(names, futures):
+            if name == "Existing":
+                with pytest.raises(IntegrityError):
+                    future.result(timeout=10)
+            else:
+                assert future.result(timeout=10) == name
+        stats = writer.stats()
+        assert stats["largest_batch"] == len(names)
+        assert stats["retried_batches"] == 1
+        db.session.remove()
+        assert sorted(db.session.scalars(select(Subject.name))) == ["Existing", "Four", "One", "Three", "Two"]
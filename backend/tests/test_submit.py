@@ -0,0 +1,54 @@
+import pytest
+from sqlalchemy import delete, select
+from models import db, Subject, Chapter, Quiz, Question
+from answer_keys import get_answer_key
+import routes.user_routes
+
+@pytest.fixture
+def quiz_id(app):
+    with app.app_context():
+        quiz = Quiz(chapter=Chapter(name="Chapter", subject=Subject(name="Subject")), time_duration=30)
+        quiz.questions.append(Question(title="Q", question_text="?", option_1="a", option_2="b",
+                                       option_3="c", option_4="d", correct_option=2))
+        db.session.add(quiz)
+        db.session.commit()
+        return quiz.id
+
+def test_second_submission_is_rejected(client, quiz_id, student_headers):
+    first = client.post(f"/student/quizzes/{quiz_id}/submit", json={"answers": {}}, headers=student_headers)
+    assert first.status_code == 200
+    second = client.post(f"/student/quizzes/{quiz_id}/submit", json={"answers": {}}, headers=student_headers)
+    assert second.status_code == 400
+    assert second.get_json() == {"error": "Already submitted"}
+
+def test_quiz_deleted_after_its_answer_key_was_read_is_not_found(app, client, quiz_id, student_headers, monkeypatch):
+    # The quiz disappears between grading's answer-key lookup and the score insert
+    with app.app_context():
+        stale_key = get_answer_key(quiz_id)
+        db.session.execute(delete(Quiz).where(Quiz.id == quiz_id))
+        db.session.commit()
+    monkeypatch.setattr(routes.user_routes, "get_answer_key", lambda quiz_id: stale_key)
+
+    response = client.post(f"/student/quizzes/{quiz_id}/submit", json={"answers": {}}, headers=student_headers)
+    assert response.status_code == 404
+    assert response.get_json() == {"error": "Quiz not found"}
+
+def test_recreated_quiz_is_graded_against_its_own_key(app, client, quiz_id, student_headers):
+    # Another worker deletes the quiz and creates a new one without touching this
+    # process's answer-key store
+    with app.app_context():
+        assert get_answer_key(quiz_id) is not None
+        db.session.execute(delete(Quiz).where(Quiz.id == quiz_id))
+        quiz = Quiz(chapter_id=db.session.scalar(select(Chapter.id)), time_duration=30)
+        quiz.questions.append(Question(title="Q", question_text="?", option_1="a", option_2="b",
+                                       option_3="c", option_4="d", correct_option=4))
+        db.session.add(quiz)
+        db.session.commit()
+        new_quiz_id, question_id = quiz.id, quiz.questions[0].id
+
+    assert client.post(f"/student/quizzes/{quiz_id}/submit", json={"answers": {}},
+                       headers=student_headers).status_code == 404
+    response = client.post(f"/student/quizzes/{new_quiz_id}/submit", json={"answers": {str(question_id): 4}},
+                           headers=student_headers)
+    assert response.status_code == 200
+    assert response.get_json()["score"] == 1